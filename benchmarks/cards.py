@@ -0,0 +1,94 @@
+"""
+Blackjack card handling: the original (rank, suit) tuple functions vs. gambling.cards.
+
+Usage:
+    python -m benchmarks.cards [--ops 200000]
+
+Times drawing a card, totalling a hand after each hit, and playing out a whole
+dealer turn, in nanoseconds per operation.
+"""
+import argparse
+import random
+import time
+
+from gambling.cards import DEALER_STANDS_ON, Hand, Shoe, play_dealer
+
+# The original definitions from plugins/blackjack.py.
+card_ranks = ['Ace', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King']
+card_suits = ["Hearts", "Spades", "Clubs", "Diamonds"]
+
+def legacy_draw(amount=1):
+    return [(random.choice(card_ranks), random.choice(card_suits)) for _ in range(amount)]
+
+def legacy_total(hand):
+    total = 0
+    aces = 0
+    for rank, _ in hand:
+        if rank == 'Ace':
+            total += 11
+            aces += 1
+        elif rank in ['Jack', 'Queen', 'King']:
+            total += 10
+        else:
+            total += int(rank)
+    while total > 21 and aces:
+        total -= 10
+        aces -= 1
+    return total
+
+def legacy_dealer(hand):
+    total = legacy_total(hand)
+    while total < DEALER_STANDS_ON:
+        hand.append(legacy_draw(1)[0])
+        total = legacy_total(hand)
+    return hand, total
+
+def timed(fn, ops: int) -> float:
+    """Nanoseconds per call of fn()."""
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e9
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=200_000)
+    args = parser.parse_args()
+
+    shoe = Shoe(seed=1)
+
+    def legacy_hit_to_17():
+        hand = []
+        while legacy_total(hand) < DEALER_STANDS_ON:
+            hand.append(legacy_draw(1)[0])
+
+    def hit_to_17():
+        hand = Hand()
+        while hand.total < DEALER_STANDS_ON:
+            hand.add(shoe.draw())
+
+    def legacy_round():
+        player, dealer = legacy_draw(2), legacy_draw(2)
+        legacy_total(player)
+        legacy_dealer(dealer)
+
+    def new_round():
+        if shoe.needs_shuffle:
+            shoe.shuffle()
+        player, dealer = shoe.deal(2), shoe.deal(2)
+        player.total
+        play_dealer(dealer, shoe.draw)
+
+    rows = (
+        ("draw a card", lambda: legacy_draw(1)[0], shoe.draw),
+        ("hit to 17", legacy_hit_to_17, hit_to_17),
+        ("deal + dealer", legacy_round, new_round),
+    )
+    print(f"{'':<16}{'legacy':>12}{'cards':>12}")
+    for name, legacy_fn, new_fn in rows:
+        legacy_ns = timed(legacy_fn, args.ops)
+        new_ns = timed(new_fn, args.ops)
+        print(f"{name:<16}{legacy_ns:>9.0f} ns{new_ns:>9.0f} ns   {legacy_ns / new_ns:>4.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Message components per game response: building a miru view on every click vs. prebuilt payloads.
+
+Usage:
+    python -m benchmarks.components [--ops 20000]
+
+Each case builds the components for one response and then serializes them the way
+hikari does when the response is sent (`build()` on every row). Reports the time per
+response and the peak memory allocated while building one, measured with tracemalloc.
+"""
+import argparse
+import time
+import tracemalloc
+
+import hikari
+import miru
+
+from gambling.components import prebuild
+
+# The per-click builders the plugins used before their components were prebuilt.
+def legacy_slots_view() -> list:
+    view = miru.View()
+    view.add_item(miru.Button(style=hikari.ButtonStyle.SECONDARY, emoji="⬆️", custom_id="slots_increase"))
+    view.add_item(miru.Button(style=hikari.ButtonStyle.SUCCESS, label="Spin", custom_id="slots_spin"))
+    view.add_item(miru.Button(style=hikari.ButtonStyle.SECONDARY, emoji="⬇️", custom_id="slots_decrease"))
+    for spins in (10, 50, 100):
+        view.add_item(miru.Button(style=hikari.ButtonStyle.PRIMARY, label=f"Auto x{spins}",
+                                  custom_id=f"slots_auto_{spins}", row=1))
+    return view.build()
+
+def legacy_blackjack_view(can_double: bool = True) -> list:
+    view = miru.View(timeout=180)
+    view.add_item(miru.Button(style=hikari.ButtonStyle.PRIMARY, label="Hit", custom_id="bj_hit"))
+    view.add_item(miru.Button(style=hikari.ButtonStyle.SECONDARY, label="Stand", custom_id="bj_stand"))
+    if can_double:
+        view.add_item(miru.Button(style=hikari.ButtonStyle.SUCCESS, label="Double Down", custom_id="bj_double"))
+    return view.build()
+
+def legacy_bet_modal() -> list:
+    modal = miru.Modal(title="Enter your bet amount", custom_id="predi_bet_YES_123")
+    modal.add_item(miru.TextInput(label="Bet amount", custom_id="bet_amount", style=hikari.TextInputStyle.SHORT,
+                                  required=True, placeholder="Enter a number"))
+    return modal.build()
+
+def send(rows) -> list:
+    """What hikari does with `components=` when a response goes out."""
+    return [row.build()[0] for row in rows]
+
+def timed(fn, ops: int) -> float:
+    """Microseconds per call of fn()."""
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e6
+
+def peak_bytes(fn) -> int:
+    """Peak memory allocated by one call of fn()."""
+    tracemalloc.start()
+    try:
+        fn()  # Warm up any lazily created state first.
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+
+    cases = []
+    for name, builder in (
+        ("slots buttons", legacy_slots_view),
+        ("blackjack buttons", legacy_blackjack_view),
+        ("predi bet modal", legacy_bet_modal),
+    ):
+        prebuilt = prebuild(builder())
+        cases.append((name, lambda builder=builder: send(builder()), lambda prebuilt=prebuilt: send(prebuilt)))
+
+    print(f"{'':<20}{'per click':>22}{'prebuilt':>22}")
+    for name, legacy_fn, prebuilt_fn in cases:
+        legacy_us, prebuilt_us = timed(legacy_fn, args.ops), timed(prebuilt_fn, args.ops)
+        legacy_kib, prebuilt_kib = peak_bytes(legacy_fn) / 1024, peak_bytes(prebuilt_fn) / 1024
+        print(f"{name:<20}{legacy_us:>7.1f} µs {legacy_kib:>7.1f} KiB{prebuilt_us:>7.1f} µs {prebuilt_kib:>7.1f} KiB"
+              f"   {legacy_us / prebuilt_us:>5.0f}x faster")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+End-to-end handler throughput and latency, without Discord.
+
+Usage:
+    python -m benchmarks.handlers [--sizes 100 10000 100000] [--ops 500] [--store json]
+
+Builds the raw gateway payloads Discord would send (MESSAGE_CREATE, and INTERACTION_CREATE
+for slash commands, buttons and modals), turns them into events with the bot's own
+hikari event factory and dispatches them on the real bot, so they run through the
+message listener, crescent (hooks included) and the interaction router exactly as in
+production. REST calls stop at a fake in place of hikari's HTTP request, after hikari
+has built and serialized them; the fake records every response and answers with the
+payloads Discord would return.
+
+Each size seeds a throwaway profile store with that many users, runs the bot's startup
+and shutdown listeners around the run, and plays `--ops` of each handler from random
+users, one at a time. Latency is from the raw payload to the last listener returning.
+Set PROFILING_SECONDS to also profile the handlers while it runs.
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GUILD_ID", "100000000000000000")
+os.environ.setdefault("TOKEN", "MTAwMDAwMDAwMDAwMDAwMDAw.benchmark.offline")
+
+import hikari
+from hikari.impl.rest import RESTClientImpl
+from hikari.internal import routes
+
+import gambling.__main__ as bot_main
+import gambling.points as points
+from gambling.client_instance import bot, guild_id
+from gambling.latency import instrument_rest
+from gambling.plugins.blackjack import GAMES
+from gambling.plugins.slots import SLOT_GAMES
+from gambling.predictions import predictions
+from gambling.storage import JsonStore, SqliteStore
+
+APPLICATION_ID = 200_000_000_000_000_000
+CHANNEL_ID = 300_000_000_000_000_000
+FIRST_USER_ID = 100_000_000_000_000_000
+STARTING_POINTS = 1_000_000
+TIMESTAMP = "2025-01-01T00:00:00.000000+00:00"
+
+# Fresh snowflakes for interactions, messages and tokens.
+_snowflakes = itertools.count(1_000_000_000_000_000_000)
+
+def user_payload(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"user{user_id}", "global_name": None,
+            "discriminator": "0", "avatar": None}
+
+def member_payload(user_id: int) -> dict:
+    return {"user": user_payload(user_id), "nick": None, "roles": [], "joined_at": TIMESTAMP,
+            "deaf": False, "mute": False, "permissions": "0"}
+
+def message_payload(message_id: int, author_id: int, content: str = "") -> dict:
+    return {
+        "id": str(message_id), "channel_id": str(CHANNEL_ID), "guild_id": str(guild_id),
+        "author": user_payload(author_id), "member": member_payload(author_id), "content": content,
+        "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False, "mention_everyone": False,
+        "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "pinned": False,
+        "type": 0, "flags": 0, "components": [],
+    }
+
+def interaction_payload(kind: hikari.InteractionType, user_id: int, data: dict, message: dict = None) -> dict:
+    payload = {
+        "id": str(next(_snowflakes)), "application_id": str(APPLICATION_ID), "type": int(kind),
+        "token": f"token{next(_snowflakes)}", "version": 1, "guild_id": str(guild_id),
+        "channel_id": str(CHANNEL_ID), "channel": {"id": str(CHANNEL_ID), "type": 0, "name": "casino"},
+        "member": member_payload(user_id), "locale": "en-US", "guild_locale": "en-US",
+        "app_permissions": "0", "entitlements": [], "authorizing_integration_owners": {}, "context": 0,
+        "attachment_size_limit": 10 * 1024 * 1024,
+        "data": data,
+    }
+    if message is not None:
+        payload["message"] = message
+    return payload
+
+def command(user_id: int, name: str, **options) -> dict:
+    types = {bool: hikari.OptionType.BOOLEAN, int: hikari.OptionType.INTEGER, str: hikari.OptionType.STRING}
+    data = {
+        "id": str(next(_snowflakes)), "name": name, "type": int(hikari.CommandType.SLASH), "guild_id": str(guild_id),
+        "options": [{"name": k, "type": int(types[type(v)]), "value": v} for k, v in options.items()],
+    }
+    return interaction_payload(hikari.InteractionType.APPLICATION_COMMAND, user_id, data)
+
+def button(user_id: int, custom_id: str, message_id: int) -> dict:
+    """A click on a button of one of the bot's messages."""
+    data = {"custom_id": custom_id, "component_type": int(hikari.ComponentType.BUTTON)}
+    return interaction_payload(hikari.InteractionType.MESSAGE_COMPONENT, user_id, data,
+                               message=message_payload(message_id, APPLICATION_ID))
+
+def modal(user_id: int, custom_id: str, values: dict) -> dict:
+    rows = [{"type": int(hikari.ComponentType.ACTION_ROW), "id": 2 * i + 1, "components": [
+        {"type": int(hikari.ComponentType.TEXT_INPUT), "id": 2 * i + 2, "custom_id": k, "value": v}]}
+        for i, (k, v) in enumerate(values.items())]
+    data = {"custom_id": custom_id, "components": rows}
+    return interaction_payload(hikari.InteractionType.MODAL_SUBMIT, user_id, data)
+
+class FakeREST:
+    """
+    Stands in for Discord's HTTP API behind hikari's REST client.
+
+    Every request is recorded by route, with the body hikari would have sent; replies are
+    the minimal payloads hikari needs to build its return values. The message an
+    interaction response creates gets a fresh ID, returned when it's fetched or edited.
+    """
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        # Recent (route, JSON body) pairs, newest last.
+        self.responses = collections.deque(maxlen=100)
+        # {interaction token: ID of the message its response created}
+        self.messages = {}
+
+    def install(self) -> None:
+        """Replace hikari's HTTP request with this fake (REST latency timing still wraps it)."""
+        fake = self
+
+        async def _request(self, compiled_route, *, query=None, form_builder=None, json=None, **kwargs):
+            body = self._dumps(json) if json is not None else None
+            return fake.handle(compiled_route, body)
+
+        RESTClientImpl._request = _request
+        instrument_rest()
+
+    def handle(self, compiled_route, body):
+        route = compiled_route.route
+        self.calls[f"{route.method} {route.path_template}"] += 1
+        self.responses.append((compiled_route.compiled_path, body))
+        parts = compiled_route.compiled_path.strip("/").split("/")
+
+        if route == routes.POST_INTERACTION_RESPONSE:
+            interaction_id, token = parts[1], parts[2]
+            response_type = json.loads(body)["type"]
+            if response_type in (hikari.ResponseType.MESSAGE_CREATE, hikari.ResponseType.DEFERRED_MESSAGE_CREATE):
+                self.messages[token] = next(_snowflakes)
+            return {"interaction": {"id": interaction_id, "type": int(hikari.InteractionType.APPLICATION_COMMAND)}}
+        if route in (routes.GET_INTERACTION_RESPONSE, routes.PATCH_INTERACTION_RESPONSE):
+            token = parts[2]
+            return message_payload(self.messages[token], APPLICATION_ID)
+        if route == routes.GET_GUILD_MEMBER:
+            return member_payload(int(parts[3]))
+        # Deleting messages and anything else the handlers don't read a reply from.
+        return None
+
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+async def deliver(event_name: str, payload: dict) -> float:
+    """Turn a raw gateway payload into its event and dispatch it. Returns the seconds taken."""
+    start = time.perf_counter()
+    if event_name == "MESSAGE_CREATE":
+        event = bot.event_factory.deserialize_message_create_event(None, payload)
+    else:
+        event = bot.event_factory.deserialize_interaction_create_event(None, payload)
+    await bot.event_manager.dispatch(event, return_tasks=True)
+    return time.perf_counter() - start
+
+class Results:
+    def __init__(self, rest: FakeREST):
+        self.rest = rest
+        self.rows = []
+        # Exceptions raised by listeners; hikari logs them and carries on.
+        self.errors = []
+
+    async def on_exception(self, event: hikari.ExceptionEvent) -> None:
+        self.errors.append(event.exception)
+
+    async def run(self, name: str, event_name: str, payloads) -> list:
+        """Deliver `payloads` one at a time and record the handler's numbers. Returns the payloads."""
+        payloads = list(payloads)
+        if not payloads:
+            return payloads
+        calls_before, errors_before = self.rest.total(), len(self.errors)
+        latencies = []
+        # The handlers' own prints (e.g. blackjack winners) would drown the table.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for payload in payloads:
+                latencies.append(await deliver(event_name, payload))
+            elapsed = time.perf_counter() - start
+        latencies.sort()
+        self.rows.append({
+            "handler": name,
+            "ops": len(payloads),
+            "ops_per_s": len(payloads) / elapsed,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+            "rest_per_op": (self.rest.total() - calls_before) / len(payloads),
+            "errors": len(self.errors) - errors_before,
+        })
+        return payloads
+
+    def print(self) -> None:
+        print(f"  {'handler':<24}{'ops':>7}{'ops/s':>10}{'p50':>11}{'p99':>11}{'REST/op':>9}{'errors':>8}")
+        for r in self.rows:
+            print(f"  {r['handler']:<24}{r['ops']:>7,}{r['ops_per_s']:>10,.0f}{r['p50_ms']:>8.3f} ms"
+                  f"{r['p99_ms']:>8.3f} ms{r['rest_per_op']:>9.2f}{r['errors']:>8}")
+
+async def play(user_ids: list, ops: int, rest: FakeREST, rng: random.Random) -> Results:
+    results = Results(rest)
+    bot.event_manager.subscribe(hikari.ExceptionEvent, results.on_exception)
+    players = rng.sample(user_ids, min(ops, len(user_ids)))
+
+    await results.run("message", "MESSAGE_CREATE",
+                      (message_payload(next(_snowflakes), rng.choice(user_ids), "gm") for _ in range(ops)))
+
+    # Slots: open machines, then spin on the ones still open (a new machine replaces the player's last one).
+    started = await results.run("/slots", "INTERACTION_CREATE",
+                                (command(uid, "slots") for uid in itertools.islice(itertools.cycle(players), ops)))
+    machines = [(int(p["member"]["user"]["id"]), rest.messages[p["token"]]) for p in started]
+    machines = [(uid, msg_id) for uid, msg_id in machines if str(msg_id) in SLOT_GAMES]
+    await results.run("button slots_spin", "INTERACTION_CREATE",
+                      (button(uid, "slots_spin", msg_id)
+                       for uid, msg_id in itertools.islice(itertools.cycle(machines), ops)))
+    await results.run("button slots_auto_10", "INTERACTION_CREATE",
+                      (button(uid, "slots_auto_10", msg_id) for uid, msg_id in machines[:max(1, ops // 10)]))
+
+    # Blackjack: deal, hit once on every hand still open (naturals settle at once), then stand on the survivors.
+    dealt = await results.run("/blackjack", "INTERACTION_CREATE",
+                              (command(uid, "blackjack", bet=10) for uid in itertools.islice(itertools.cycle(players), ops)))
+    hands = [(int(p["member"]["user"]["id"]), rest.messages[p["token"]]) for p in dealt]
+    hands = [(uid, msg_id) for uid, msg_id in hands if str(msg_id) in GAMES]
+    await results.run("button bj_hit", "INTERACTION_CREATE",
+                      (button(uid, "bj_hit", msg_id) for uid, msg_id in hands))
+    hands = [(uid, msg_id) for uid, msg_id in hands if str(msg_id) in GAMES]
+    await results.run("button bj_stand", "INTERACTION_CREATE",
+                      (button(uid, "bj_stand", msg_id) for uid, msg_id in hands))
+
+    # Predictions: every host opens one, voters click a button and submit the bet modal,
+    # and the hosts resolve them. A host can have at most 5 open at once.
+    count = max(1, ops // 20)
+    hosts = [players[i % len(players)] for i in range(count)]
+    opened = await results.run("/predi", "INTERACTION_CREATE",
+                               (command(uid, "predi", prediction=f"event {i} happens") for i, uid in enumerate(hosts)))
+    events = [rest.messages[p["token"]] for p in opened]
+    # Each voter votes at most once per event.
+    ballots = [(uid, msg_id) for msg_id in events
+               for uid in rng.sample(user_ids, min(len(user_ids), -(-ops // len(events))))][:ops]
+    await results.run("button predi_yes/no", "INTERACTION_CREATE",
+                      (button(uid, rng.choice(("predi_yes", "predi_no")), msg_id) for uid, msg_id in ballots))
+    await results.run("modal predi_bet", "INTERACTION_CREATE",
+                      (modal(uid, f"predi_bet_{rng.choice(('YES', 'NO'))}_{msg_id}", {"bet_amount": str(rng.randint(10, 500))})
+                       for uid, msg_id in ballots))
+    # Predictions can only be resolved after a minute; age them instead of waiting.
+    for msg_id in events:
+        predictions.get(str(msg_id))["timestamp"] -= 120
+    await results.run("/predi-outcome", "INTERACTION_CREATE",
+                      (command(uid, "predi-outcome", prediction_id=str(msg_id), result=rng.choice(("YES", "NO")))
+                       for uid, msg_id in zip(hosts, events)))
+    bot.event_manager.unsubscribe(hikari.ExceptionEvent, results.on_exception)
+    return results
+
+async def run_size(user_ids: list, ops: int, rest: FakeREST, seed: int) -> Results:
+    await bot_main.on_started(None)
+    try:
+        return await play(user_ids, ops, rest, random.Random(seed))
+    finally:
+        await bot_main.on_stopping(None)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--store", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rest = FakeREST()
+    rest.install()
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Throwaway stores, so the benchmark never touches real profiles or predictions.
+            if args.store == "json":
+                points.store = JsonStore(os.path.join(tmp, "profiles.json"))
+            else:
+                points.store = SqliteStore(os.path.join(tmp, "profiles.db"))
+            predictions.path = os.path.join(tmp, "predictions.json")
+            user_ids = [FIRST_USER_ID + i for i in range(size)]
+            points.store.apply([(uid, STARTING_POINTS, 0) for uid in user_ids], "benchmark seed")
+            points.store.flush()
+
+            print(f"{size:,} profiles ({args.store}):")
+            results = asyncio.run(run_size(user_ids, args.ops, rest, args.seed))
+            results.print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Event-loop lag during a storm of prediction votes: saving inline vs. the background file writer.
+
+Usage:
+    python -m benchmarks.persistence [--votes 500] [--events 20] [--prefill 500]
+
+A probe task sleeps 1 ms at a time and records how late it wakes up, while 50
+handlers cast votes (each pausing 1 ms between votes, like a REST round trip) on
+predictions that already hold `--prefill` votes each. "inline" rewrites
+predictions.json inside every vote, as the store used to; "writer" queues the write
+with gambling.writer. Lag is how far past its 1 ms the probe's sleep ran.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from gambling.predictions import PredictionStore
+from gambling.storage import write_file
+from gambling.writer import FileWriter
+import gambling.predictions
+
+PROBE_INTERVAL = 0.001
+
+class InlineStore(PredictionStore):
+    """The old save: serialize and rewrite the whole file before returning."""
+
+    def save(self) -> None:
+        self._active()
+        write_file(self.path, json.dumps(self._data, indent=4))
+
+def prefill(path: str, events: int, votes: int) -> list:
+    rng = random.Random(1)
+    data = {"active": {}}
+    for e in range(events):
+        data["active"][str(1_000_000 + e)] = {
+            "prediction": f"prediction {e}",
+            "min_gamble": 0,
+            "votes": {str(200_000_000_000_000_000 + v): {"vote": rng.choice(("YES", "NO")), "bet": rng.randint(1, 500)}
+                      for v in range(votes)},
+            "host": "1",
+            "timestamp": time.time(),
+        }
+    write_file(path, json.dumps(data, indent=4))
+    return list(data["active"])
+
+async def storm(store: PredictionStore, msg_ids: list, votes: int, handlers: int = 50) -> float:
+    """Cast `votes` new votes from concurrent handlers. Returns the elapsed seconds."""
+    async def handler(worker: int) -> None:
+        for i in range(worker, votes, handlers):
+            store.add_vote(msg_ids[i % len(msg_ids)], str(300_000_000_000_000_000 + i), "YES", 10)
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(w) for w in range(handlers)))
+    return time.perf_counter() - start
+
+async def measure(store: PredictionStore, msg_ids: list, votes: int) -> dict:
+    lags = []
+    done = False
+
+    async def probe() -> None:
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0.05)
+    elapsed = await storm(store, msg_ids, votes)
+    done = True
+    await probe_task
+    lags.sort()
+    return {
+        "votes_per_s": votes / elapsed,
+        "p50_ms": lags[len(lags) // 2] * 1000,
+        "p99_ms": lags[int(len(lags) * 0.99)] * 1000,
+        "max_ms": lags[-1] * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--votes", type=int, default=500)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--prefill", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "predictions.json")
+        print(f"{'':<10}{'votes/s':>10}{'lag p50':>12}{'lag p99':>12}{'lag max':>12}{'file writes':>14}")
+        for name in ("inline", "writer"):
+            msg_ids = prefill(path, args.events, args.prefill)
+            writer = FileWriter()
+            gambling.predictions.file_writer = writer
+            store = (InlineStore if name == "inline" else PredictionStore)(path)
+            store.load()
+            r = asyncio.run(measure(store, msg_ids, args.votes))
+            writer.close()
+            writes = args.votes if name == "inline" else writer.written
+            print(f"{name:<10}{r['votes_per_s']:>10,.0f}{r['p50_ms']:>9.2f} ms{r['p99_ms']:>9.2f} ms"
+                  f"{r['max_ms']:>9.2f} ms{writes:>14,}")
+            # Both paths must leave every vote on disk.
+            saved = json.load(open(path))["active"]
+            assert sum(len(e["votes"]) for e in saved.values()) == args.events * args.prefill + args.votes
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Memory used by 100k profiles: the old dict-of-dicts vs. Profile records.
+
+Usage:
+    python -m benchmarks.profile_memory [--count 100000]
+
+Each layout is loaded in a fresh subprocess from the same profiles.json text,
+once to measure RSS growth and once under tracemalloc to count allocated bytes
+(tracemalloc's own bookkeeping would inflate RSS, so the two are kept apart).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tracemalloc
+
+from gambling.profile import Profile
+from gambling.storage import decode_profile
+
+LAYOUTS = ("dicts", "slots")
+
+def profiles_json(count: int) -> str:
+    rng = random.Random(1)
+    return json.dumps({
+        str(uid): Profile(uid, points=rng.randint(0, 5000)).to_dict()
+        for uid in range(100_000_000_000_000_000, 100_000_000_000_000_000 + count)
+    })
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), falling back to peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def load(layout: str, text: str) -> dict:
+    """Load profiles the way the old code (dicts) or JsonStore (slots) does."""
+    if layout == "dicts":
+        return json.loads(text)
+    raw = json.loads(text, object_hook=decode_profile)
+    return {int(uid): profile for uid, profile in raw.items()}
+
+def measure(layout: str, metric: str, count: int) -> int:
+    """Run inside the subprocess: bytes used by `count` profiles in `layout`."""
+    text = profiles_json(count)
+    if metric == "traced":
+        tracemalloc.start()
+        profiles = load(layout, text)
+        used = tracemalloc.get_traced_memory()[0]
+    else:
+        before = rss_bytes()
+        profiles = load(layout, text)
+        used = rss_bytes() - before
+    assert len(profiles) == count
+    return used
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--layout", choices=LAYOUTS, help=argparse.SUPPRESS)
+    parser.add_argument("--metric", choices=("rss", "traced"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.layout:
+        print(measure(args.layout, args.metric, args.count))
+        return
+
+    scale = 100_000 / args.count
+    print(f"{args.count} profiles:")
+    for layout in LAYOUTS:
+        line = f"  {layout:<6}"
+        for metric in ("rss", "traced"):
+            used = int(subprocess.run(
+                [sys.executable, "-m", "benchmarks.profile_memory",
+                 "--layout", layout, "--metric", metric, "--count", str(args.count)],
+                capture_output=True, text=True, check=True
+            ).stdout)
+            line += f"   {metric} {used * scale / 2**20:>6.1f} MiB/100k ({used / args.count:>4.0f} B each)"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Settling a prediction with many voters: per-voter payouts vs. the settlement engine.
+
+Usage:
+    python -m benchmarks.settlement [--voters 10000]
+
+"per-voter" is the old PrediOutcome loop (a get_points/update_points pair per winner);
+"engine" is settle() plus one batched ledger transaction. Both run against each store.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from gambling.settlement import settle
+from gambling.storage import JsonStore, SqliteStore
+import gambling.points as points
+
+def make_votes(count: int) -> dict:
+    rng = random.Random(1)
+    return {
+        str(200_000_000_000_000_000 + i): {"vote": rng.choice(("YES", "NO")), "bet": rng.randint(1, 500), "staked": True}
+        for i in range(count)
+    }
+
+def per_voter(votes: dict, outcome: str) -> None:
+    for user_id, vote_data in votes.items():
+        bet = int(vote_data["bet"])
+        if vote_data["vote"] == outcome:
+            points.update_points(int(user_id), points.get_points(int(user_id)) + bet * 2)
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voters", type=int, default=10_000)
+    args = parser.parse_args()
+
+    votes = make_votes(args.voters)
+    print(f"{args.voters} voters:")
+    for kind in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Point the ledger at a throwaway store so the benchmark never touches real profiles.
+            if kind == "json":
+                points.store = JsonStore(os.path.join(tmp, "profiles.json"), flush_interval=0)
+            else:
+                points.store = SqliteStore(os.path.join(tmp, "profiles.db"))
+            for user_id in votes:
+                points.get_profile(int(user_id))
+
+            print(f"  {kind}:")
+            print(f"    per-voter       {timed(lambda: per_voter(votes, 'YES')):>8.1f} ms")
+            for odds in ("fixed", "pool"):
+                settlement = None
+                def compute():
+                    nonlocal settlement
+                    settlement = settle(votes, "YES", odds)
+                compute_ms = timed(compute)
+                apply_ms = timed(settlement.apply)
+                print(f"    engine ({odds:<5})  {compute_ms + apply_ms:>8.1f} ms  (compute {compute_ms:.1f} ms, apply {apply_ms:.1f} ms)")
+            points.store.close()
+
+if __name__ == "__main__":
+    main()
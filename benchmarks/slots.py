@@ -0,0 +1,69 @@
+"""
+Slot spin throughput: the original per-spin code vs. SlotMachine.spin_many.
+
+Usage:
+    python -m benchmarks.slots [--spins 1000000] [--bet 10]
+
+"legacy" is the original SlotMachine (random.choices per row, payouts rebuilt on
+every check_wins call); "single" is SlotMachine.spin + check_wins one grid at a
+time; "spin_many" draws and scores every grid in one batch.
+"""
+import argparse
+import random
+import time
+
+from gambling.slot_machine import PAYOUTS, SYMBOLS, WEIGHTS, SlotMachine
+
+# The per-spin paths are far slower, so they get fewer spins.
+PER_SPIN_MAX = 50_000
+
+class LegacySlotMachine:
+    """The pre-engine SlotMachine from plugins/slots.py."""
+
+    def spin(self, bet: int) -> list:
+        return [random.choices(SYMBOLS, weights=WEIGHTS, k=3) for _ in range(3)]
+
+    def check_wins(self, grid: list, bet: int) -> int:
+        payouts = {symbol: int(m * bet) for symbol, m in zip(SYMBOLS, PAYOUTS)}
+        winning_amount = 0
+        for row in grid:
+            if len(set(row)) == 1:
+                winning_amount += payouts[row[0]]
+        for c in range(3):
+            column = [grid[r][c] for r in range(3)]
+            if len(set(column)) == 1:
+                winning_amount += payouts[column[0]]
+        if grid[0][0] == grid[1][1] == grid[2][2]:
+            winning_amount += payouts[grid[0][0]]
+        if grid[2][0] == grid[1][1] == grid[0][2]:
+            winning_amount += payouts[grid[2][0]]
+        return winning_amount
+
+def per_spin(machine, spins: int, bet: int) -> tuple:
+    """Returns (seconds, total winnings)."""
+    start = time.perf_counter()
+    total = 0
+    for _ in range(spins):
+        total += machine.check_wins(machine.spin(bet), bet)
+    return time.perf_counter() - start, total
+
+def report(name: str, spins: int, bet: int, seconds: float, total: int) -> None:
+    print(f"  {name:<10} {spins / seconds / 1e6:>8.3f} M spins/s   return {total / (spins * bet):.4f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spins", type=int, default=1_000_000)
+    parser.add_argument("--bet", type=int, default=10)
+    args = parser.parse_args()
+
+    few = min(args.spins, PER_SPIN_MAX)
+    print(f"bet {args.bet}:")
+    report("legacy", few, args.bet, *per_spin(LegacySlotMachine(), few, args.bet))
+    machine = SlotMachine(seed=1)
+    report("single", few, args.bet, *per_spin(machine, few, args.bet))
+    start = time.perf_counter()
+    _, winnings = machine.spin_many(args.spins, args.bet)
+    report("spin_many", args.spins, args.bet, time.perf_counter() - start, int(winnings.sum()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Per-operation latency of the profile stores at 1k, 10k and 100k profiles.
+
+Usage:
+    python -m benchmarks.storage [--sizes 1000 10000 100000] [--ops 2000]
+
+Compares the original load-and-rewrite-per-call JSON functions ("legacy"),
+the journaled JsonStore and the SqliteStore. For the JSON store, "flush" appends
+the buffered journal lines and "compact" rewrites the snapshot.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from gambling.profile import Profile
+from gambling.storage import JsonStore, SqliteStore, load_profiles, save_profiles
+
+# The legacy path rewrites the whole file per call, so it gets far fewer iterations.
+LEGACY_MAX_OPS = 20
+
+def make_profiles(count: int) -> dict:
+    profiles = {}
+    for i in range(count):
+        uid = 100_000_000_000_000_000 + i
+        profiles[str(uid)] = Profile(uid, points=random.randint(0, 5000)).to_dict()
+    return profiles
+
+class LegacyStore:
+    """The pre-cache gambling.points behaviour: load and rewrite profiles.json on every call."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get_points(self, user_id: int) -> int:
+        profiles = load_profiles(self.path)
+        return profiles.get(str(user_id), {}).get("points", 0)
+
+    def add_points(self, user_id: int, amount: int) -> None:
+        profiles = load_profiles(self.path)
+        profiles.setdefault(str(user_id), Profile(user_id).to_dict())["points"] += amount
+        save_profiles(profiles, self.path)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+def time_op(fn, user_ids: list) -> float:
+    """Return the mean latency of `fn(uid)` over `user_ids`, in microseconds."""
+    start = time.perf_counter()
+    for uid in user_ids:
+        fn(uid)
+    return (time.perf_counter() - start) / len(user_ids) * 1e6
+
+def bench_store(name: str, store, ids: list, ops: int) -> None:
+    sample = random.choices(ids, k=ops)
+    get_us = time_op(store.get_points, sample)
+    add_us = time_op(lambda uid: store.add_points(uid, 2), sample)
+    start = time.perf_counter()
+    store.flush()
+    flush_ms = (time.perf_counter() - start) * 1000
+    line = f"  {name:<8} get_points {get_us:>10.1f} us   add_points {add_us:>10.1f} us   flush {flush_ms:>8.1f} ms"
+    if hasattr(store, "compact"):
+        start = time.perf_counter()
+        store.compact()
+        line += f"   compact {(time.perf_counter() - start) * 1000:>8.1f} ms"
+    print(line)
+
+def run(size: int, ops: int) -> None:
+    print(f"{size} profiles:")
+    profiles = make_profiles(size)
+    ids = [int(uid) for uid in profiles]
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "profiles.json")
+        with open(json_path, "w") as f:
+            json.dump(profiles, f, indent=4)
+
+        bench_store("legacy", LegacyStore(json_path), ids, min(ops, LEGACY_MAX_OPS))
+
+        json_store = JsonStore(json_path, flush_interval=0)
+        json_store.get_points(ids[0])  # load outside the timed section
+        bench_store("json", json_store, ids, ops)
+        json_store.close()
+
+        sqlite_store = SqliteStore(os.path.join(tmp, "profiles.db"))
+        sqlite_store.import_profiles({int(uid): Profile.from_dict(data) for uid, data in profiles.items()})
+        bench_store("sqlite", sqlite_store, ids, ops)
+        sqlite_store.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--ops", type=int, default=2_000)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.ops)
+
+if __name__ == "__main__":
+    main()
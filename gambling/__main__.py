@@ -1,32 +1,184 @@
 import asyncio
+import math
 import os
-import time
 import hikari
 import crescent
 
 from gambling.client_instance import bot, client, guild_id
-from gambling.points import get_points, add_point
+from gambling.points import get_points, preload as preload_points, shutdown as shutdown_points
+from gambling.activity import accrual
+from gambling.members import member_names
+from gambling import sessions
+from gambling.router import router
+from gambling.latency import LOOP_LAG, latency
+from gambling.predictions import predictions
+from gambling.writer import file_writer
+from gambling.locks import user_locks
+from gambling import metrics
+from gambling.profiling import PROFILING_SECONDS, profiler
+
+# Discord's limit on message length.
+MAX_MESSAGE_LENGTH = 2000
+
+def latency_line(label: str, histogram) -> str:
+    s = histogram.summary()
+    if not histogram.samples:
+        return f"**{label}:** no data yet"
+    return f"**{label}:** p50 `{s['p50_ms']:.1f}ms` · p95 `{s['p95_ms']:.1f}ms` · p99 `{s['p99_ms']:.1f}ms` ({s['count']} samples)"
 
 @client.include
 @crescent.command(name="ping", description="Check bot latency", guild=guild_id)
-async def ping(ctx: crescent.Context) -> None:
-    start = time.perf_counter()
-    await asyncio.sleep(0)
-    end = time.perf_counter()
-    latency = (end - start) * 1000
-    await ctx.respond(f"Pong! `{latency:.2f}ms`")
+class Ping:
+    details: bool = crescent.option(bool, "Break handler and REST latency down per command (admins only)", default=False)
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        heartbeat = bot.heartbeat_latency * 1000
+        lines = [
+            "🏓 **Pong!**",
+            "**Gateway heartbeat:** " + ("not connected" if math.isnan(heartbeat) else f"`{heartbeat:.0f}ms`"),
+            latency_line("Event loop lag", latency.histogram(LOOP_LAG)),
+            latency_line("REST calls", latency.combined("rest")),
+            latency_line("Commands", latency.combined("command")),
+            latency_line("Buttons and modals", latency.combined("interaction")),
+        ]
+        if not self.details:
+            await ctx.respond("\n".join(lines))
+            return
+        if ctx.member is None or hikari.Permissions.ADMINISTRATOR not in ctx.member.permissions:
+            await ctx.respond("❌ Only admins can see the breakdown.", flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        # Slowest first, by p95.
+        for kind in ("command", "interaction", "rest"):
+            rows = sorted(latency.summary(kind).items(), key=lambda item: -item[1]["p95_ms"])
+            lines.append("")
+            lines.extend(latency_line(name.split(":", 1)[1], latency.histogram(name)) for name, _ in rows[:5])
+        content = "\n".join(lines)
+        await ctx.respond(content[:MAX_MESSAGE_LENGTH], flags=hikari.MessageFlag.EPHEMERAL)
+
+@client.include
+@crescent.command(name="profiler", description="Profile command and event handlers for a while (admins only)", guild=guild_id)
+class Profiler:
+    seconds: int = crescent.option(int, "How long to profile for; 0 stops now and writes the report", default=60, min_value=0, max_value=3600)
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        if ctx.member is None or hikari.Permissions.ADMINISTRATOR not in ctx.member.permissions:
+            await ctx.respond("❌ Only admins can run the profiler.", flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        if self.seconds == 0:
+            directory = await profiler.stop()
+            message = "The profiler isn't running." if directory is None else f"Profile written to `{directory}`."
+        elif profiler.running:
+            message = "The profiler is already running; stop it with `seconds: 0` first."
+        else:
+            profiler.start(self.seconds)
+            message = f"Profiling for {self.seconds}s; the report goes under `{profiler.directory}`."
+        await ctx.respond(message, flags=hikari.MessageFlag.EPHEMERAL)
 
 @bot.listen(hikari.MessageCreateEvent)
 async def on_message(event: hikari.MessageCreateEvent) -> None:
     if event.is_bot or event.guild_id is None:
         return
-    add_point(event.author.id)
-    print(f"{event.author.username} now has {get_points(event.author.id)} points.")
-    
+    # Only counted here; the points are credited in batches by the accrual task.
+    accrual.record(event.author.id)
+
+@bot.listen(hikari.InteractionCreateEvent)
+async def on_interaction(event: hikari.InteractionCreateEvent) -> None:
+    # Buttons and modals go to the handler registered for their custom_id; commands are left to crescent.
+    await router.dispatch(event.interaction)
+
+# Keep cached display names current from the gateway.
+@bot.listen(hikari.MemberCreateEvent)
+async def on_member_create(event: hikari.MemberCreateEvent) -> None:
+    member_names.put_member(event.member)
+
+@bot.listen(hikari.MemberUpdateEvent)
+async def on_member_update(event: hikari.MemberUpdateEvent) -> None:
+    member_names.put_member(event.member)
+
+@bot.listen(hikari.MemberDeleteEvent)
+async def on_member_delete(event: hikari.MemberDeleteEvent) -> None:
+    member_names.discard(int(event.user_id))
+
+@bot.listen(hikari.MemberChunkEvent)
+async def on_member_chunk(event: hikari.MemberChunkEvent) -> None:
+    for member in event.members.values():
+        member_names.put_member(member)
+
 @client.include
 @crescent.command(name="points", description="Check your points", guild=guild_id)
 async def points(ctx: crescent.Context) -> None:
-    await ctx.respond(f"You have {get_points(ctx.interaction.user.id)} points!")
+    user_id = ctx.interaction.user.id
+    await ctx.respond(f"You have {get_points(user_id) + accrual.pending_points(user_id)} points!")
+
+@metrics.collector
+def collect_stats() -> list:
+    """Metrics read from the counters the bot already keeps, when /metrics is scraped."""
+    routes = router.routes()
+    session_stats = sessions.stats()
+    activity = accrual.stats()
+    names = member_names.stats()
+    writes = file_writer.stats()
+    return [
+        ("gamble_interactions_total", "counter", "Button and modal interactions handled, by route.",
+         [({"route": r.pattern}, r.calls) for r in routes]),
+        ("gamble_interaction_errors_total", "counter", "Button and modal handlers that raised, by route.",
+         [({"route": r.pattern}, r.errors) for r in routes]),
+        ("gamble_unrouted_interactions_total", "counter", "Button and modal interactions no route matched.",
+         [({}, router.unrouted)]),
+        ("gamble_sessions", "gauge", "Live game sessions, by game.",
+         [({"game": name}, s["live"]) for name, s in session_stats.items()]),
+        ("gamble_session_evictions_total", "counter", "Game sessions expired for inactivity, by game.",
+         [({"game": name}, s["evictions"]) for name, s in session_stats.items()]),
+        ("gamble_user_lock_contended_total", "counter", "Interactions that waited on the same user's previous one.",
+         [({}, user_locks.contended)]),
+        ("gamble_user_lock_timeouts_total", "counter", "Interactions turned away after waiting too long.",
+         [({}, user_locks.timeouts)]),
+        ("gamble_user_lock_wait_seconds_total", "counter", "Time spent waiting on per-user locks.",
+         [({}, user_locks.wait_seconds)]),
+        ("gamble_file_writes_total", "counter", "Whole-file writes made by the background writer.",
+         [({}, writes["written"])]),
+        ("gamble_file_writes_coalesced_total", "counter", "Writes folded into a later write of the same file.",
+         [({}, writes["coalesced"])]),
+        ("gamble_activity_points_total", "counter", "Points credited for chat messages.",
+         [({}, activity["points_credited"])]),
+        ("gamble_member_cache_lookups_total", "counter", "Display-name cache lookups, by result.",
+         [({"result": "hit"}, names["hits"]), ({"result": "miss"}, names["misses"])]),
+        ("gamble_latency_seconds", "gauge", "Recent latency percentiles, as shown by /ping.",
+         [({"name": name, "quantile": q}, s[key] / 1000)
+          for name, s in latency.summary().items()
+          for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms"))]),
+    ]
+
+def register_profiled_handlers() -> None:
+    """Tell the profiler which functions are handlers: commands, routes, and the hot listeners."""
+    profiler.register_commands()
+    for route in router.routes():
+        profiler.register(f"interaction:{route.pattern}", route.handler)
+    profiler.register("event:MessageCreateEvent", on_message)
+    profiler.register("event:InteractionCreateEvent", on_interaction)
+
+@bot.listen(hikari.StartedEvent)
+async def on_started(event: hikari.StartedEvent) -> None:
+    # Read the saved profiles and predictions off the event loop, before the first interaction needs them.
+    await asyncio.gather(asyncio.to_thread(preload_points), asyncio.to_thread(predictions.load))
+    accrual.start()
+    sessions.start_all()
+    latency.start(bot)
+    await metrics.start()
+    register_profiled_handlers()
+    if PROFILING_SECONDS > 0:
+        profiler.start(PROFILING_SECONDS)
+
+@bot.listen(hikari.StoppingEvent)
+async def on_stopping(event: hikari.StoppingEvent) -> None:
+    # Credit pending message points, then write any profile changes still waiting for the background flush.
+    await metrics.stop()
+    await profiler.stop()
+    await latency.stop()
+    await sessions.stop_all()
+    await accrual.stop()
+    shutdown_points()
+    file_writer.close()
 
 if __name__ == "__main__":
     if os.name == "nt":
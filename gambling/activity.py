@@ -0,0 +1,135 @@
+import os
+import asyncio
+import logging
+
+from gambling.points import Transaction
+
+# Points awarded for each guild message.
+POINTS_PER_MESSAGE = 2
+# Flush accrued points every N seconds...
+FLUSH_INTERVAL = float(os.environ.get("ACTIVITY_FLUSH_INTERVAL", "5"))
+# ...or as soon as M messages are waiting, whichever comes first.
+FLUSH_EVENTS = int(os.environ.get("ACTIVITY_FLUSH_EVENTS", "1000"))
+
+logger = logging.getLogger(__name__)
+
+class ActivityAccrual:
+    """
+    Counts messages per user in memory and credits the points in one batched write.
+
+    `record` only bumps a counter, so the message listener never touches the store.
+    A background task flushes the counts every `flush_interval` seconds, or early
+    once `flush_events` messages are pending.
+    """
+
+    def __init__(self, points_per_message: int = POINTS_PER_MESSAGE,
+                 flush_interval: float = FLUSH_INTERVAL, flush_events: int = FLUSH_EVENTS):
+        self.points_per_message = points_per_message
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+        # {user_id: messages since the last flush}
+        self.pending = {}
+        self.pending_events = 0
+        # Counters.
+        self.events_accepted = 0
+        self.flushes = 0
+        self.points_credited = 0
+        self._task = None
+        self._wake = None
+        self._closing = False
+
+    def record(self, user_id: int) -> None:
+        """Count one message from the user."""
+        self.pending[user_id] = self.pending.get(user_id, 0) + 1
+        self.pending_events += 1
+        self.events_accepted += 1
+        if self.pending_events >= self.flush_events and self._wake is not None:
+            self._wake.set()
+
+    def pending_points(self, user_id: int) -> int:
+        """Points the user has earned that haven't been written to the store yet."""
+        return self.pending.get(user_id, 0) * self.points_per_message
+
+    def _take(self) -> dict:
+        """Swap out the pending counts. Must run on the event loop, where `record` runs."""
+        pending, self.pending = self.pending, {}
+        self.pending_events = 0
+        return pending
+
+    def _restore(self, pending: dict) -> None:
+        """Put back counts whose write failed, so the next flush retries them."""
+        for user_id, messages in pending.items():
+            self.pending[user_id] = self.pending.get(user_id, 0) + messages
+        self.pending_events += sum(pending.values())
+
+    def _write(self, pending: dict) -> None:
+        tx = Transaction("message activity")
+        for user_id, messages in pending.items():
+            tx.credit(user_id, messages * self.points_per_message)
+        tx.commit()
+
+    def _count_flush(self, pending: dict) -> None:
+        self.flushes += 1
+        self.points_credited += sum(pending.values()) * self.points_per_message
+
+    def flush(self) -> int:
+        """Credit all pending messages in one transaction. Returns the number of users credited."""
+        if not self.pending:
+            return 0
+        pending = self._take()
+        try:
+            self._write(pending)
+        except Exception:
+            self._restore(pending)
+            raise
+        self._count_flush(pending)
+        return len(pending)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self.pending:
+                pending = self._take()
+                try:
+                    # Write the batch from a worker thread so a slow store can't stall the gateway.
+                    await asyncio.to_thread(self._write, pending)
+                    self._count_flush(pending)
+                except Exception:
+                    # Messages counted meanwhile were added to the new dict; merge the batch back in.
+                    self._restore(pending)
+                    logger.exception("Failed to flush message points for %d users; retrying next flush", len(pending))
+            if self._closing:
+                return
+
+    def start(self) -> None:
+        """Start the background flush task on the running event loop."""
+        if self._task is None:
+            self._closing = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still pending."""
+        if self._task is not None:
+            # Let the task finish its current write instead of cancelling it halfway.
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+            self._wake = None
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "events_accepted": self.events_accepted,
+            "events_pending": self.pending_events,
+            "flushes": self.flushes,
+            "points_credited": self.points_credited,
+        }
+
+# Shared accrual pipeline used by the message listener.
+accrual = ActivityAccrual()
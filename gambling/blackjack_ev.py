@@ -0,0 +1,89 @@
+"""
+Exact expected values of blackjack moves, for the optional hint line in /blackjack.
+
+Everything is worked out by dynamic programming over the infinite-deck rules in
+cards.py (dealer stands on soft 17) and memoized, so after the first lookup for a
+state a hint is a few dict lookups. EVs are per unit of the original bet.
+"""
+from functools import lru_cache
+
+from gambling.cards import DECK, DEALER_STANDS_ON, VALUES, WIN_PAYOUT, add_card
+
+# One card per blackjack value (Aces as 11) with its chance from an infinite deck.
+CARD_ODDS = tuple(
+    (next(c for c in DECK if VALUES[c] == value), sum(VALUES[c] == value for c in DECK) / len(DECK))
+    for value in sorted(set(VALUES))
+)
+# The dealer's final totals, in the order dealer_outcomes reports them; anything else is a bust.
+DEALER_FINALS = tuple(range(DEALER_STANDS_ON, 22))
+BUST = len(DEALER_FINALS)
+
+@lru_cache(maxsize=None)
+def dealer_outcomes(total: int, soft: int) -> tuple:
+    """Chance of the dealer finishing on each of DEALER_FINALS, then busting, from (total, soft)."""
+    outcome = [0.0] * (BUST + 1)
+    if total > 21:
+        outcome[BUST] = 1.0
+    elif total >= DEALER_STANDS_ON:
+        outcome[total - DEALER_STANDS_ON] = 1.0
+    else:
+        for card, p in CARD_ODDS:
+            for i, q in enumerate(dealer_outcomes(*add_card(total, soft, card))):
+                outcome[i] += p * q
+    return tuple(outcome)
+
+@lru_cache(maxsize=None)
+def dealer_table(upcard: int) -> tuple:
+    """
+    dealer_outcomes for an upcard value, given the dealer has no blackjack (a hand is
+    only still being played if neither side had a natural).
+    """
+    start = add_card(0, 0, next(c for c in DECK if VALUES[c] == upcard))
+    outcome = [0.0] * (BUST + 1)
+    kept = 0.0
+    for card, p in CARD_ODDS:
+        total, soft = add_card(*start, card)
+        if total == 21:
+            continue
+        kept += p
+        for i, q in enumerate(dealer_outcomes(total, soft)):
+            outcome[i] += p * q
+    return tuple(x / kept for x in outcome)
+
+@lru_cache(maxsize=None)
+def stand_ev(total: int, upcard: int) -> float:
+    if total > 21:
+        return -1.0
+    outcome = dealer_table(upcard)
+    ev = outcome[BUST] * WIN_PAYOUT
+    for final, p in zip(DEALER_FINALS, outcome):
+        if total > final:
+            ev += p * WIN_PAYOUT
+        elif total < final:
+            ev -= p
+    return ev
+
+@lru_cache(maxsize=None)
+def hit_ev(total: int, soft: int, upcard: int) -> float:
+    """Take one card, then keep hitting or standing, whichever is better."""
+    ev = 0.0
+    for card, p in CARD_ODDS:
+        new_total, new_soft = add_card(total, soft, card)
+        if new_total > 21:
+            ev -= p
+        else:
+            ev += p * max(stand_ev(new_total, upcard), hit_ev(new_total, new_soft, upcard))
+    return ev
+
+@lru_cache(maxsize=None)
+def double_ev(total: int, soft: int, upcard: int) -> float:
+    """Double the bet, take exactly one card and stand."""
+    return 2 * sum(p * stand_ev(add_card(total, soft, card)[0], upcard) for card, p in CARD_ODDS)
+
+def hint(total: int, soft: bool, upcard: int, can_double: bool = True) -> dict:
+    """EV of each available move for a player hand against the dealer's upcard value."""
+    soft = int(bool(soft))
+    moves = {"Hit": hit_ev(total, soft, upcard), "Stand": stand_ev(total, upcard)}
+    if can_double:
+        moves["Double"] = double_ev(total, soft, upcard)
+    return moves
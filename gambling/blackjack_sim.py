@@ -0,0 +1,268 @@
+"""
+Monte Carlo simulation of the /blackjack rules and payouts.
+
+Usage:
+    python -m gambling.blackjack_sim [--hands 1000000] [--strategy basic dealer never_bust] [--max-ev 0]
+                                     [--decks 6] [--penetration 0.75]
+
+Plays hands in NumPy batches under each player strategy and prints the
+player's expected value per unit bet with a 95% confidence interval. Exits
+with status 1 if any strategy's EV is above --max-ev beyond doubt (the whole
+interval is above it), so run it after changing the rules or payouts.
+
+Rules follow plugins/blackjack.py: a shoe of BLACKJACK_DECKS decks reshuffled
+before the first hand dealt past BLACKJACK_PENETRATION (or mid-hand if it
+runs out), the dealer stands on soft 17, naturals are settled before anyone
+acts, doubling is allowed on the first two cards only, and there are no
+splits or surrender. Each simulated player has a shoe to themselves; in the
+bot everyone shares one, which only changes whose hand a card lands in.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from gambling.cards import (
+    ACE_VALUE, BLACKJACK_PAYOUT, DEALER_STANDS_ON, SHOE_DECKS, SHOE_PENETRATION, VALUES, WIN_PAYOUT,
+)
+
+# Shoes played side by side, one hand each per NumPy batch.
+BATCH_SIZE = 1 << 14
+
+# Player actions.
+HIT, STAND, DOUBLE = 0, 1, 2
+
+class Shoes:
+    """
+    `n` independent cards.Shoe-style shoes, one per row, holding card values (Aces as 11).
+
+    Mirrors Shoe: `shuffle_used` between hands reshuffles the shoes dealt past the cut
+    card, and a shoe that runs out mid-hand reshuffles itself.
+    """
+
+    def __init__(self, rng: np.random.Generator, n: int, decks: int = SHOE_DECKS,
+                 penetration: float = SHOE_PENETRATION):
+        self.rng = rng
+        self.n = n
+        self.cards = np.tile(np.array(VALUES, dtype=np.int8), (n, decks))
+        self.cut = int(self.cards.shape[1] * penetration)
+        self.position = np.zeros(n, dtype=np.int64)
+        self._shuffle(np.arange(n))
+
+    def _shuffle(self, idx: np.ndarray) -> None:
+        self.cards[idx] = self.rng.permuted(self.cards[idx], axis=1)
+        self.position[idx] = 0
+
+    def shuffle_used(self) -> None:
+        used = np.flatnonzero(self.position >= self.cut)
+        if len(used):
+            self._shuffle(used)
+
+    def draw(self, idx: np.ndarray) -> np.ndarray:
+        """The next card's value from each shoe in `idx`."""
+        empty = idx[self.position[idx] >= self.cards.shape[1]]
+        if len(empty):
+            self._shuffle(empty)
+        values = self.cards[idx, self.position[idx]]
+        self.position[idx] += 1
+        return values
+
+def add_cards(total: np.ndarray, soft: np.ndarray, values: np.ndarray) -> None:
+    """Vectorized cards.add_card: add one card to each hand in place."""
+    total += values
+    soft += values == ACE_VALUE
+    while True:
+        fix = (total > 21) & (soft > 0)
+        if not fix.any():
+            return
+        total[fix] -= 10
+        soft[fix] -= 1
+
+# Basic strategy for these rules (no splits), indexed by dealer upcard value 2..11.
+# Rows are hard totals 4..21 and soft totals 13..21: "H"it, "S"tand, "D"ouble
+# (else hit), "d"ouble (else stand).
+HARD_STRATEGY = {total: "H" * 10 for total in range(4, 9)}
+HARD_STRATEGY.update({
+    9:  "HDDDDHHHHH",
+    10: "DDDDDDDDHH",
+    11: "DDDDDDDDDH",
+    12: "HHSSSHHHHH",
+    13: "SSSSSHHHHH",
+    14: "SSSSSHHHHH",
+    15: "SSSSSHHHHH",
+    16: "SSSSSHHHHH",
+})
+HARD_STRATEGY.update({total: "S" * 10 for total in range(17, 22)})
+SOFT_STRATEGY = {
+    12: "HHHHHHHHHH",
+    13: "HHHDDHHHHH",
+    14: "HHHDDHHHHH",
+    15: "HHDDDHHHHH",
+    16: "HHDDDHHHHH",
+    17: "HDDDDHHHHH",
+    18: "SddddSSHHH",
+    19: "SSSSSSSSSS",
+    20: "SSSSSSSSSS",
+    21: "SSSSSSSSSS",
+}
+
+def strategy_table(hard: dict, soft: dict) -> np.ndarray:
+    """
+    Turn strategy charts into an action lookup indexed by
+    [first two cards?, soft?, player total, dealer upcard value].
+    """
+    table = np.full((2, 2, 32, 12), STAND, dtype=np.int8)
+    for is_soft, chart in ((0, hard), (1, soft)):
+        for total, row in chart.items():
+            for upcard, code in zip(range(2, 12), row):
+                table[1, is_soft, total, upcard] = {"H": HIT, "S": STAND, "D": DOUBLE, "d": DOUBLE}[code]
+                # Once past the first two cards a double becomes a hit ("D") or a stand ("d").
+                table[0, is_soft, total, upcard] = {"H": HIT, "S": STAND, "D": HIT, "d": STAND}[code]
+    return table
+
+def threshold_table(hard_stand: int, soft_stand: int) -> np.ndarray:
+    """A strategy that never doubles: hit below `hard_stand` / `soft_stand`, stand from there."""
+    hard = {total: ("H" if total < hard_stand else "S") * 10 for total in range(4, 22)}
+    soft = {total: ("H" if total < soft_stand else "S") * 10 for total in range(12, 22)}
+    return strategy_table(hard, soft)
+
+STRATEGIES = {
+    "basic": strategy_table(HARD_STRATEGY, SOFT_STRATEGY),
+    # Play like the dealer: hit below 17, stand on soft 17.
+    "dealer": threshold_table(DEALER_STANDS_ON, DEALER_STANDS_ON),
+    # Only hit when the next card can't bust the hand.
+    "never_bust": threshold_table(12, 18),
+}
+
+def play_batch(shoes: Shoes, table: np.ndarray) -> dict:
+    """Play one hand from each shoe. Returns arrays of each hand's result (in bets) and how it ended."""
+    n = shoes.n
+    every = np.arange(n)
+    shoes.shuffle_used()
+    p_total = np.zeros(n, dtype=np.int16)
+    p_soft = np.zeros(n, dtype=np.int8)
+    d_total = np.zeros(n, dtype=np.int16)
+    d_soft = np.zeros(n, dtype=np.int8)
+    # Deal as the plugin does: two cards to the player, then the dealer's upcard and hole card.
+    add_cards(p_total, p_soft, shoes.draw(every))
+    add_cards(p_total, p_soft, shoes.draw(every))
+    upcard = shoes.draw(every)
+    add_cards(d_total, d_soft, upcard)
+    add_cards(d_total, d_soft, shoes.draw(every))
+
+    result = np.zeros(n, dtype=np.float64)
+    stake = np.ones(n, dtype=np.int8)
+    player_bj = p_total == 21
+    dealer_bj = d_total == 21
+    result[player_bj & ~dealer_bj] = BLACKJACK_PAYOUT
+    result[dealer_bj & ~player_bj] = -1
+    natural = player_bj | dealer_bj
+
+    # Player's turn: every hand still acting takes one action per round.
+    acting = ~natural
+    first_two = True
+    while acting.any():
+        idx = np.flatnonzero(acting)
+        action = table[int(first_two), (p_soft[idx] > 0).astype(np.int8), p_total[idx], upcard[idx]]
+        doubling = idx[action == DOUBLE]
+        stake[doubling] = 2
+        hitting = idx[action != STAND]
+        total, soft = p_total[hitting], p_soft[hitting]
+        add_cards(total, soft, shoes.draw(hitting))
+        p_total[hitting], p_soft[hitting] = total, soft
+        # Stands, doubles (one card only) and busts are done.
+        acting[idx[action == STAND]] = False
+        acting[doubling] = False
+        acting[hitting[total > 21]] = False
+        first_two = False
+
+    bust = ~natural & (p_total > 21)
+    result[bust] = -stake[bust]
+
+    # Dealer's turn, only for hands still standing.
+    live = ~natural & ~bust
+    drawing = live & (d_total < DEALER_STANDS_ON)
+    while drawing.any():
+        idx = np.flatnonzero(drawing)
+        total, soft = d_total[idx], d_soft[idx]
+        add_cards(total, soft, shoes.draw(idx))
+        d_total[idx], d_soft[idx] = total, soft
+        drawing[idx] = total < DEALER_STANDS_ON
+
+    won = live & ((d_total > 21) | (p_total > d_total))
+    lost = live & (d_total <= 21) & (p_total < d_total)
+    result[won] = WIN_PAYOUT * stake[won]
+    result[lost] = -stake[lost]
+    return {
+        "result": result,
+        "blackjack": player_bj & ~dealer_bj,
+        "won": won,
+        "push": (live & (p_total == d_total) & (d_total <= 21)) | (player_bj & dealer_bj),
+        "lost": lost | (dealer_bj & ~player_bj),
+        "bust": bust,
+        "doubled": stake == 2,
+    }
+
+def simulate(strategy: str, hands: int, seed=None, decks: int = SHOE_DECKS,
+             penetration: float = SHOE_PENETRATION) -> dict:
+    """
+    Play `hands` hands with a named strategy. Returns the EV per unit bet, its 95%
+    confidence half-width, and how often each kind of ending happened.
+    """
+    rng = np.random.default_rng(seed)
+    table = STRATEGIES[strategy]
+    shoes = Shoes(rng, min(BATCH_SIZE, hands), decks, penetration)
+    total = total_sq = 0.0
+    counts = {}
+    for start in range(0, hands, shoes.n):
+        # The last batch may play more hands than asked for; only the first ones count.
+        keep = min(shoes.n, hands - start)
+        batch = {name: values[:keep] for name, values in play_batch(shoes, table).items()}
+        result = batch.pop("result")
+        total += result.sum()
+        total_sq += (result * result).sum()
+        for name, mask in batch.items():
+            counts[name] = counts.get(name, 0) + int(mask.sum())
+    ev = total / hands
+    stdev = max(total_sq / hands - ev * ev, 0.0) ** 0.5
+    return {
+        "strategy": strategy,
+        "hands": hands,
+        "ev": ev,
+        "ci95": 1.96 * stdev / hands ** 0.5,
+        "stdev": stdev,
+        "rates": {name: count / hands for name, count in counts.items()},
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hands", type=int, default=1_000_000)
+    parser.add_argument("--strategy", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--decks", type=int, default=SHOE_DECKS, help="Decks in the shoe (default: %(default)s)")
+    parser.add_argument("--penetration", type=float, default=SHOE_PENETRATION,
+                        help="Share of the shoe dealt before reshuffling (default: %(default)s)")
+    parser.add_argument("--max-ev", type=float, default=0.0,
+                        help="Fail if a strategy's EV is surely above this (default: %(default)s)")
+    args = parser.parse_args()
+
+    print(f"Payouts: win {WIN_PAYOUT}:1, blackjack {BLACKJACK_PAYOUT}:1; dealer stands on soft {DEALER_STANDS_ON}; "
+          f"{args.decks} decks, reshuffled at {args.penetration:.0%}")
+    print(f"{'strategy':<12}{'EV per bet':>22}{'hands/s':>12}   " +
+          "  ".join(f"{name:>9}" for name in ("blackjack", "won", "push", "lost", "bust", "doubled")))
+    leaking = []
+    for strategy in args.strategy:
+        start = time.perf_counter()
+        r = simulate(strategy, args.hands, args.seed, args.decks, args.penetration)
+        rate = args.hands / (time.perf_counter() - start)
+        print(f"{strategy:<12}{r['ev']:>+12.4%} ± {r['ci95']:.4%}{rate:>12,.0f}   " +
+              "  ".join(f"{r['rates'][name]:>9.2%}" for name in ("blackjack", "won", "push", "lost", "bust", "doubled")))
+        if r["ev"] - r["ci95"] > args.max_ev:
+            leaking.append(strategy)
+    if leaking:
+        print(f"\nPlayer EV is above {args.max_ev:+.2%} for {', '.join(leaking)}.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
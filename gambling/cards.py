@@ -0,0 +1,145 @@
+import os
+from typing import List
+
+import numpy as np
+
+# Card definitions. A card is a small int: rank index * 4 + suit index, so 0..51.
+RANKS = ['Ace', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King']
+SUITS = ["Hearts", "Spades", "Clubs", "Diamonds"]
+DECK = tuple(range(len(RANKS) * len(SUITS)))
+
+# Blackjack value of each card; Aces count 11 until that would bust the hand.
+VALUES = tuple(11 if RANKS[c // 4] == 'Ace' else min(c // 4 + 1, 10) for c in DECK)
+ACE_VALUE = 11
+# Display names, only used when rendering a hand.
+CARD_NAMES = tuple(f"{RANKS[c // 4]} of {SUITS[c % 4]}" for c in DECK)
+
+# Decks in the shoe, and how far through it to deal before reshuffling.
+SHOE_DECKS = int(os.environ.get("BLACKJACK_DECKS", "6"))
+SHOE_PENETRATION = float(os.environ.get("BLACKJACK_PENETRATION", "0.75"))
+
+# The dealer hits until reaching this total, and stands on soft 17.
+DEALER_STANDS_ON = 17
+# Winnings as a multiple of the bet, on top of the returned stake.
+WIN_PAYOUT = 1
+BLACKJACK_PAYOUT = 1.5
+
+def hand_to_str(cards) -> str:
+    """Return a string representation of a hand."""
+    return ", ".join(CARD_NAMES[c] for c in cards)
+
+def add_card(total: int, soft: int, card: int) -> tuple:
+    """
+    Add a card to a hand's running total. `soft` is the number of Aces still counted
+    as 11 (0 or 1 once the hand is settled). Returns the new (total, soft).
+    """
+    value = VALUES[card]
+    total += value
+    if value == ACE_VALUE:
+        soft += 1
+    while total > 21 and soft:
+        total -= 10
+        soft -= 1
+    return total, soft
+
+class Hand:
+    """A blackjack hand that keeps its total up to date as cards are added."""
+
+    __slots__ = ("cards", "total", "soft")
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.total = 0
+        # Aces currently counted as 11.
+        self.soft = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card: int) -> int:
+        """Add a card and return the new total."""
+        # Same as add_card, inlined since this runs on every hit.
+        self.cards.append(card)
+        value = VALUES[card]
+        total = self.total + value
+        if value == ACE_VALUE:
+            self.soft += 1
+        while total > 21 and self.soft:
+            total -= 10
+            self.soft -= 1
+        self.total = total
+        return total
+
+    @property
+    def is_soft(self) -> bool:
+        return self.soft > 0
+
+    @property
+    def is_bust(self) -> bool:
+        return self.total > 21
+
+    @property
+    def is_blackjack(self) -> bool:
+        """A two-card 21."""
+        return len(self.cards) == 2 and self.total == 21
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __str__(self) -> str:
+        return hand_to_str(self.cards)
+
+    def __repr__(self) -> str:
+        return f"Hand({self.cards!r}, total={self.total})"
+
+class Shoe:
+    """
+    A multi-deck shoe dealt from a pre-shuffled array of cards.
+
+    Once more than `penetration` of the shoe has been dealt, `needs_shuffle` turns on;
+    call `shuffle` between hands. A shoe that runs out mid-hand reshuffles itself.
+    """
+
+    def __init__(self, decks: int = SHOE_DECKS, penetration: float = SHOE_PENETRATION, seed=None):
+        self.decks = decks
+        self._unshuffled = np.tile(np.array(DECK, dtype=np.int8), decks)
+        # Reshuffle once this many cards have been dealt.
+        self.cut = int(len(self._unshuffled) * penetration)
+        self.rng = np.random.default_rng(seed)
+        # Dealt from as a plain list: indexing a list is much quicker than a NumPy array.
+        self.cards = []
+        self.position = 0
+        self.shuffles = 0
+        self.shuffle()
+
+    def shuffle(self) -> None:
+        self.cards = self.rng.permutation(self._unshuffled).tolist()
+        self.position = 0
+        self.shuffles += 1
+
+    @property
+    def needs_shuffle(self) -> bool:
+        return self.position >= self.cut
+
+    @property
+    def remaining(self) -> int:
+        return len(self.cards) - self.position
+
+    def draw(self) -> int:
+        if self.position >= len(self.cards):
+            self.shuffle()
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+    def draw_many(self, amount: int) -> List[int]:
+        return [self.draw() for _ in range(amount)]
+
+    def deal(self, amount: int = 2) -> Hand:
+        """A new hand of `amount` cards."""
+        return Hand(self.draw_many(amount))
+
+def play_dealer(hand: Hand, draw) -> Hand:
+    """Dealer hits with `draw()` until reaching DEALER_STANDS_ON, standing on soft 17."""
+    while hand.total < DEALER_STANDS_ON:
+        hand.add(draw())
+    return hand
@@ -3,6 +3,9 @@ import os
 import hikari
 import crescent
 
+from gambling.latency import instrument_rest, latency
+from gambling.metrics import count_command
+
 guild_id = int(os.environ["GUILD_ID"])
 
 bot = hikari.GatewayBot(
@@ -10,5 +13,12 @@ bot = hikari.GatewayBot(
     intents=hikari.Intents.ALL
 )
 
-client = crescent.Client(bot, allow_unknown_interactions=True)
+# Time REST calls and slash commands for /ping, and count commands for the metrics endpoint.
+instrument_rest()
+client = crescent.Client(
+    bot,
+    allow_unknown_interactions=True,
+    command_hooks=[count_command, latency.command_started],
+    command_after_hooks=[latency.command_finished]
+)
 client.plugins.load_folder("gambling.plugins")
@@ -0,0 +1,42 @@
+import typing
+
+from hikari.api import special_endpoints
+
+class PrebuiltComponent(special_endpoints.ComponentBuilder):
+    """
+    A component whose JSON payload was built once up front.
+
+    hikari calls `build()` on every component each time a message is sent or updated;
+    this returns the same payload every time instead of rebuilding it. The payload is
+    shared, so it must not be changed after it's built.
+    """
+
+    __slots__ = ("_type", "_id", "_built")
+
+    def __init__(self, builder: special_endpoints.ComponentBuilder):
+        built = builder.build()
+        # hikari >= 2.3 returns (payload, attachments); older versions return the payload alone.
+        if isinstance(built, tuple):
+            payload, attachments = built
+            if attachments:
+                raise ValueError("Components with attachments can't be prebuilt")
+            built = (payload, ())
+        self._type = builder.type
+        self._id = builder.id
+        # Returned as-is by build(), in the shape this hikari version expects.
+        self._built = built
+
+    @property
+    def type(self):
+        return self._type
+
+    @property
+    def id(self):
+        return self._id
+
+    def build(self):
+        return self._built
+
+def prebuild(rows: typing.Sequence[special_endpoints.ComponentBuilder]) -> tuple:
+    """Freeze built rows (e.g. from `miru.View.build()`) so they can be sent any number of times."""
+    return tuple(PrebuiltComponent(row) for row in rows)
@@ -0,0 +1,171 @@
+import asyncio
+import collections
+import inspect
+import logging
+import math
+import os
+import sys
+import time
+
+# Seconds between event-loop lag (and heartbeat) samples.
+LATENCY_SAMPLE_INTERVAL = float(os.environ.get("LATENCY_SAMPLE_INTERVAL", "0.5"))
+# Recent samples each histogram keeps; percentiles are over these.
+LATENCY_WINDOW = int(os.environ.get("LATENCY_WINDOW", "1024"))
+
+# Histogram names are "<kind>:<what>", e.g. "rest:POST /interactions/{interaction}/{token}/callback".
+LOOP_LAG = "loop:lag"
+HEARTBEAT = "gateway:heartbeat"
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """A rolling window of the most recent latency samples (seconds)."""
+
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self.samples = collections.deque(maxlen=size)
+        # All-time count and sum, for rates and means beyond the window.
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, *quantiles: float) -> list:
+        """Nearest-rank percentiles of the window, e.g. percentiles(0.5, 0.99); NaN if empty."""
+        if not self.samples:
+            return [math.nan] * len(quantiles)
+        ordered = sorted(self.samples)
+        return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles]
+
+    def summary(self) -> dict:
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        return {
+            "count": self.count,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": max(self.samples, default=math.nan) * 1000,
+        }
+
+class LatencyMonitor:
+    """
+    Latency histograms for the event loop, the gateway, REST calls and handlers.
+
+    A background task samples event-loop lag (how late a sleep of LATENCY_SAMPLE_INTERVAL
+    wakes up) and the gateway heartbeat. REST calls are timed by `instrument_rest`, slash
+    commands by the crescent hooks below, and buttons and modals by the router.
+    """
+
+    def __init__(self, interval: float = LATENCY_SAMPLE_INTERVAL, window: int = LATENCY_WINDOW):
+        self.interval = interval
+        self.window = window
+        self.histograms = {}
+        # {interaction ID: perf_counter when its command started}
+        self._commands_started = {}
+        self._task = None
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.window)
+        return histogram
+
+    def record(self, name: str, seconds: float) -> None:
+        self.histogram(name).record(seconds)
+
+    def summary(self, kind: str = None) -> dict:
+        """Summaries of every histogram, or only those of one kind (e.g. "rest"), by name."""
+        return {
+            name: histogram.summary()
+            for name, histogram in self.histograms.items()
+            if kind is None or name.startswith(kind + ":")
+        }
+
+    def combined(self, kind: str) -> Histogram:
+        """One histogram of the recent samples of every histogram of a kind."""
+        merged = Histogram(self.window * 8)
+        for name, histogram in self.histograms.items():
+            if name.startswith(kind + ":"):
+                merged.samples.extend(histogram.samples)
+                merged.count += histogram.count
+                merged.total += histogram.total
+        return merged
+
+    async def _run(self, app) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(LOOP_LAG, max(0.0, time.perf_counter() - start - self.interval))
+            heartbeat = getattr(app, "heartbeat_latency", math.nan)
+            if not math.isnan(heartbeat):
+                self.record(HEARTBEAT, heartbeat)
+
+    def start(self, app=None) -> None:
+        """Start sampling loop lag, and the heartbeat of `app` (a GatewayBot) if given."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(app))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # crescent command hooks, passed to crescent.Client(command_hooks=..., command_after_hooks=...).
+    async def command_started(self, ctx) -> None:
+        started = self._commands_started
+        # After-hooks don't run for commands that raise, so forget entries that never finished.
+        if len(started) > 1000:
+            cutoff = time.perf_counter() - 60
+            for key in [k for k, t in started.items() if t < cutoff]:
+                del started[key]
+        started[ctx.interaction.id] = time.perf_counter()
+
+    async def command_finished(self, ctx) -> None:
+        start = self._commands_started.pop(ctx.interaction.id, None)
+        if start is not None:
+            self.record(f"command:/{ctx.command}", time.perf_counter() - start)
+
+# The monitor /ping reports from.
+latency = LatencyMonitor()
+
+def instrument_rest(monitor: LatencyMonitor = latency) -> None:
+    """
+    Time every Discord REST request into a "rest:<METHOD> <route>" histogram.
+
+    hikari has no request hook, so this wraps its REST client's internal `_request`, which
+    every REST call goes through (checked against the hikari version in requirements.txt).
+    If an upgrade renames it or changes how it takes the route, REST timing is skipped with
+    a warning rather than breaking the bot, and /ping shows no REST data.
+    """
+    from hikari.impl.rest import RESTClientImpl
+
+    request = getattr(RESTClientImpl, "_request", None)
+    if request is not None and getattr(request, "_timed", False):
+        return
+    try:
+        parameters = list(inspect.signature(request).parameters) if request is not None else []
+    except (TypeError, ValueError):
+        parameters = []
+    if parameters[1:2] != ["compiled_route"]:
+        logger.warning("hikari %s has no RESTClientImpl._request(compiled_route, ...) to wrap; REST calls won't be timed",
+                       getattr(sys.modules.get("hikari"), "__version__", "?"))
+        return
+
+    async def timed_request(self, compiled_route, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await request(self, compiled_route, *args, **kwargs)
+        finally:
+            route = compiled_route.route
+            monitor.record(f"rest:{route.method} {route.path_template}", time.perf_counter() - start)
+
+    timed_request._timed = True
+    RESTClientImpl._request = timed_request
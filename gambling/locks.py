@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import functools
+import os
+import time
+import weakref
+
+import hikari
+
+# How long an interaction waits for the same user's previous one before giving up (seconds).
+# Discord wants a response within 3 seconds, so this leaves time to say so.
+USER_LOCK_TIMEOUT = float(os.environ.get("USER_LOCK_TIMEOUT", "2.0"))
+
+class UserBusy(Exception):
+    """The user's previous interaction didn't finish in time."""
+
+class UserLocks:
+    """
+    One asyncio.Lock per user, so a user's balance-changing interactions run one at a time
+    (a double click on Spin, or Double racing Stand) while other users carry on.
+
+    Locks are held weakly: one exists only while an interaction holds it or waits on it,
+    so idle users cost nothing.
+    """
+
+    def __init__(self, timeout: float = USER_LOCK_TIMEOUT):
+        self.timeout = timeout
+        self._locks = weakref.WeakValueDictionary()
+        # Counters.
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def lock(self, user_id) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def acquire(self, user_id, timeout: float = None) -> asyncio.Lock:
+        """
+        Take the user's lock and return it; the caller releases it. Waits up to `timeout`
+        seconds (default `self.timeout`; 0 fails at once if it's taken), then raises UserBusy.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        lock = self.lock(user_id)
+        if not lock.locked():
+            # Free, so this doesn't suspend.
+            await lock.acquire()
+        else:
+            self.contended += 1
+            if timeout <= 0:
+                self.timeouts += 1
+                raise UserBusy(user_id)
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(lock.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise UserBusy(user_id) from None
+            finally:
+                waited = time.perf_counter() - start
+                self.wait_seconds += waited
+                if waited > self.max_wait_seconds:
+                    self.max_wait_seconds = waited
+        self.acquired += 1
+        return lock
+
+    @contextlib.asynccontextmanager
+    async def hold(self, user_id, timeout: float = None):
+        """`async with` form of acquire."""
+        lock = await self.acquire(user_id, timeout)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self._locks),
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "mean_wait_ms": self.wait_seconds / self.contended * 1000 if self.contended else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
+
+# The registry every balance-changing handler goes through.
+user_locks = UserLocks()
+
+BUSY_MESSAGE = "⏳ Still working on your last move, try again in a moment."
+
+def one_at_a_time(handler):
+    """
+    Wrap a component or modal handler so each user's interactions run one after another.
+    If the user's previous interaction holds on past the timeout, they're told to retry.
+    """
+    @functools.wraps(handler)
+    async def wrapper(interaction, **fields):
+        try:
+            lock = await user_locks.acquire(interaction.user.id)
+        except UserBusy:
+            await interaction.create_initial_response(
+                hikari.ResponseType.MESSAGE_CREATE,
+                content=BUSY_MESSAGE,
+                flags=hikari.MessageFlag.EPHEMERAL
+            )
+            return
+        try:
+            await handler(interaction, **fields)
+        finally:
+            lock.release()
+    return wrapper
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+import hikari
+
+# How many display names to keep, and for how long (seconds).
+MEMBER_CACHE_SIZE = int(os.environ.get("MEMBER_CACHE_SIZE", "10000"))
+MEMBER_CACHE_TTL = float(os.environ.get("MEMBER_CACHE_TTL", "3600"))
+# Most REST fetch_member calls allowed in flight at once when resolving cache misses.
+FETCH_CONCURRENCY = 8
+
+class MemberNameCache:
+    """
+    Guild member display names, keyed by user ID.
+
+    Least recently used names are evicted once `max_size` is reached, and entries older
+    than `ttl` seconds are treated as misses. Gateway member events keep it current (see
+    the listeners in gambling.__main__); `resolve` fills in anything still missing.
+    """
+
+    def __init__(self, max_size: int = MEMBER_CACHE_SIZE, ttl: float = MEMBER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # {user_id: (display_name, expires_at)}, least recently used first.
+        self._names = OrderedDict()
+        # Counters.
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.fetch_failures = 0
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def get(self, user_id: int):
+        """The cached display name, or None if it isn't cached or has expired."""
+        entry = self._names.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._names[user_id]
+            return None
+        self._names.move_to_end(user_id)
+        return entry[0]
+
+    def put(self, user_id: int, name: str) -> None:
+        self._names[user_id] = (name, time.monotonic() + self.ttl)
+        self._names.move_to_end(user_id)
+        if len(self._names) > self.max_size:
+            self._names.popitem(last=False)
+
+    def put_member(self, member: hikari.Member) -> None:
+        self.put(int(member.user.id), member.display_name)
+
+    def discard(self, user_id: int) -> None:
+        self._names.pop(user_id, None)
+
+    async def _fetch(self, app, guild_id: int, user_id: int, limit: asyncio.Semaphore):
+        async with limit:
+            try:
+                member = await app.rest.fetch_member(guild_id, user_id)
+            except hikari.HTTPError:
+                # Left the guild, or the request failed; the caller falls back to a mention.
+                self.fetch_failures += 1
+                return None
+        self.fetched += 1
+        self.put_member(member)
+        return member.display_name
+
+    async def resolve(self, app, guild_id: int, user_ids, concurrency: int = FETCH_CONCURRENCY) -> dict:
+        """
+        Display names for `user_ids` as {user_id: name}.
+
+        Names come from this cache, then the hikari member cache; only the remaining misses
+        are fetched over REST, at most `concurrency` at a time. Users whose name can't be
+        fetched are left out rather than failing the whole lookup.
+        """
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            user_id = int(user_id)
+            name = self.get(user_id)
+            if name is None:
+                member = app.cache.get_member(guild_id, user_id)
+                if member is not None:
+                    self.put_member(member)
+                    name = member.display_name
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = name
+        self.hits += len(names)
+        self.misses += len(missing)
+        if missing:
+            limit = asyncio.Semaphore(concurrency)
+            fetched = await asyncio.gather(*(self._fetch(app, guild_id, uid, limit) for uid in missing))
+            for user_id, name in zip(missing, fetched):
+                if name is not None:
+                    names[user_id] = name
+        return names
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._names),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetched": self.fetched,
+            "fetch_failures": self.fetch_failures,
+        }
+
+# Shared display-name cache for the bot's guild.
+member_names = MemberNameCache()
@@ -0,0 +1,201 @@
+"""
+In-process metrics, served in the Prometheus text format.
+
+Counters and histograms are plain attribute updates: each one is only ever changed
+from one thread (the event loop, or the thread doing the I/O it measures), so they need
+no locks, and recording a value allocates nothing. Labelled metrics hand out one child
+per label value; keep the child around on hot paths instead of calling `labels` again.
+Existing stats() counters elsewhere in the bot are read through collectors, only when
+the endpoint is scraped.
+
+Set METRICS_PORT to serve them at http://METRICS_HOST:METRICS_PORT/metrics.
+"""
+import asyncio
+import bisect
+import math
+import os
+import traceback
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+# 0 leaves the endpoint off; metrics are still counted.
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+
+# Upper bounds (seconds) of the default histogram buckets.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Every metric and collector, in registration order.
+_metrics = {}
+_collectors = []
+
+def _label_text(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+class Counter:
+    """A number that only goes up, optionally split by labels."""
+
+    __slots__ = ("name", "help", "labelnames", "value", "_children")
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.value = 0
+        # {label values: child}
+        self._children = {}
+
+    def inc(self, amount=1) -> None:
+        self.value += amount
+
+    def labels(self, *values) -> "Counter":
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = Counter(self.name, self.help)
+        return child
+
+    def samples(self):
+        if not self.labelnames:
+            yield self.name, "", self.value
+        for values, child in list(self._children.items()):
+            yield self.name, _label_text(self.labelnames, values), child.value
+
+class Histogram:
+    """Counts of observed values (e.g. seconds) per bucket, optionally split by labels."""
+
+    __slots__ = ("name", "help", "labelnames", "buckets", "counts", "sum", "count", "_children")
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # One count per bucket plus one for values above the last bound; not cumulative.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._children = {}
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def labels(self, *values) -> "Histogram":
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = Histogram(self.name, self.help, buckets=self.buckets)
+        return child
+
+    def _samples(self, labelnames: tuple, labels: tuple):
+        names = labelnames + ("le",)
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            yield f"{self.name}_bucket", _label_text(names, labels + (_number(float(bound)),)), cumulative
+        label_text = _label_text(labelnames, labels)
+        yield f"{self.name}_sum", label_text, self.sum
+        yield f"{self.name}_count", label_text, self.count
+
+    def samples(self):
+        if not self.labelnames:
+            yield from self._samples((), ())
+        for values, child in list(self._children.items()):
+            yield from child._samples(self.labelnames, values)
+
+def counter(name: str, help: str, labelnames: tuple = ()) -> Counter:
+    """Register a counter, or return the one already registered under `name`."""
+    if name not in _metrics:
+        _metrics[name] = Counter(name, help, labelnames)
+    return _metrics[name]
+
+def histogram(name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    """Register a histogram, or return the one already registered under `name`."""
+    if name not in _metrics:
+        _metrics[name] = Histogram(name, help, labelnames, buckets)
+    return _metrics[name]
+
+def collector(fn):
+    """
+    Register a function called at scrape time that returns metric families as
+    (name, type, help, [(labels dict, value), ...]); usable as a decorator.
+    """
+    _collectors.append(fn)
+    return fn
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in list(_metrics.values()):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+    for fn in _collectors:
+        try:
+            families = fn()
+        except Exception:
+            traceback.print_exc()
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+# Metrics shared across modules.
+COMMANDS = counter("gamble_commands_total", "Slash commands invoked, by command.", ("command",))
+BYTES_WRITTEN = counter("gamble_bytes_written_total", "Bytes written to data files, by file.", ("file",))
+PERSISTENCE_SECONDS = histogram("gamble_persistence_seconds", "Time spent writing data files, by operation.", ("op",))
+
+async def count_command(ctx) -> None:
+    """crescent command hook counting invocations per command."""
+    COMMANDS.labels(ctx.command).inc()
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Skip the headers; nothing in them matters here.
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", render().encode()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"Not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+_server = None
+
+async def start(host: str = METRICS_HOST, port: int = METRICS_PORT) -> None:
+    """Serve /metrics over HTTP if a port is configured."""
+    global _server
+    if port and _server is None:
+        _server = await asyncio.start_server(_handle, host, port)
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+
+async def stop() -> None:
+    global _server
+    if _server is not None:
+        _server.close()
+        await _server.wait_closed()
+        _server = None
@@ -0,0 +1,32 @@
+"""
+One-shot migration of profiles.json into the SQLite profile store.
+
+Usage:
+    python -m gambling.migrate [--json profiles.json] [--db profiles.db]
+
+Afterwards start the bot with PROFILE_STORE=sqlite.
+"""
+import argparse
+
+from gambling.storage import PROFILE_FILE, PROFILE_DB, JsonStore, SqliteStore
+
+def migrate_json_to_sqlite(json_path: str = PROFILE_FILE, db_path: str = PROFILE_DB) -> int:
+    """Copy every profile from `json_path` into `db_path`. Returns the number of profiles copied."""
+    # Load through the JSON store so journal records newer than the snapshot are included.
+    profiles = JsonStore(json_path, flush_interval=0).all_profiles()
+    db = SqliteStore(db_path)
+    try:
+        return db.import_profiles(profiles)
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate profiles.json into the SQLite profile store.")
+    parser.add_argument("--json", default=PROFILE_FILE, help="Source JSON file (default: %(default)s)")
+    parser.add_argument("--db", default=PROFILE_DB, help="Target SQLite database (default: %(default)s)")
+    args = parser.parse_args()
+    count = migrate_json_to_sqlite(args.json, args.db)
+    print(f"Migrated {count} profiles from {args.json} to {args.db}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import random as r
+import os
 import json
 import traceback
 import time
@@ -8,57 +8,47 @@ import hikari, crescent, miru
 plugin = crescent.Plugin[hikari.GatewayBot, None]()
 
 from gambling.client_instance import guild_id  # Ensure guild_id is an int
-from gambling.points import get_points, update_points
-
-# Global dictionary to store active Blackjack game states.
-GAMES = {}
-
-# Card definitions.
-card_ranks = ['Ace', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King']
-card_suits = ["Hearts", "Spades", "Clubs", "Diamonds"]
-
-def draw(amount=1):
-    """Draw 'amount' cards randomly from an infinite deck."""
-    hand = []
-    for _ in range(amount):
-        rank = r.choice(card_ranks)
-        suit = r.choice(card_suits)
-        hand.append((rank, suit))
-    return hand
-
-def calculate_total(hand):
-    """Calculate a blackjack hand's total, counting Aces as 11 or 1 as needed."""
-    total = 0
-    aces = 0
-    for rank, _ in hand:
-        if rank == 'Ace':
-            total += 11
-            aces += 1
-        elif rank in ['Jack', 'Queen', 'King']:
-            total += 10
-        else:
-            total += int(rank)
-    while total > 21 and aces:
-        total -= 10
-        aces -= 1
-    return total
+from gambling.points import get_points, credit, debit_if_sufficient
+from gambling.cards import BLACKJACK_PAYOUT, CARD_NAMES, VALUES, WIN_PAYOUT, Hand, Shoe, hand_to_str, play_dealer
+from gambling.blackjack_ev import hint
+from gambling.sessions import SessionStore, spawn
+from gambling.router import router
+from gambling.locks import BUSY_MESSAGE, UserBusy, one_at_a_time, user_locks
+from gambling.components import prebuild
+from gambling import metrics
+
+# Hands with no move for this many seconds are dropped...
+BLACKJACK_TTL = float(os.environ.get("BLACKJACK_TTL", "600"))
+# ...and their bet is either "refund"ed or "forfeit"ed.
+BLACKJACK_EXPIRED_BETS = os.environ.get("BLACKJACK_EXPIRED_BETS", "refund")
+
+def refund_expired_hand(game_id: str, game: dict) -> None:
+    """Return the bet of a hand that was never finished."""
+    credit(game["user_id"], game["bet"], reason="blackjack expired")
 
-def hand_to_str(hand):
-    """Return a string representation of a hand."""
-    return ", ".join(f"{rank} of {suit}" for rank, suit in hand)
+def refund_open_hand(game_id: str, game: dict) -> None:
+    """Return the bet of a hand still open when the bot shuts down; the player didn't abandon it."""
+    credit(game["user_id"], game["bet"], reason="blackjack shutdown refund")
+
+# Active Blackjack game states, keyed by message ID.
+# The bet of an active game is held by the bot (already debited) until the hand is settled.
+GAMES = SessionStore(
+    "blackjack",
+    ttl=BLACKJACK_TTL,
+    on_expire=refund_expired_hand if BLACKJACK_EXPIRED_BETS == "refund" else None,
+    on_close=refund_open_hand
+)
 
-def is_blackjack(hand):
-    """Check if a given two-card hand is a blackjack."""
-    return len(hand) == 2 and calculate_total(hand) == 21
+HANDS = metrics.counter("gamble_blackjack_hands_total", "Blackjack hands dealt.")
 
-def simulate_dealer_turn(dealer_hand):
+# Shared shoe every hand is dealt from.
+SHOE = Shoe()
+
+def simulate_dealer_turn(dealer_hand: Hand):
     """Dealer reveals the hidden card and hits until total is 17 or more.
        Dealer stands on soft 17 (Ace counted as 11 if it brings total to 17)."""
-    total = calculate_total(dealer_hand)
-    while total < 17:
-        dealer_hand.append(draw(1)[0])
-        total = calculate_total(dealer_hand)
-    return dealer_hand, total
+    play_dealer(dealer_hand, SHOE.draw)
+    return dealer_hand, dealer_hand.total
 
 def build_blackjack_view(can_double: bool) -> list:
     view = miru.View(timeout=180)
@@ -86,6 +76,26 @@ def build_blackjack_view(can_double: bool) -> list:
         )
     return view.build()
 
+# The two button layouts, built once: {can_double: components}.
+BLACKJACK_COMPONENTS = {can_double: prebuild(build_blackjack_view(can_double)) for can_double in (True, False)}
+
+# Card names as shown for the dealer's upcard.
+UPCARD_LINES = tuple(f"**Dealer's Upcard:** {hand_to_str([card])}\n" for card in range(len(CARD_NAMES)))
+
+async def delete_messages(rest, messages: list) -> None:
+    """Delete (channel_id, message_id) pairs, ignoring any that are already gone."""
+    for channel_id, message_id in messages:
+        try:
+            await rest.delete_message(channel_id, message_id)
+        except Exception:
+            pass
+
+def hint_line(player_hand: Hand, dealer_upcard: int, can_double: bool) -> str:
+    """Expected value of each move as a share of the bet, best move in bold."""
+    moves = hint(player_hand.total, player_hand.is_soft, VALUES[dealer_upcard], can_double)
+    best = max(moves, key=moves.get)
+    parts = [f"**{name} {ev:+.0%}**" if name == best else f"{name} {ev:+.0%}" for name, ev in moves.items()]
+    return "💡 Expected return: " + " · ".join(parts) + "\n"
 
 def classify_win(outcome: str) -> str:
     """Returns a descriptive string based on the outcome."""
@@ -105,98 +115,112 @@ def classify_win(outcome: str) -> str:
 )
 class Blackjack:
     bet: int = crescent.option(int, "Enter your bet amount (min 10 points)")
+    hints: bool = crescent.option(bool, "Show the expected return of each move", default=False)
 
     async def callback(self, ctx: crescent.Context) -> None:
-        # Delete any existing game for this user.
+        # One game start at a time per user, like their button presses.
+        try:
+            lock = await user_locks.acquire(ctx.interaction.user.id)
+        except UserBusy:
+            await ctx.respond(BUSY_MESSAGE, flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        try:
+            await self.play(ctx)
+        finally:
+            lock.release()
+
+    async def play(self, ctx: crescent.Context) -> None:
+        # Replace any existing game for this user.
         user_id = ctx.interaction.user.id
-        for existing_game_id, existing_game in list(GAMES.items()):
-            if existing_game["user_id"] == user_id:
-                try:
-                    await ctx.app.rest.delete_message(ctx.interaction.channel_id, int(existing_game_id))
-                except Exception:
-                    pass
-                try:
-                    existing_game["view"].stop()
-                except Exception:
-                    pass
-                del GAMES[existing_game_id]
+        stale_messages = []
+        for existing_game_id in GAMES.for_user(user_id):
+            existing_game = GAMES.pop(existing_game_id)
+            # Return the bet of the abandoned hand.
+            credit(user_id, existing_game["bet"], reason="blackjack refund")
+            channel_id = existing_game.get("channel_id", ctx.interaction.channel_id)
+            stale_messages.append((channel_id, int(existing_game_id)))
+        # Deleting the old messages doesn't hold up the new deal.
+        if stale_messages:
+            spawn(delete_messages(ctx.app.rest, stale_messages))
 
         if self.bet < 10:
             await ctx.respond("❌ The minimum bet is 10 points.", flags=hikari.MessageFlag.EPHEMERAL)
             return
 
-        if get_points(user_id) < self.bet:
+        # Take the bet up front; it's paid back with the winnings when the hand is settled.
+        balance = debit_if_sufficient(user_id, self.bet, reason="blackjack bet")
+        if balance is None:
             await ctx.respond("❌ You don't have enough points to make that bet!", flags=hikari.MessageFlag.EPHEMERAL)
             return
 
-        # Initial Deal:
-        player_hand = draw(2)
-        dealer_hand = draw(2)
-        dealer_upcard = dealer_hand[0]  # Dealer's upcard is always visible
+        # Initial Deal (reshuffling first if the shoe is past the cut card):
+        if SHOE.needs_shuffle:
+            SHOE.shuffle()
+        player_hand = SHOE.deal(2)
+        dealer_hand = SHOE.deal(2)
+        HANDS.inc()
+        dealer_upcard = dealer_hand.cards[0]  # Dealer's upcard is always visible
 
         # Check for naturals:
-        player_blackjack = is_blackjack(player_hand)
-        dealer_blackjack = is_blackjack(dealer_hand)
+        player_blackjack = player_hand.is_blackjack
+        dealer_blackjack = dealer_hand.is_blackjack
 
-        # Create a view for player's turn (Hit, Stand, Double Down if allowed).
-        can_double = (len(player_hand) == 2 and get_points(user_id) >= self.bet * 2)
-        view = miru.View(timeout=180)
-        view.add_item(miru.Button(style=hikari.ButtonStyle.PRIMARY, label="Hit", custom_id="bj_hit"))
-        view.add_item(miru.Button(style=hikari.ButtonStyle.SECONDARY, label="Stand", custom_id="bj_stand"))
-        if can_double:
-            view.add_item(miru.Button(style=hikari.ButtonStyle.SUCCESS, label="Double Down", custom_id="bj_double"))
+        # Player's turn: Hit, Stand, and Double Down if they can cover it.
+        can_double = (len(player_hand) == 2 and balance >= self.bet)
 
         content = (
             "♠️ **Blackjack** ♠️\n\n"
             f"**Bet:** {self.bet} points\n\n"
-            f"**Your Hand:** {hand_to_str(player_hand)} | Total: {calculate_total(player_hand)}\n"
-            f"**Dealer's Upcard:** {hand_to_str([dealer_upcard])}\n"
+            f"**Your Hand:** {player_hand} | Total: {player_hand.total}\n"
+            f"{UPCARD_LINES[dealer_upcard]}"
         )
 
         # Natural blackjack check:
         if player_blackjack or dealer_blackjack:
-            content += f"**Dealer's Hand:** {hand_to_str(dealer_hand)} (Total: {calculate_total(dealer_hand)})\n\n"
+            content += f"**Dealer's Hand:** {dealer_hand} (Total: {dealer_hand.total})\n\n"
             if player_blackjack and not dealer_blackjack:
                 outcome = "blackjack"
-                winnings = int(self.bet * 1.5)
-                update_points(user_id, get_points(user_id) + winnings)
+                winnings = int(self.bet * BLACKJACK_PAYOUT)
+                balance = credit(user_id, self.bet + winnings, reason="blackjack payout")
                 content += f"🎉 You got a Blackjack! You win {winnings} points!"
             elif dealer_blackjack and not player_blackjack:
                 outcome = "loss"
-                update_points(user_id, get_points(user_id) - self.bet)
                 content += f"😞 Dealer has a Blackjack. You lose your bet of {self.bet} points."
             else:
                 outcome = "tie"
+                balance = credit(user_id, self.bet, reason="blackjack push")
                 content += "🤝 It's a push. Your bet is returned."
-            content += f"\n\n**New Total:** {get_points(user_id)} points"
+            content += f"\n\n**New Total:** {balance} points"
             await ctx.respond(content, )
             return
 
+        if self.hints:
+            content += hint_line(player_hand, dealer_upcard, can_double)
         content += "\nChoose your action:"
-        await ctx.respond(content, components=view.build(), )
-        message = await ctx.interaction.fetch_initial_response()
+        try:
+            await ctx.respond(content, components=BLACKJACK_COMPONENTS[can_double])
+            message = await ctx.interaction.fetch_initial_response()
+        except Exception:
+            # No message means no game to finish, so the bet goes back.
+            credit(user_id, self.bet, reason="blackjack refund")
+            raise
         game_id = str(message.id)
         GAMES[game_id] = {
             "player_hand": player_hand,
             "dealer_hand": dealer_hand,
             "bet": self.bet,
             "user_id": user_id,
-            "view": view,
-            "doubled": False
+            "doubled": False,
+            "hints": self.hints,
+            "channel_id": ctx.interaction.channel_id
         }
-        await view.wait()
-
-@plugin.include
-@crescent.event
-async def on_component_blackjack(event: hikari.InteractionCreateEvent) -> None:
-    if not isinstance(event.interaction, hikari.ComponentInteraction):
-        return
-    if event.interaction.custom_id not in ["bj_hit", "bj_stand", "bj_double"]:
-        return
 
-    game_id = str(event.interaction.message.id)
+@router.component("bj_hit", "bj_stand", "bj_double")
+@one_at_a_time
+async def on_component_blackjack(interaction: hikari.ComponentInteraction) -> None:
+    game_id = str(interaction.message.id)
     if game_id not in GAMES:
-        await event.interaction.create_initial_response(
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
             content="❌ Game not found.",
             flags=hikari.MessageFlag.EPHEMERAL
@@ -205,85 +229,82 @@ async def on_component_blackjack(event: hikari.InteractionCreateEvent) -> None:
 
     game = GAMES[game_id]
     user_id = game["user_id"]
-    if event.interaction.user.id != user_id:
-        await event.interaction.create_initial_response(
+    if interaction.user.id != user_id:
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
             content="❌ This isn't your game!",
             flags=hikari.MessageFlag.EPHEMERAL
         )
         return
 
-    action = event.interaction.custom_id
+    action = interaction.custom_id
     player_hand = game["player_hand"]
     dealer_hand = game["dealer_hand"]
-    dealer_upcard = dealer_hand[0]
+    dealer_upcard = dealer_hand.cards[0]
     bet = game["bet"]
 
     if action == "bj_hit":
-        new_card = draw(1)[0]
-        player_hand.append(new_card)
-        total = calculate_total(player_hand)
+        total = player_hand.add(SHOE.draw())
         content = (
             "♠️ **Blackjack Update** ♠️\n\n"
-            f"**Your Hand:** {hand_to_str(player_hand)} (Total: {total})\n"
-            f"**Dealer's Upcard:** {hand_to_str([dealer_upcard])}\n"
+            f"**Your Hand:** {player_hand} (Total: {total})\n"
+            f"{UPCARD_LINES[dealer_upcard]}"
         )
         if total > 21:
-            update_points(user_id, get_points(user_id) - bet)
+            # The bet was already taken when the hand was dealt. The hand is over before we
+            # answer, so a failed response can't leave it to be refunded on expiry.
+            GAMES.pop(game_id)
             content += f"❌ **Bust!** You exceeded 21 and lost your bet of {bet} points.\n\n"
             content += f"**New Total:** {get_points(user_id)} points"
-            await event.interaction.create_initial_response(
+            await interaction.create_initial_response(
                 hikari.ResponseType.MESSAGE_UPDATE,
                 content=content,
                 
             )
-            del GAMES[game_id]
             return
         else:
+            if game["hints"]:
+                content += hint_line(player_hand, dealer_upcard, can_double=False)
             content += "Choose your next action:"
-            view = build_blackjack_view(can_double=False)
-            game["view"] = view
-            await event.interaction.create_initial_response(
+            await interaction.create_initial_response(
                 hikari.ResponseType.MESSAGE_UPDATE,
                 content=content,
-                components=view,
+                components=BLACKJACK_COMPONENTS[False],
                 
             )
     elif action == "bj_double":
-        if get_points(user_id) < bet:
-            await event.interaction.create_initial_response(
+        if debit_if_sufficient(user_id, bet, reason="blackjack double") is None:
+            await interaction.create_initial_response(
                 hikari.ResponseType.MESSAGE_UPDATE,
                 content="❌ Not enough points to double down.",
                 flags=hikari.MessageFlag.EPHEMERAL
             )
             return
-        update_points(user_id, get_points(user_id) - bet)
         game["bet"] *= 2
         game["doubled"] = True
-        new_card = draw(1)[0]
-        player_hand.append(new_card)
-        total = calculate_total(player_hand)
+        total = player_hand.add(SHOE.draw())
         content = (
             "♠️ **Double Down** ♠️\n\n"
-            f"**Your Hand:** {hand_to_str(player_hand)} (Total: {total})\n"
+            f"**Your Hand:** {player_hand} (Total: {total})\n"
         )
         if total > 21:
-            update_points(user_id, get_points(user_id) - game["bet"])
+            GAMES.pop(game_id)
             content += f"❌ **Bust!** You exceeded 21 and lost your doubled bet of {game['bet']} points.\n\n"
             content += f"**New Total:** {get_points(user_id)} points"
-            await event.interaction.create_initial_response(
+            await interaction.create_initial_response(
                 hikari.ResponseType.MESSAGE_UPDATE,
                 content=content,
                 
             )
-            del GAMES[game_id]
             return
-        await proceed_dealer_turn(game_id, event.interaction)
+        await proceed_dealer_turn(game_id, interaction)
     elif action == "bj_stand":
-        await proceed_dealer_turn(game_id, event.interaction)
+        await proceed_dealer_turn(game_id, interaction)
 
 async def proceed_dealer_turn(game_id: str, interaction: hikari.ComponentInteraction) -> None:
-    game = GAMES.get(game_id)
+    # Removed before paying out or awaiting anything, so the hand can't be settled twice
+    # (a second Stand) or refunded on expiry if the response below fails.
+    game = GAMES.pop(game_id)
     if not game:
         await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
@@ -291,34 +312,34 @@ async def proceed_dealer_turn(game_id: str, interaction: hikari.ComponentInterac
             flags=hikari.MessageFlag.EPHEMERAL
         )
         return
-    dealer_hand = game["dealer_hand"] if "dealer_hand" in game else draw(2)
+    dealer_hand = game["dealer_hand"] if "dealer_hand" in game else SHOE.deal(2)
     if "dealer_hand" not in game:
         game["dealer_hand"] = dealer_hand
 
     dealer_hand, dealer_total = simulate_dealer_turn(game["dealer_hand"])
-    player_total = calculate_total(game["player_hand"])
+    player_total = game["player_hand"].total
     content = (
         "♠️ **Dealer's Turn** ♠️\n\n"
-        f"**Your Hand:** {hand_to_str(game['player_hand'])} (Total: {player_total})\n"
-        f"**Dealer's Hand:** {hand_to_str(dealer_hand)} (Total: {dealer_total})\n\n"
+        f"**Your Hand:** {game['player_hand']} (Total: {player_total})\n"
+        f"**Dealer's Hand:** {dealer_hand} (Total: {dealer_total})\n\n"
     )
     if dealer_total > 21 or player_total > dealer_total:
         outcome = "win"
-        content += f"🎉 You win! You earn a payout of {int(game['bet'] + game['bet'] * 0.5)} points."
+        winnings = int(game["bet"] * WIN_PAYOUT)
+        content += f"🎉 You win! You earn a payout of {winnings} points."
         print(f'{game["user_id"]} won at blackjack!')
-        update_points(game["user_id"], get_points(game["user_id"]) + int(game["bet"] + game["bet"] * 0.5))
+        new_total = credit(game["user_id"], game["bet"] + winnings, reason="blackjack payout")
     elif dealer_total == player_total:
         outcome = "tie"
         content += "🤝 It's a push. You get your bet back."
+        new_total = credit(game["user_id"], game["bet"], reason="blackjack push")
     else:
         outcome = "loss"
         content += f"❌ Dealer wins! You lose your bet of {game['bet']} points."
-        update_points(game["user_id"], get_points(game["user_id"]) - game["bet"])
-    new_total = get_points(game["user_id"])
+        new_total = get_points(game["user_id"])
     content += f"\n\n**New Total:** {new_total} points"
     await interaction.create_initial_response(
         hikari.ResponseType.MESSAGE_UPDATE,
         content=content
     )
-    del GAMES[game_id]
     
@@ -1,42 +1,28 @@
-import json
 import time
-from asyncio import gather
 
 import hikari, crescent
 
 plugin = crescent.Plugin[hikari.GatewayBot, None]()
 
 from gambling.client_instance import guild_id  # Ensure guild_id is an int
-from gambling.points import get_points, update_points
+from gambling.members import member_names
+from gambling.predictions import predictions
+from gambling.settlement import settle
 
-PREDICTIONS_FILE = "predictions.json"
-
-def load_predictions() -> dict:
-    try:
-        with open(PREDICTIONS_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"active": {}}
-
-def save_predictions(data: dict) -> None:
-    with open(PREDICTIONS_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+# Discord rejects messages longer than this.
+MAX_MESSAGE_LENGTH = 2000
+# No result line is shorter than this, so at most MAX_MESSAGE_LENGTH // MIN_LINE_LENGTH voters get listed.
+MIN_LINE_LENGTH = 40
 
 # Autocomplete callback for the prediction_id option.
 async def predi_resolve_autocomplete(ctx: crescent.AutocompleteContext, option: hikari.AutocompleteInteractionOption) -> list[tuple[str, str]]:
-    predictions = load_predictions()
-    return [
-        (
-            f"ID: ..{msg_id[-4:]} | Prediction: {data['prediction'].capitalize()} (Votes: {len(data.get('votes', {}))})",
-            msg_id
-        )
-        for msg_id, data in predictions.get("active", {}).items()
-    ]
+    # Served from the in-memory store, filtered by what the user has typed so far.
+    return predictions.choices(str(option.value or ""))
 
 @plugin.include
 @crescent.command(
     name="predi-outcome",
-    description="Resolve a prediction and award winners double their bet.",
+    description="Resolve a prediction and pay out the winners.",
     guild=guild_id
 )
 class PrediOutcome:
@@ -50,49 +36,65 @@ class PrediOutcome:
         "Outcome",
         choices=[("YES", "YES"), ("NO", "NO")]
     )
+    odds: str = crescent.option(
+        str,
+        "How winners are paid (default: double their bet)",
+        choices=[("Double the bet", "fixed"), ("Share of the pool", "pool")],
+        default="fixed"
+    )
 
     async def callback(self, ctx: crescent.Context) -> None:
-        predictions = load_predictions()  # Reload to ensure up-to-date data.
         pred_id = self.prediction_id
         outcome = self.result  # "YES" or "NO"
-        if pred_id not in predictions.get("active", {}):
+        event_data = predictions.get(pred_id)
+        if event_data is None:
             await ctx.respond("Prediction event not found.", flags=hikari.MessageFlag.EPHEMERAL)
             return
 
-        event_data = predictions["active"].pop(pred_id)
         # Check that the prediction event has existed for at least 1 minutes.
         if time.time() - event_data.get("timestamp", 0) < 60:
-            predictions["active"][pred_id] = event_data
-            save_predictions(predictions)
             await ctx.respond("This prediction must be active for at least 1 minute before resolving.", flags=hikari.MessageFlag.EPHEMERAL)
             return
-        save_predictions(predictions)
+        # Compute every payout in one pass, then credit all of them in a single transaction.
+        # The stakes are already held, so this happens before anything is awaited: if paying
+        # out fails the prediction stays open, and once it's paid it's closed straight away.
+        settlement = settle(event_data["votes"], outcome, self.odds)
+        new_totals = settlement.apply()
+        predictions.pop(pred_id)
+        # Fetching names can take longer than the initial response window.
+        await ctx.defer()
 
-        # Fetch display names for each voter concurrently.
-        user_ids = list(event_data["votes"].keys())
-        members = await gather(*(ctx.app.rest.fetch_member(guild_id, int(uid)) for uid in user_ids))
-        names = {str(member.user.id): member.display_name for member in members}
+        # Display names for the voters that can fit in the message, mostly from the cache.
+        listed = settlement.user_ids[:MAX_MESSAGE_LENGTH // MIN_LINE_LENGTH].tolist()
+        names = await member_names.resolve(ctx.app, guild_id, listed)
 
         # Build a nicely formatted results output.
-        result_lines = []
-        for user_id, vote_data in event_data["votes"].items():
-            try:
-                bet = int(vote_data["bet"])
-            except Exception:
-                bet = 0
-            display = names.get(user_id, f"<@{user_id}>")
-            if vote_data["vote"] == outcome:
-                current = get_points(int(user_id))
-                new_total = current + (bet * 2)
-                update_points(int(user_id), new_total)
-                result_lines.append(f"• **{display}** won **{bet * 2}** points (new total: **{new_total}**).")
-            else:
-                result_lines.append(f"• **{display}** lost their bet of **{bet}** points.")
-        results_text = "\n".join(result_lines)
         result_message = (
             f"✨ **Prediction Resolved!** ✨\n\n"
             f"**Prediction:** *{event_data['prediction']}*\n"
-            f"**Outcome:** **{outcome}**\n\n"
-            f"**Winners/Losers:**\n{results_text}"
+            f"**Outcome:** **{outcome}**\n"
+            f"**Pool:** {settlement.pool} points, **Paid out:** {settlement.paid_out} points\n\n"
+            f"**Winners/Losers:**\n"
         )
+        rows = zip(settlement.user_ids.tolist(), settlement.bets.tolist(), settlement.won.tolist(),
+                   settlement.payouts.tolist(), settlement.staked.tolist())
+        shown = 0
+        for user_id, bet, won, payout, staked in rows:
+            display = names.get(user_id, f"<@{user_id}>")
+            if won:
+                line = f"• **{display}** won **{payout}** points (new total: **{new_totals[user_id]}**).\n"
+            elif payout:
+                line = f"• **{display}** was refunded **{payout}** points (nobody picked {outcome}).\n"
+            elif staked:
+                line = f"• **{display}** lost their bet of **{bet}** points.\n"
+            else:
+                # Bet before stakes were taken at vote time, so there was nothing to lose.
+                line = f"• **{display}** guessed wrong (their bet of **{bet}** was never taken).\n"
+            # Leave room for the "...and N more" line.
+            if len(result_message) + len(line) > MAX_MESSAGE_LENGTH - 40:
+                break
+            result_message += line
+            shown += 1
+        if shown < len(settlement.user_ids):
+            result_message += f"...and {len(settlement.user_ids) - shown} more."
         await ctx.respond(result_message)
@@ -1,27 +1,55 @@
-import json
-import time
 import hikari, crescent, miru
 
 plugin = crescent.Plugin[hikari.GatewayBot, None]()
 
 from gambling.client_instance import guild_id  # Ensure guild_id is an int
-from gambling.points import get_points
-
-PREDICTIONS_FILE = "predictions.json"
-
-def load_predictions() -> dict:
-    try:
-        with open(PREDICTIONS_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"active": {}}
+from gambling.points import debit_if_sufficient
+from gambling.predictions import predictions
+from gambling.router import router
+from gambling.locks import one_at_a_time
+from gambling.components import prebuild
+from gambling import metrics
+
+BET_MODAL_TITLE = "Enter your bet amount"
+
+VOTES = metrics.counter("gamble_prediction_votes_total", "Prediction votes placed.")
+
+def build_vote_view() -> list:
+    # Create a Miru view with Yes and No buttons.
+    view = miru.View(timeout=180)
+    view.add_item(
+        miru.Button(
+            style=hikari.ButtonStyle.PRIMARY,
+            label="Yes",
+            custom_id="predi_yes"
+        )
+    )
+    view.add_item(
+        miru.Button(
+            style=hikari.ButtonStyle.DANGER,
+            label="No",
+            custom_id="predi_no"
+        )
+    )
+    return view.build()
 
-def save_predictions(data: dict) -> None:
-    with open(PREDICTIONS_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+def build_bet_modal() -> list:
+    # The bet amount prompt; only the modal's custom_id changes between votes.
+    modal = miru.Modal(title=BET_MODAL_TITLE)
+    modal.add_item(
+        miru.TextInput(
+            label="Bet amount",
+            custom_id="bet_amount",
+            style=hikari.TextInputStyle.SHORT,
+            required=True,
+            placeholder="Enter a number"
+        )
+    )
+    return modal.build()
 
-# Global predictions data. We initialize it here.
-predictions_data = load_predictions()
+# Both layouts are the same for every prediction, so they're built once.
+VOTE_COMPONENTS = prebuild(build_vote_view())
+BET_MODAL_COMPONENTS = prebuild(build_bet_modal())
 
 @plugin.include
 @crescent.command(
@@ -35,14 +63,8 @@ class Predi:
 
     async def callback(self, ctx: crescent.Context) -> None:
         user_id = str(ctx.interaction.user.id)
-        # Reload current predictions from file.
-        current_predictions = load_predictions()
         # Count how many active predictions this user (host) already has.
-        active_count = sum(
-            1 for event in current_predictions.get("active", {}).values()
-            if event.get("host") == user_id
-        )
-        if active_count >= 5:
+        if predictions.count_for_host(user_id) >= 5:
             await ctx.respond(
                 "❌ You already have 5 active prediction events. Please determine the outcome of one before creating another.",
                 flags=hikari.MessageFlag.EPHEMERAL
@@ -56,79 +78,29 @@ class Predi:
             f"**Minimum Gamble:** {self.min_gamble} points\n\n"
             "Cast your vote below:"
         )
-        # Create a Miru view with Yes and No buttons.
-        view = miru.View(timeout=180)
-        view.add_item(
-            miru.Button(
-                style=hikari.ButtonStyle.PRIMARY,
-                label="Yes",
-                custom_id="predi_yes"
-            )
-        )
-        view.add_item(
-            miru.Button(
-                style=hikari.ButtonStyle.DANGER,
-                label="No",
-                custom_id="predi_no"
-            )
-        )
         # Send the prediction event.
-        await ctx.respond(content, components=view.build())
+        await ctx.respond(content, components=VOTE_COMPONENTS)
         message = await ctx.interaction.fetch_initial_response()
         msg_id = str(message.id)
         # Add the new prediction event including the host's ID and a timestamp.
-        current_predictions["active"][msg_id] = {
-            "prediction": self.prediction,
-            "min_gamble": self.min_gamble,
-            "votes": {},  # Format: {user_id: {"vote": "YES"/"NO", "bet": <amount>}}
-            "host": user_id,
-            "timestamp": time.time()
-        }
-        save_predictions(current_predictions)
-        global predictions_data
-        predictions_data = current_predictions
+        predictions.add(msg_id, user_id, self.prediction, self.min_gamble)
 
-@plugin.include
-@crescent.event
-async def on_component_interaction(event: hikari.InteractionCreateEvent) -> None:
+@router.component("predi_yes", "predi_no")
+async def on_component_interaction(interaction: hikari.ComponentInteraction) -> None:
     # Process button interactions for prediction events.
-    if not isinstance(event.interaction, hikari.ComponentInteraction):
-        return
-    if event.interaction.custom_id not in ["predi_yes", "predi_no"]:
-        return
-
-    vote = "YES" if event.interaction.custom_id == "predi_yes" else "NO"
-    msg_id = str(event.interaction.message.id)
-    # Create a modal prompt for entering the bet amount using Miru.
-    modal_custom_id = f"predi_bet_{vote}_{msg_id}"
-    modal = miru.Modal(title="Enter your bet amount", custom_id=modal_custom_id)
-    modal.add_item(
-        miru.TextInput(
-            label="Bet amount",
-            custom_id="bet_amount",
-            style=hikari.TextInputStyle.SHORT,
-            required=True,
-            placeholder="Enter a number"
-        )
+    vote = "YES" if interaction.custom_id == "predi_yes" else "NO"
+    msg_id = str(interaction.message.id)
+    # Prompt for the bet amount; the modal's custom_id carries the vote and the prediction.
+    await interaction.create_modal_response(
+        BET_MODAL_TITLE, f"predi_bet_{vote}_{msg_id}", components=BET_MODAL_COMPONENTS
     )
-    await event.interaction.create_modal_response(modal.title, modal.custom_id, components=modal.build())
-
-@plugin.include
-@crescent.event
-async def on_modal_submit(event: hikari.InteractionCreateEvent) -> None:
-    if event.interaction.type != hikari.InteractionType.MODAL_SUBMIT:
-        return
-    custom_id = event.interaction.custom_id
-    if not custom_id.startswith("predi_bet_"):
-        return
-    try:
-        _, _, vote, msg_id = custom_id.split("_", 3)
-    except Exception:
-        return
 
+@router.modal("predi_bet_{vote}_{msg_id}")
+@one_at_a_time
+async def on_modal_submit(interaction: hikari.ModalInteraction, vote: str, msg_id: str) -> None:
     # Extract the bet amount by iterating over the submitted components.
     bet_amount = None
-    for action_row in event.interaction.components:
+    for action_row in interaction.components:
         for comp in action_row.components:
             if comp.custom_id == "bet_amount":
                 bet_amount = comp.value
@@ -138,12 +110,14 @@ async def on_modal_submit(event: hikari.InteractionCreateEvent) -> None:
     if bet_amount is None:
         return
 
-    user_id = str(event.interaction.user.id)
+    user_id = str(interaction.user.id)
     # Convert bet amount to integer and validate.
     try:
         bet_value = int(bet_amount)
+        if bet_value <= 0:
+            raise ValueError("bet must be positive")
     except ValueError:
-        await event.interaction.create_initial_response(
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_CREATE,
             content="Invalid bet amount.",
             flags=hikari.MessageFlag.EPHEMERAL
@@ -151,8 +125,9 @@ async def on_modal_submit(event: hikari.InteractionCreateEvent) -> None:
         return
 
     # Check that the prediction event exists.
-    if msg_id not in predictions_data["active"]:
-        await event.interaction.create_initial_response(
+    event_data = predictions.get(msg_id)
+    if event_data is None:
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_CREATE,
             content="Prediction event not found.",
             flags=hikari.MessageFlag.EPHEMERAL
@@ -160,8 +135,8 @@ async def on_modal_submit(event: hikari.InteractionCreateEvent) -> None:
         return
 
     # Prevent duplicate voting.
-    if user_id in predictions_data["active"][msg_id]["votes"]:
-        await event.interaction.create_initial_response(
+    if user_id in event_data["votes"]:
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_CREATE,
             content="You have already voted!",
             flags=hikari.MessageFlag.EPHEMERAL
@@ -169,43 +144,37 @@ async def on_modal_submit(event: hikari.InteractionCreateEvent) -> None:
         return
 
     # Prevent the host from voting on their own prediction.
-    #if user_id == predictions_data["active"][msg_id].get("host"):
-    #    await event.interaction.create_initial_response(
+    #if user_id == event_data.get("host"):
+    #    await interaction.create_initial_response(
     #        hikari.ResponseType.MESSAGE_CREATE,
     #        content="You cannot vote on your own prediction event.",
     #        flags=hikari.MessageFlag.EPHEMERAL
     #    )
     #    return
 
-    # Check that the user has enough points to cover the bet.
-    available_points = get_points(int(user_id))
-    if bet_value > available_points:
-        await event.interaction.create_initial_response(
+    # Check if the bet meets the minimum gamble requirement.
+    min_gamble = event_data.get("min_gamble", 0)
+    if bet_value < min_gamble:
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_CREATE,
-            content="You do not have enough points to place that bet.",
+            content=f"You must bet at least {min_gamble} points.",
             flags=hikari.MessageFlag.EPHEMERAL
         )
         return
 
-    # Check if the bet meets the minimum gamble requirement.
-    event_data = predictions_data["active"][msg_id]
-    min_gamble = event_data.get("min_gamble", 0)
-    if bet_value < min_gamble:
-        await event.interaction.create_initial_response(
+    # Take the stake now; winners are paid out of it when the prediction is resolved.
+    if debit_if_sufficient(int(user_id), bet_value, reason="predi bet") is None:
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_CREATE,
-            content=f"You must bet at least {min_gamble} points.",
+            content="You do not have enough points to place that bet.",
             flags=hikari.MessageFlag.EPHEMERAL
         )
         return
 
-    predictions_data["active"][msg_id]["votes"][user_id] = {
-        "vote": vote,
-        "bet": bet_amount
-    }
-    save_predictions(predictions_data)
-    # Calculate how many people have voted so far.
-    vote_count = len(predictions_data["active"][msg_id]["votes"])
-    await event.interaction.create_initial_response(
+    # Record the vote; returns how many people have voted so far.
+    vote_count = predictions.add_vote(msg_id, user_id, vote, bet_value)
+    VOTES.inc()
+    await interaction.create_initial_response(
         hikari.ResponseType.MESSAGE_CREATE,
         content=f"Your bet of {bet_amount} for {vote} has been recorded!\nTotal votes: {vote_count}",
         flags=hikari.MessageFlag.EPHEMERAL
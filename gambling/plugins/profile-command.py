@@ -3,7 +3,8 @@ import hikari, crescent
 plugin = crescent.Plugin[hikari.GatewayBot, None]()
 
 from gambling.client_instance import guild_id  # Ensure guild_id is an int
-from gambling.profile import get_profile, update_profile  # Profile functions
+from gambling.points import get_profile, update_profile  # Profile functions
+from gambling.profile import DEFAULT_COLOR, parse_color
 
 COLOR_CHOICES = [
     ("Blue", "0x1E90FF"),
@@ -41,22 +42,21 @@ class Profile:
 
         # If a new color is provided, update the profile.
         if self.color and self.color.strip() != "":
-            profile_data["color"] = self.color
+            profile_data.color = parse_color(self.color)
             update_profile(user.id, profile_data)
 
         # Use stored color or default if not set.
-        color_hex = profile_data.get("color", "0x1E90FF")
-        color_int = int(color_hex, 16)
+        color_int = profile_data.color or DEFAULT_COLOR
 
-        inventory = profile_data.get("inventory", [])
+        inventory = profile_data.inventory
         inventory_str = ", ".join(inventory) if inventory else "None"
         
-        achievements = profile_data.get("achievements", [])
+        achievements = profile_data.achievements
         achievements_str = ", ".join(achievements) if achievements else "None"
 
         # Set the embed title: if the profile has a title, append it.
-        if profile_data.get("title"):
-            title = f"{user.display_name} the {profile_data['title']}"
+        if profile_data.title:
+            title = f"{user.display_name} the {profile_data.title}"
         else:
             title = user.display_name
 
@@ -66,9 +66,9 @@ class Profile:
             color=color_int
         )
         embed.set_thumbnail(user.avatar_url)
-        embed.add_field(name="Points", value=str(profile_data.get("points", 0)), inline=True)
-        embed.add_field(name="Blackjack Wins", value=str(profile_data.get("wins_blackjack", 0)), inline=True)
-        embed.add_field(name="Prediction Wins", value=str(profile_data.get("wins_predi", 0)), inline=True)
+        embed.add_field(name="Points", value=str(profile_data.points), inline=True)
+        embed.add_field(name="Blackjack Wins", value=str(profile_data.wins_blackjack), inline=True)
+        embed.add_field(name="Prediction Wins", value=str(profile_data.wins_predi), inline=True)
         embed.add_field(name="Inventory", value=inventory_str, inline=False)
         embed.add_field(name="Achievements", value=achievements_str, inline=False)
         embed.set_footer(text="Customize your profile color with the /profile color command")
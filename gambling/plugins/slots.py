@@ -1,4 +1,4 @@
-import random
+import os
 from typing import List
 
 import hikari, crescent, miru
@@ -6,56 +6,23 @@ import hikari, crescent, miru
 plugin = crescent.Plugin[hikari.GatewayBot, None]()
 
 from gambling.client_instance import guild_id  # Ensure guild_id is an int
-from gambling.points import get_points, update_points
+from gambling.points import get_points, wager
+from gambling.slot_machine import ALLOWED_BETS, AUTO_SPINS, SlotMachine, auto_spin, classify_win
+from gambling.sessions import SessionStore
+from gambling.router import router
+from gambling.locks import BUSY_MESSAGE, UserBusy, one_at_a_time, user_locks
+from gambling.components import prebuild
+from gambling import metrics
 
-# Allowed bets in increasing order.
-ALLOWED_BETS: List[int] = [10, 25, 50, 100, 250, 500, 1000]
+# Slot machines with no spin or bet change for this many seconds are dropped.
+SLOTS_TTL = float(os.environ.get("SLOTS_TTL", "1800"))
 
-# Global dictionary to store active Slot Machine game states.
-SLOT_GAMES = {}
+SPINS = metrics.counter("gamble_slot_spins_total", "Slot machine spins, by how they were played.", ("mode",))
+SINGLE_SPINS = SPINS.labels("single")
+AUTO_SPINS_PLAYED = SPINS.labels("auto")
 
-class SlotMachine:
-    def __init__(self):
-        self.symbols = ['🍒', '🍋', '🍊', '🍉', '🔔', '💰']
-        self.weights = [1, 1, 1, 1, .7, .5]
-        self.rows = 3
-        self.cols = 3
-
-    def spin(self, bet: int) -> List[List[str]]:
-        return [random.choices(self.symbols, weights=self.weights, k=self.cols) for _ in range(self.rows)]
-
-    def check_wins(self, grid: List[List[str]], bet: int) -> int:
-        rows = len(grid)
-        cols = len(grid[0]) if grid else 0
-        winning_amount = 0
-        # Adjusted payouts: lower than before.
-        payouts = {
-            '🍒': int(1.4 * bet),
-            '🍋': int(1.8 * bet),
-            '🍊': int(2.5 * bet),
-            '🍉': int(3 * bet),
-            '🔔': int(5 * bet),
-            '💰': int(50 * bet)
-        }
-        # Check horizontal wins (each full row)
-        for row in grid:
-            if len(set(row)) == 1:
-                winning_amount += payouts[row[0]]
-        # Check vertical wins (each column)
-        for c in range(cols):
-            column = [grid[r][c] for r in range(rows)]
-            if len(set(column)) == 1:
-                winning_amount += payouts[column[0]]
-        # Check diagonal wins on any 3 contiguous columns:
-        # Diagonal (top-left to bottom-right)
-        for start in range(cols - 2):
-            if grid[0][start] == grid[1][start+1] == grid[2][start+2]:
-                winning_amount += payouts[grid[0][start]]
-        # Diagonal (bottom-left to top-right)
-        for start in range(cols - 2):
-            if grid[2][start] == grid[1][start+1] == grid[0][start+2]:
-                winning_amount += payouts[grid[2][start]]
-        return int(winning_amount)
+# Active Slot Machine game states, keyed by message ID. Nothing is held, so expiry just forgets them.
+SLOT_GAMES = SessionStore("slots", ttl=SLOTS_TTL)
 
 def format_grid(grid: List[List[str]]) -> str:
     left_margin = " " * 11  # Adjust this number for more/less left space.
@@ -72,7 +39,7 @@ def format_grid(grid: List[List[str]]) -> str:
     grid_output = "\n".join(left_margin + row for row in centered_rows)
     return f"{border}\n{grid_output}\n{bottom_border}"
 
-def build_slots_view(current_bet: int) -> list:
+def build_slots_view() -> list:
     view = miru.View()
     view.add_item(
         miru.Button(
@@ -96,34 +63,61 @@ def build_slots_view(current_bet: int) -> list:
             custom_id="slots_decrease"
         )
     )
+    # Auto-spin buttons on their own row.
+    for spins in AUTO_SPINS:
+        view.add_item(
+            miru.Button(
+                style=hikari.ButtonStyle.PRIMARY,
+                label=f"Auto x{spins}",
+                custom_id=f"slots_auto_{spins}",
+                row=1
+            )
+        )
     return view.build()
 
-def classify_win(winnings: int, bet: int) -> str:
-    """Classify the win type based on the total winnings relative to the bet.
-    
-    The thresholds are set to reflect combo wins:
-      - Ratio < 2: Small win
-      - Ratio from 2 up to 3.5: Large win
-      - Ratio from 3.5 up to 5: Huge win
-      - Ratio from 5 up to 10: Massive win
-      - Ratio from 10 up to 20: Small jackpot
-      - Ratio 20 or above: Large jackpot
+# The buttons are the same at every bet, so every slots message reuses one prebuilt payload.
+SLOTS_COMPONENTS = prebuild(build_slots_view())
+
+# Message pieces that don't depend on the spin, built once.
+SLOTS_TITLE = "🎰 **Lets Go Gambling** 🎰\n"
+NO_WIN_LINE = "💀  **No win this time**  💀"
+BET_LINES = {bet: f"Your bet is now **{bet}** points." for bet in ALLOWED_BETS}
+NEW_BET_PROMPT = "Press **Spin** to play with the new bet.\n"
+
+def run_auto_spin(game: dict, spins: int):
+    """
+    Play an auto-spin run for the game and settle it with one ledger write.
+    Returns the summary message, or None if the player can't afford a single spin.
     """
-    if winnings == 0:
-        return "No win"
-    ratio = winnings / bet
-    if ratio < 2:
-        return "Small Win"
-    elif ratio < 3.5:
-        return "Large Win"
-    elif ratio < 5:
-        return "Huge Win"
-    elif ratio < 10:
-        return "Massive Win"
-    elif ratio < 20:
-        return "Small Jackpot"
+    user_id = game["user_id"]
+    bet = game["current_bet"]
+    slot_machine = game["slot_machine"]
+    run = auto_spin(slot_machine, bet, spins, get_points(user_id), game["loss_limit"], game["stop_below"])
+    if run.spins == 0:
+        return None
+    # The whole run is one ledger entry; `required` is what the player needed up front.
+    new_total = wager(user_id, run.total_bet, run.total_won, reason=f"slots auto-spin x{run.spins}", cover=run.required)
+    if new_total is None:
+        return None
+    AUTO_SPINS_PLAYED.inc(run.spins)
+    grid = slot_machine.to_symbols(run.grids[run.best])
+    game["grid"] = grid  # Show the best grid of the run.
+    best_win = int(run.winnings[run.best])
+    if best_win > 0:
+        best = f"Best spin: **{classify_win(best_win, bet)}** +**{best_win}** points"
     else:
-        return "Jackpot, you're giga lucky"
+        best = "💀  **No wins this run**  💀"
+    stopped = f" (stopped early: {run.stop_reason})" if run.stop_reason else ""
+    return (
+        "🎰 **Auto-spin** 🎰\n"
+        f"**{run.spins}**/{run.requested} spins at **{bet}** points{stopped}\n"
+        f"Won on **{run.wins}** spins. {best}"
+        f"\n{format_grid(grid)}\n"
+        f"*Total Bet*: **{run.total_bet}** points\n"
+        f"*Total Won*: **{run.total_won}** points\n"
+        f"*Net*: **{run.net:+}** points\n"
+        f"*New Total*: **{new_total}** points"
+    )
 
 @plugin.include
 @crescent.command(
@@ -132,7 +126,38 @@ def classify_win(winnings: int, bet: int) -> str:
     guild=guild_id
 )
 class Slots:
+    auto_spins: int = crescent.option(
+        int,
+        "Play this many spins at once",
+        choices=[(f"{n} spins", n) for n in AUTO_SPINS],
+        default=0
+    )
+    loss_limit: int = crescent.option(
+        int,
+        "Stop an auto-spin run once it is down this many points",
+        min_value=0,
+        default=0
+    )
+    stop_below: int = crescent.option(
+        int,
+        "Stop an auto-spin run once your balance falls below this",
+        min_value=0,
+        default=0
+    )
+
     async def callback(self, ctx: crescent.Context) -> None:
+        # One game start at a time per user, like their button presses.
+        try:
+            lock = await user_locks.acquire(ctx.interaction.user.id)
+        except UserBusy:
+            await ctx.respond(BUSY_MESSAGE, flags=hikari.MessageFlag.EPHEMERAL)
+            return
+        try:
+            await self.play(ctx)
+        finally:
+            lock.release()
+
+    async def play(self, ctx: crescent.Context) -> None:
         user_id = ctx.interaction.user.id
         current_points = get_points(user_id)
         base_bet = ALLOWED_BETS[0]
@@ -140,39 +165,47 @@ class Slots:
             await ctx.respond("❌ You don't have enough points to play.")
             return
 
+        # One slot machine per user: older ones are forgotten, and their buttons report the game is gone.
+        for old_game_id in SLOT_GAMES.for_user(user_id):
+            del SLOT_GAMES[old_game_id]
+
         # Create a new SlotMachine instance (but do not spin yet)
         slot_machine = SlotMachine()
-
-        # Build the interface message (initially, no spin result is shown)
-        content = (
-            "🎰 **Slot Machine** 🎰\n"
-            f"**Base Bet:** {base_bet} points\n\n"
-            "Press **Spin** to start the game.\n"
-            "Use **Increase Bet** or **Decrease Bet** to adjust your wager."
-        )
-        view_components = build_slots_view(base_bet)
-        await ctx.respond(content, components=view_components)
-        message = await ctx.interaction.fetch_initial_response()
-        game_id = str(message.id)
-        SLOT_GAMES[game_id] = {
+        game = {
             "slot_machine": slot_machine,
             "current_bet": base_bet,
             "user_id": user_id,
-            "message_id": game_id,
-            "grid": None  # Will store the latest spun grid.
+            "grid": None,  # Will store the latest spun grid.
+            # Auto-spin stop conditions (0 means off).
+            "loss_limit": self.loss_limit,
+            "stop_below": self.stop_below
         }
 
-@plugin.include
-@crescent.event
-async def on_component_interaction_slots(event: hikari.InteractionCreateEvent) -> None:
-    if not isinstance(event.interaction, hikari.ComponentInteraction):
-        return
-    if event.interaction.custom_id not in ["slots_spin", "slots_increase", "slots_decrease"]:
-        return
+        if self.auto_spins:
+            content = run_auto_spin(game, self.auto_spins)
+            if content is None:
+                await ctx.respond("❌ You don't have enough points to play.")
+                return
+        else:
+            # Build the interface message (initially, no spin result is shown)
+            content = (
+                "🎰 **Slot Machine** 🎰\n"
+                f"**Base Bet:** {base_bet} points\n\n"
+                "Press **Spin** to start the game.\n"
+                "Use **Increase Bet** or **Decrease Bet** to adjust your wager."
+            )
+        await ctx.respond(content, components=SLOTS_COMPONENTS)
+        message = await ctx.interaction.fetch_initial_response()
+        game_id = str(message.id)
+        game["message_id"] = game_id
+        SLOT_GAMES[game_id] = game
 
-    game_id = str(event.interaction.message.id)
+@router.component("slots_spin", "slots_increase", "slots_decrease", "slots_auto_{spins}")
+@one_at_a_time
+async def on_component_interaction_slots(interaction: hikari.ComponentInteraction, spins: str = None) -> None:
+    game_id = str(interaction.message.id)
     if game_id not in SLOT_GAMES:
-        await event.interaction.create_initial_response(
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
             content="❌ Game not found.",
             flags=hikari.MessageFlag.EPHEMERAL
@@ -181,8 +214,8 @@ async def on_component_interaction_slots(event: hikari.InteractionCreateEvent) -
 
     game = SLOT_GAMES[game_id]
     user_id = game["user_id"]
-    if event.interaction.user.id != user_id:
-        await event.interaction.create_initial_response(
+    if interaction.user.id != user_id:
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
             content="❌ This isn't your game.",
             flags=hikari.MessageFlag.EPHEMERAL
@@ -190,49 +223,67 @@ async def on_component_interaction_slots(event: hikari.InteractionCreateEvent) -
         return
 
     current_bet = game["current_bet"]
-    action = event.interaction.custom_id
+    action = interaction.custom_id
 
     # For bet adjustments, we'll include the previously spun grid if it exists.
     grid = game.get("grid")
     grid_text = f"\n{format_grid(grid):^50}\n\n" if grid else "\n\n"
-    new_total = get_points(user_id)  # Current total points after any bets
 
     if action == "slots_spin":
-        if get_points(user_id) < current_bet:
-            await event.interaction.create_initial_response(
+        slot_machine = game["slot_machine"]
+        grid = slot_machine.spin(current_bet)
+        winnings = slot_machine.check_wins(grid, current_bet)
+        # Take the bet and pay out the winnings in one step.
+        new_total = wager(user_id, current_bet, winnings, reason="slots spin")
+        if new_total is None:
+            await interaction.create_initial_response(
                 hikari.ResponseType.MESSAGE_UPDATE,
                 content="❌ Not enough points for that bet.",
                 flags=hikari.MessageFlag.EPHEMERAL
             )
             return
-        # Deduct the bet.
-        update_points(user_id, get_points(user_id) - current_bet)
-        slot_machine = game["slot_machine"]
-        grid = slot_machine.spin(current_bet)
         game["grid"] = grid  # Store the spun grid in the game state.
-        winnings = slot_machine.check_wins(grid, current_bet)
+        SINGLE_SPINS.inc()
         if winnings > 0:
             win_type = classify_win(winnings, current_bet)
             win_out = f"+**{winnings}** points"
             outcome = f"🎉  **{win_type:^23}**  🎉\n {win_out:^40}"
-            update_points(user_id, get_points(user_id) + winnings)
         else:
-            outcome = f"💀  **No win this time**  💀"
-        new_total = get_points(user_id)
+            outcome = NO_WIN_LINE
         content = (
-            "🎰 **Lets Go Gambling** 🎰\n"
-            f"{outcome:^26}"
+            f"{SLOTS_TITLE}{outcome}"
             f"\n{format_grid(grid)}\n"
             f"*Bet*: **{current_bet}** points\n"
             f"*New Total*: **{new_total}** points"
         )
-        components = build_slots_view(current_bet)
-        await event.interaction.create_initial_response(
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
             content=content,
-            components=components,
+            components=SLOTS_COMPONENTS,
             
         )
+    elif spins is not None:
+        # The count comes from the custom_id, so check it's one of our buttons before playing it.
+        if not spins.isdecimal() or int(spins) not in AUTO_SPINS:
+            await interaction.create_initial_response(
+                hikari.ResponseType.MESSAGE_UPDATE,
+                content="❌ Invalid auto-spin count.",
+                flags=hikari.MessageFlag.EPHEMERAL
+            )
+            return
+        content = run_auto_spin(game, int(spins))
+        if content is None:
+            await interaction.create_initial_response(
+                hikari.ResponseType.MESSAGE_UPDATE,
+                content="❌ Not enough points for that bet.",
+                flags=hikari.MessageFlag.EPHEMERAL
+            )
+            return
+        await interaction.create_initial_response(
+            hikari.ResponseType.MESSAGE_UPDATE,
+            content=content,
+            components=SLOTS_COMPONENTS,
+        )
     elif action == "slots_increase":
         current_index = ALLOWED_BETS.index(current_bet)
         if current_index < len(ALLOWED_BETS) - 1:
@@ -242,17 +293,13 @@ async def on_component_interaction_slots(event: hikari.InteractionCreateEvent) -
         game["current_bet"] = new_bet
         new_total = get_points(user_id)
         content = (
-            "🎰 **Lets Go Gambling** 🎰\n"
-            f"Your bet is now **{new_bet}** points."
-            f"{grid_text}"
-            f"Press **Spin** to play with the new bet.\n"
+            f"{SLOTS_TITLE}{BET_LINES[new_bet]}{grid_text}{NEW_BET_PROMPT}"
             f"*New Total*: **{new_total}** points"
         )
-        components = build_slots_view(new_bet)
-        await event.interaction.create_initial_response(
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
             content=content,
-            components=components,
+            components=SLOTS_COMPONENTS,
             
         )
     elif action == "slots_decrease":
@@ -264,16 +311,12 @@ async def on_component_interaction_slots(event: hikari.InteractionCreateEvent) -
         game["current_bet"] = new_bet
         new_total = get_points(user_id)
         content = (
-            "🎰 **Lets Go Gambling** 🎰\n"
-            f"Your bet is now **{new_bet}** points."
-            f"{grid_text}"
-            f"Press **Spin** to play with the new bet.\n"
+            f"{SLOTS_TITLE}{BET_LINES[new_bet]}{grid_text}{NEW_BET_PROMPT}"
             f"*New Total*: **{new_total}** points"
         )
-        components = build_slots_view(new_bet)
-        await event.interaction.create_initial_response(
+        await interaction.create_initial_response(
             hikari.ResponseType.MESSAGE_UPDATE,
             content=content,
-            components=components,
+            components=SLOTS_COMPONENTS,
             
         )
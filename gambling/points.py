@@ -1,65 +1,110 @@
-import os
-import json
+from gambling.profile import Profile
+from gambling.storage import PROFILE_FILE, store  # noqa: F401
 
-PROFILE_FILE = "profiles.json"
+def flush() -> None:
+    """Write any pending profile changes to disk."""
+    store.flush()
 
-def load_profiles() -> dict:
-    if os.path.exists(PROFILE_FILE):
-        with open(PROFILE_FILE, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
+def preload() -> None:
+    """Load the profiles from disk now instead of on first use. Blocks, so run it in a worker thread."""
+    store.count()
 
-def save_profiles(profiles: dict) -> None:
-    with open(PROFILE_FILE, "w") as f:
-        json.dump(profiles, f, indent=4)
+def shutdown() -> None:
+    """Flush pending changes and release the profile store."""
+    store.close()
 
-def get_profile(user_id: int) -> dict:
+def get_profile(user_id: int) -> Profile:
     """
     Retrieve the user's profile. If it doesn't exist, create one with default values.
+    The profile is a copy: changes to it are only stored by `update_profile`.
     """
-    profiles = load_profiles()
-    uid = str(user_id)
-    if uid not in profiles:
-        profiles[uid] = {
-            "user_id": uid,
-            "title": "",            # Your custom title (e.g., "Champion")
-            "color": 0,             # Store color as an integer (e.g., 0x1E90FF)
-            "points": 0,            # Starting points
-            "wins_blackjack": 0,    # Blackjack wins
-            "wins_predi": 0,        # Prediction wins
-            "achievements": [],     # List to store achievement names
-            "inventory": []         # List for items you might add later
-        }
-        save_profiles(profiles)
-    return profiles[uid]
-
-def update_profile(user_id: int, profile: dict) -> None:
-    profiles = load_profiles()
-    profiles[str(user_id)] = profile
-    save_profiles(profiles)
+    return store.get_profile(user_id)
+
+def update_profile(user_id: int, profile: Profile) -> None:
+    """
+    Save the profile's title, color, stats and items. Its points are ignored: balances
+    only change through the ledger operations below, so a stale copy can't undo a credit.
+    """
+    store.update_profile(user_id, profile)
 
 def get_points(user_id: int) -> int:
     """
     Retrieve the user's points from their profile.
     """
-    profile = get_profile(user_id)
-    return profile.get("points", 0)
+    return store.get_points(user_id)
 
 def update_points(user_id: int, new_total: int) -> None:
     """
     Update the user's points in their profile. Ensures that points never go negative.
     """
-    profile = get_profile(user_id)
-    profile["points"] = new_total if new_total >= 0 else 0
-    update_profile(user_id, profile)
+    store.set_points(user_id, new_total, reason="set")
 
 def add_point(user_id: int) -> None:
     """
-    Increment the user's points by one.
+    Increment the user's points by two.
+    """
+    store.add_points(user_id, 2, reason="message")
+
+# Ledger operations. Each one checks and changes balances in a single store call,
+# so overlapping interactions can't interleave a read-modify-write and lose points.
+# `reason` is recorded with every change in the store's audit trail (e.g. "slots").
+
+def credit(user_id: int, amount: int, reason: str = "") -> int:
+    """
+    Add `amount` points to the user. Returns their new total.
     """
-    profile = get_profile(user_id)
-    profile["points"] = profile.get("points", 0) + 2
-    update_profile(user_id, profile)
+    return store.apply([(user_id, amount, 0)], reason)[int(user_id)]
+
+def debit_if_sufficient(user_id: int, amount: int, reason: str = ""):
+    """
+    Take `amount` points from the user if they have at least that many.
+    Returns their new total, or None (and changes nothing) if they can't afford it.
+    """
+    balances = store.apply([(user_id, -amount, amount)], reason)
+    return None if balances is None else balances[int(user_id)]
+
+def wager(user_id: int, stake: int, payout: int, reason: str = "", cover: int = None):
+    """
+    Settle a bet in one step: the user must be able to cover `stake`, then receives `payout`.
+    Returns their new total, or None (and changes nothing) if they can't cover the stake.
+
+    For a run of bets where winnings fund later stakes, pass the points needed up front as `cover`.
+    """
+    required = stake if cover is None else cover
+    balances = store.apply([(user_id, payout - stake, required)], reason)
+    return None if balances is None else balances[int(user_id)]
+
+def transfer(from_user_id: int, to_user_id: int, amount: int, reason: str = ""):
+    """
+    Move `amount` points between two users if the sender can afford it.
+    Returns (sender_total, receiver_total), or None if the sender is short.
+    """
+    balances = store.apply([(from_user_id, -amount, amount), (to_user_id, amount, 0)], reason)
+    if balances is None:
+        return None
+    return balances[int(from_user_id)], balances[int(to_user_id)]
+
+class Transaction:
+    """
+    A batch of credits and debits across any number of users, applied all-or-nothing.
+
+        tx = Transaction("predi payout")
+        tx.debit(host_id, 100)
+        tx.credit(winner_id, 100)
+        balances = tx.commit()  # {user_id: new_total}, or None if a debit couldn't be covered
+    """
+
+    def __init__(self, reason: str = ""):
+        self.reason = reason
+        self.entries = []
+
+    def credit(self, user_id: int, amount: int) -> None:
+        self.entries.append((int(user_id), amount, 0))
+
+    def debit(self, user_id: int, amount: int) -> None:
+        self.entries.append((int(user_id), -amount, amount))
+
+    def commit(self):
+        if not self.entries:
+            return {}
+        return store.apply(self.entries, self.reason)
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from itertools import islice
+
+from gambling.writer import file_writer
+
+PREDICTIONS_FILE = "predictions.json"
+
+# Discord allows at most 25 autocomplete choices, each name at most 100 characters.
+MAX_CHOICES = 25
+MAX_CHOICE_NAME = 100
+
+def load_predictions(path: str = PREDICTIONS_FILE) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"active": {}}
+
+class PredictionStore:
+    """
+    Active prediction events, loaded from predictions.json once and served from memory.
+
+    Events are keyed by message ID, with secondary indexes by host and a lowercased copy
+    of each prediction's text for autocomplete search. Every change is queued to be
+    written back to the file by the background file writer.
+    """
+
+    def __init__(self, path: str = PREDICTIONS_FILE):
+        self.path = path
+        self._data = None
+        # Guards the first load, which may run on a worker thread.
+        self._load_lock = threading.Lock()
+        # {host_id: {msg_id, ...}}
+        self._by_host = {}
+        # {msg_id: lowercased prediction text}
+        self._text = {}
+
+    def _active(self) -> dict:
+        """Return the active events, loading them from disk on first use."""
+        if self._data is None:
+            with self._load_lock:
+                if self._data is None:
+                    data = load_predictions(self.path)
+                    data.setdefault("active", {})
+                    for msg_id, event in data["active"].items():
+                        self._index(msg_id, event)
+                    self._data = data
+        return self._data["active"]
+
+    def _index(self, msg_id: str, event: dict) -> None:
+        self._by_host.setdefault(event.get("host"), set()).add(msg_id)
+        self._text[msg_id] = event["prediction"].lower()
+
+    def _unindex(self, msg_id: str, event: dict) -> None:
+        hosted = self._by_host.get(event.get("host"))
+        if hosted is not None:
+            hosted.discard(msg_id)
+            if not hosted:
+                del self._by_host[event.get("host")]
+        self._text.pop(msg_id, None)
+
+    def _render(self) -> str:
+        # Runs on the writer thread; the C encoder (no indent) is safe against concurrent changes.
+        return json.dumps(self._data)
+
+    def save(self) -> None:
+        """Queue the file to be rewritten; changes made until it's written go out with it."""
+        self._active()
+        file_writer.write(self.path, self._render)
+
+    def load(self) -> None:
+        """Read the file now rather than on first use (call it from a worker thread)."""
+        self._active()
+
+    def get(self, msg_id: str):
+        """The active event for a message ID, or None."""
+        return self._active().get(msg_id)
+
+    def count_for_host(self, host_id: str) -> int:
+        self._active()
+        return len(self._by_host.get(host_id, ()))
+
+    def add(self, msg_id: str, host_id: str, prediction: str, min_gamble: int) -> dict:
+        """Start a new prediction event on the given message."""
+        event = {
+            "prediction": prediction,
+            "min_gamble": min_gamble,
+            "votes": {},  # Format: {user_id: {"vote": "YES"/"NO", "bet": <amount>, "staked": True}}
+            "host": host_id,
+            "timestamp": time.time()
+        }
+        self._active()[msg_id] = event
+        self._index(msg_id, event)
+        self.save()
+        return event
+
+    def add_vote(self, msg_id: str, user_id: str, vote: str, bet: int) -> int:
+        """
+        Record a vote whose bet has already been taken from the voter. Returns the event's vote count.
+
+        The vote is marked as staked, so settlement pays it out of escrow; votes saved before
+        stakes were taken at vote time have no mark and settle under the old rules.
+        """
+        votes = self._active()[msg_id]["votes"]
+        votes[user_id] = {"vote": vote, "bet": bet, "staked": True}
+        self.save()
+        return len(votes)
+
+    def pop(self, msg_id: str):
+        """Remove and return an active event, or None if there is no such event."""
+        event = self._active().pop(msg_id, None)
+        if event is not None:
+            self._unindex(msg_id, event)
+            self.save()
+        return event
+
+    def search(self, query: str, limit: int = MAX_CHOICES) -> list:
+        """
+        Message IDs of active events matching `query`, best matches first.
+
+        Text that starts with the query ranks above text that merely contains it; the
+        query also matches the end of the message ID, which is what the choice labels show.
+        Newest events come first within each group.
+        """
+        active = self._active()
+        query = query.strip().lower()
+        # Events are only ever appended, so reverse insertion order is newest first.
+        if not query:
+            return list(islice(reversed(active), limit))
+        prefix, contains = [], []
+        for msg_id in reversed(active):
+            text = self._text[msg_id]
+            if text.startswith(query):
+                prefix.append(msg_id)
+            elif query in text or msg_id.endswith(query):
+                contains.append(msg_id)
+            if len(prefix) >= limit:
+                break
+        return (prefix + contains)[:limit]
+
+    def choices(self, query: str) -> list:
+        """Autocomplete choices (label, msg_id) for active events matching `query`."""
+        active = self._active()
+        choices = []
+        for msg_id in self.search(query):
+            event = active[msg_id]
+            label = f"ID: ..{msg_id[-4:]} | Prediction: {event['prediction'].capitalize()} (Votes: {len(event.get('votes', {}))})"
+            if len(label) > MAX_CHOICE_NAME:
+                label = label[:MAX_CHOICE_NAME - 1] + "…"
+            choices.append((label, msg_id))
+        return choices
+
+# Shared prediction store used by /predi and /predi-outcome.
+predictions = PredictionStore(PREDICTIONS_FILE)
@@ -1,47 +1,86 @@
-import os
-import json
-
-PROFILE_FILE = "profiles.json"
-
-def load_profiles() -> dict:
-    """Load profiles from the JSON file."""
-    if os.path.exists(PROFILE_FILE):
-        with open(PROFILE_FILE, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-
-def save_profiles(profiles: dict) -> None:
-    """Save profiles to the JSON file."""
-    with open(PROFILE_FILE, "w") as f:
-        json.dump(profiles, f, indent=4)
-
-def get_profile(user_id: int) -> dict:
+from typing import Iterable
+
+# Embed color used when a profile has no color set.
+DEFAULT_COLOR = 0x1E90FF
+
+def parse_color(value) -> int:
+    """
+    Normalize a stored color to an int. Older profiles hold hex strings like "0x1E90FF",
+    an empty string, or 0; all of these become an int (0 meaning "not set").
     """
-    Retrieve the profile for a user. If the profile doesn't exist,
-    create a new profile with default values.
+    if isinstance(value, int):
+        return value
+    value = (value or "").strip().lower()
+    if not value:
+        return 0
+    if value.startswith("#"):
+        value = value[1:]
+    try:
+        return int(value, 16)
+    except ValueError:
+        return 0
+
+class Profile:
+    """
+    A user's profile.
+
+    Uses __slots__ so each profile is a small fixed-size record instead of a dict, and
+    keeps achievements/inventory as tuples so empty ones share the same empty tuple.
     """
-    profiles = load_profiles()
-    uid = str(user_id)
-    if uid not in profiles:
-        # Create a new profile with default values.
-        profiles[uid] = {
-            "user_id": uid,
-            "title": "",            # Your custom title (e.g., "Champion")
-            "color": 0,             # Store color as an integer (e.g., 0x1E90FF)
-            "points": 0,            # Starting points
-            "wins_blackjack": 0,    # Blackjack wins
-            "wins_predi": 0,        # Prediction wins
-            "achievements": [],     # List to store achievement names
-            "inventory": []         # List for items you might add later
+
+    __slots__ = (
+        "user_id",          # Discord user ID
+        "title",            # Your custom title (e.g., "Champion")
+        "color",            # Embed color as an integer (e.g., 0x1E90FF), 0 if not set
+        "points",
+        "wins_blackjack",
+        "wins_predi",
+        "achievements",     # Achievement names
+        "inventory",        # Items you might add later
+    )
+
+    def __init__(self, user_id: int, title: str = "", color: int = 0, points: int = 0,
+                 wins_blackjack: int = 0, wins_predi: int = 0,
+                 achievements: Iterable[str] = (), inventory: Iterable[str] = ()):
+        self.user_id = int(user_id)
+        self.title = title
+        self.color = color
+        self.points = points
+        self.wins_blackjack = wins_blackjack
+        self.wins_predi = wins_predi
+        self.achievements = tuple(achievements)
+        self.inventory = tuple(inventory)
+
+    def copy(self) -> "Profile":
+        """A detached copy: changing it doesn't change this profile."""
+        return Profile(*(getattr(self, field) for field in self.__slots__))
+
+    @classmethod
+    def from_dict(cls, data: dict, user_id: int = None) -> "Profile":
+        """Build a profile from its profiles.json representation."""
+        return cls(
+            user_id if user_id is not None else data["user_id"],
+            title=data.get("title", ""),
+            color=parse_color(data.get("color", 0)),
+            points=data.get("points", 0),
+            wins_blackjack=data.get("wins_blackjack", 0),
+            wins_predi=data.get("wins_predi", 0),
+            achievements=data.get("achievements", ()),
+            inventory=data.get("inventory", ()),
+        )
+
+    def to_dict(self) -> dict:
+        """The profiles.json representation of this profile."""
+        return {
+            "user_id": str(self.user_id),
+            "title": self.title,
+            "color": self.color,
+            "points": self.points,
+            "wins_blackjack": self.wins_blackjack,
+            "wins_predi": self.wins_predi,
+            "achievements": list(self.achievements),
+            "inventory": list(self.inventory)
         }
-        save_profiles(profiles)
-    return profiles[uid]
-
-def update_profile(user_id: int, profile: dict) -> None:
-    """Update the profile for a user and save the profiles."""
-    profiles = load_profiles()
-    profiles[str(user_id)] = profile
-    save_profiles(profiles)
+
+    def __repr__(self) -> str:
+        return f"Profile(user_id={self.user_id}, points={self.points})"
@@ -0,0 +1,164 @@
+"""
+On-demand sampling profiler for the bot's handlers.
+
+While a profiling window is open, a background thread looks at the event-loop thread's
+stack every PROFILING_INTERVAL seconds. The innermost registered handler on the stack
+(a slash command, a button or modal route, or an event listener) gets the sample,
+along with the stack below it. Handlers are recognised by their code objects, so nothing
+wraps them: with profiling off there is no thread and no per-call cost.
+
+When the window closes, each handler's samples are written to PROFILING_DIR/<time>/ as
+"<handler>.folded" (one "outer;inner count" line per stack, the input flamegraph.pl and
+speedscope take), next to summary.txt listing the busiest handlers and their top
+functions by cumulative and self samples.
+"""
+import asyncio
+import collections
+import inspect
+import os
+import re
+import sys
+import threading
+import time
+
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "profiling")
+# Profile this many seconds from startup (0: only when asked with /profiler).
+PROFILING_SECONDS = float(os.environ.get("PROFILING_SECONDS", "0"))
+# Seconds between stack samples.
+PROFILING_INTERVAL = float(os.environ.get("PROFILING_INTERVAL", "0.002"))
+# Functions listed per handler in summary.txt.
+PROFILING_TOP = int(os.environ.get("PROFILING_TOP", "20"))
+
+def describe(code) -> str:
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class HandlerProfiler:
+    def __init__(self, interval: float = PROFILING_INTERVAL, directory: str = PROFILING_DIR, top: int = PROFILING_TOP):
+        self.interval = interval
+        self.directory = directory
+        self.top = top
+        # {code object: handler name}
+        self._handlers = {}
+        # {handler name: Counter({stack of code objects, outermost first: samples})}
+        self._stacks = {}
+        self.total_samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._timer = None
+        self._switch_interval = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def register(self, name: str, fn) -> None:
+        """Attribute samples taken inside `fn` (unwrapped through decorators) to `name`."""
+        code = inspect.unwrap(fn).__code__
+        existing = self._handlers.get(code)
+        # One function can serve several routes, e.g. every blackjack button.
+        if existing is not None and name not in existing.split(" | "):
+            name = f"{existing} | {name}"
+        self._handlers[code] = name
+
+    def register_commands(self, modules=None) -> None:
+        """Register every crescent slash command defined in the bot's modules."""
+        for module_name, module in list((modules or sys.modules).items()):
+            if not module_name.startswith("gambling"):
+                continue
+            for obj in list(vars(module).values()):
+                metadata = getattr(obj, "metadata", None)
+                app_command = getattr(metadata, "app_command", None)
+                if app_command is not None:
+                    self.register(f"command:/{app_command.name}", metadata.callback)
+
+    def _sample_loop(self, thread_id: int) -> None:
+        handlers = self._handlers
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            codes = []
+            handler = None
+            # Walk from the innermost frame out; the first handler found is the most specific.
+            while frame is not None:
+                code = frame.f_code
+                if handler is None:
+                    codes.append(code)
+                    handler = handlers.get(code)
+                frame = frame.f_back
+            self.total_samples += 1
+            if handler is not None:
+                codes.reverse()
+                stacks = self._stacks.get(handler)
+                if stacks is None:
+                    stacks = self._stacks[handler] = collections.Counter()
+                stacks[tuple(codes)] += 1
+
+    def start(self, seconds: float) -> None:
+        """Open a profiling window on the running event loop; it closes and writes its report after `seconds`."""
+        if self.running:
+            return
+        self._stacks = {}
+        self.total_samples = 0
+        self.started_at = time.time()
+        self._stop.clear()
+        # The loop thread only gives up the GIL every switch interval (5 ms by default) while it
+        # runs Python code, so handlers shorter than that would never be sampled mid-run.
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        self._thread = threading.Thread(
+            target=self._sample_loop, args=(threading.get_ident(),), name="handler-profiler", daemon=True
+        )
+        self._thread.start()
+        self._timer = asyncio.get_running_loop().call_later(seconds, lambda: asyncio.ensure_future(self.stop()))
+
+    async def stop(self):
+        """Close the window and write the report. Returns its directory, or None if nothing was running."""
+        if not self.running:
+            return None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        self.stopped_at = time.time()
+        await asyncio.to_thread(thread.join)
+        sys.setswitchinterval(self._switch_interval)
+        return await asyncio.to_thread(self.write_report)
+
+    def summary(self) -> str:
+        duration = (self.stopped_at or time.time()) - self.started_at
+        lines = [
+            f"{self.total_samples} samples over {duration:.1f}s "
+            f"from {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))}",
+        ]
+        ranked = sorted(self._stacks.items(), key=lambda item: -sum(item[1].values()))
+        for handler, stacks in ranked:
+            samples = sum(stacks.values())
+            cumulative, own = collections.Counter(), collections.Counter()
+            for codes, count in stacks.items():
+                own[codes[-1]] += count
+                for code in set(codes):
+                    cumulative[code] += count
+            lines.append("")
+            share = samples / max(self.total_samples, 1)
+            lines.append(f"{handler}: {samples} samples ({share:.1%} of the loop), ~{share * duration * 1000:.0f} ms on the loop")
+            lines.append(f"  {'cumulative':>10} {'self':>6}  function")
+            for code, count in cumulative.most_common(self.top):
+                lines.append(f"  {count:>10} {own[code]:>6}  {describe(code)}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self) -> str:
+        directory = os.path.join(self.directory, time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at)))
+        os.makedirs(directory, exist_ok=True)
+        for handler, stacks in self._stacks.items():
+            filename = re.sub(r"[^\w.-]+", "_", handler).strip("_") + ".folded"
+            with open(os.path.join(directory, filename), "w") as f:
+                for codes, count in stacks.most_common():
+                    f.write(";".join(describe(code) for code in codes) + f" {count}\n")
+        with open(os.path.join(directory, "summary.txt"), "w") as f:
+            f.write(self.summary())
+        return directory
+
+# The profiler the /profiler command and PROFILING_SECONDS drive.
+profiler = HandlerProfiler()
@@ -0,0 +1,136 @@
+import re
+import time
+
+import hikari
+
+from gambling.latency import latency
+
+class Route:
+    """A registered custom_id pattern, its handler and its latency counters."""
+
+    __slots__ = ("pattern", "fields", "handler", "calls", "errors", "total_seconds", "max_seconds")
+
+    def __init__(self, pattern: str, fields: list, handler):
+        self.pattern = pattern
+        # Names of the {fields} after the literal prefix, in order.
+        self.fields = fields
+        self.handler = handler
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+class InteractionRouter:
+    """
+    Dispatches component and modal interactions to the handler registered for their custom_id.
+
+    A pattern is "_"-separated: literal parts, optionally followed by {fields}, e.g.
+    "bj_hit" or "predi_bet_{vote}_{msg_id}". Literal parts form a trie, so a custom_id is
+    split once and walked to the longest registered prefix; the remaining parts fill the
+    fields (the last field takes everything left, underscores included). Handlers are
+    called as `handler(interaction, **fields)`.
+    """
+
+    def __init__(self):
+        # {interaction type: trie}; a trie node is {part: node}, with its route under None.
+        self._tries = {}
+        self.unrouted = 0
+
+    def route(self, interaction_type: hikari.InteractionType, *patterns: str):
+        """Decorator registering a handler for one or more custom_id patterns."""
+        def register(handler):
+            for pattern in patterns:
+                prefix, brace, rest = pattern.partition("{")
+                literal = prefix.rstrip("_").split("_")
+                fields = re.findall(r"\{(\w+)\}", brace + rest)
+                if "_".join("{%s}" % f for f in fields) != brace + rest:
+                    raise ValueError(f"Fields must come after the literal parts: {pattern!r}")
+                node = self._tries.setdefault(interaction_type, {})
+                for part in literal:
+                    node = node.setdefault(part, {})
+                if None in node:
+                    raise ValueError(f"Route {pattern!r} is already registered")
+                node[None] = Route(pattern, fields, handler)
+            return handler
+        return register
+
+    def component(self, *patterns: str):
+        return self.route(hikari.InteractionType.MESSAGE_COMPONENT, *patterns)
+
+    def modal(self, *patterns: str):
+        return self.route(hikari.InteractionType.MODAL_SUBMIT, *patterns)
+
+    def match(self, interaction_type: hikari.InteractionType, custom_id: str):
+        """The route for a custom_id and its parsed fields, or (None, None)."""
+        node = self._tries.get(interaction_type)
+        if node is None:
+            return None, None
+        parts = custom_id.split("_")
+        best, best_depth = node.get(None), 0
+        for depth, part in enumerate(parts, 1):
+            node = node.get(part)
+            if node is None:
+                break
+            if None in node:
+                best, best_depth = node[None], depth
+        if best is None:
+            return None, None
+        rest = parts[best_depth:]
+        if not best.fields:
+            # A pattern without fields only matches the whole custom_id.
+            return (best, {}) if not rest else (None, None)
+        if len(rest) < len(best.fields):
+            return None, None
+        values = rest[:len(best.fields) - 1] + ["_".join(rest[len(best.fields) - 1:])]
+        return best, dict(zip(best.fields, values))
+
+    async def dispatch(self, interaction: hikari.PartialInteraction) -> bool:
+        """Run the handler for a component or modal interaction. Returns whether one matched."""
+        custom_id = getattr(interaction, "custom_id", None)
+        if custom_id is None:
+            return False
+        route, fields = self.match(interaction.type, custom_id)
+        if route is None:
+            self.unrouted += 1
+            return False
+        start = time.perf_counter()
+        try:
+            await route.handler(interaction, **fields)
+        except Exception:
+            route.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            route.calls += 1
+            route.total_seconds += elapsed
+            latency.record(f"interaction:{route.pattern}", elapsed)
+            if elapsed > route.max_seconds:
+                route.max_seconds = elapsed
+        return True
+
+    def routes(self) -> list:
+        found = []
+        stack = list(self._tries.values())
+        while stack:
+            node = stack.pop()
+            for part, child in node.items():
+                if part is None:
+                    found.append(child)
+                else:
+                    stack.append(child)
+        return found
+
+    def stats(self) -> dict:
+        """Per-route call counts and handler latency, keyed by pattern."""
+        return {route.pattern: route.stats() for route in self.routes()}
+
+# The router every plugin registers its buttons and modals with.
+router = InteractionRouter()
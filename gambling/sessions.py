@@ -0,0 +1,229 @@
+import asyncio
+import inspect
+import time
+import traceback
+
+# How often session stores check for expired sessions (seconds).
+SESSION_TICK = 1.0
+# Slots in each store's timer wheel.
+WHEEL_SIZE = 64
+
+# Every store created, so they can be started and stopped together.
+_stores = []
+
+class SessionStore:
+    """
+    Game sessions keyed by message ID that expire after `ttl` seconds without activity.
+
+    Behaves like a dict. Reading a session with `store[key]` or `get` counts as activity
+    and pushes its expiry back. Expiry is driven by a hashed timer wheel: each session sits
+    in the slot for its deadline, and every tick only that slot is checked. A refreshed
+    session is moved to its new slot when its old one comes round, so a touch is O(1).
+
+    `on_expire(key, session)` runs for each expired session, e.g. to refund a pending bet;
+    it may be a coroutine function. `on_close` (by default the same callback) runs for each
+    session still live when the store is stopped, so a restart doesn't lose what they hold.
+
+    Sessions are dicts; their "user_id" is indexed so `for_user` finds a user's sessions
+    without scanning the store.
+    """
+
+    def __init__(self, name: str, ttl: float, on_expire=None, on_close=None,
+                 tick: float = SESSION_TICK, wheel_size: int = WHEEL_SIZE):
+        self.name = name
+        self.ttl = ttl
+        self.on_expire = on_expire
+        self.on_close = on_expire if on_close is None else on_close
+        self.tick = tick
+        self._sessions = {}
+        # {key: monotonic time it expires}
+        self._deadlines = {}
+        self._wheel = [set() for _ in range(wheel_size)]
+        # {key: wheel slot it's in}
+        self._slot_of = {}
+        # {user_id: {key, ...}}
+        self._by_user = {}
+        # Index of the last tick processed.
+        self._tick_index = int(time.monotonic() / tick)
+        # Counters.
+        self.created = 0
+        self.evictions = 0
+        self._task = None
+        _stores.append(self)
+
+    def _schedule(self, key, deadline: float) -> None:
+        # The first tick at or after the deadline, so the session is due when its slot comes round.
+        slot = (int(deadline / self.tick) + 1) % len(self._wheel)
+        self._slot_of[key] = slot
+        self._wheel[slot].add(key)
+
+    def _unschedule(self, key) -> None:
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self._wheel[slot].discard(key)
+
+    def _index(self, key, session: dict) -> None:
+        user_id = session.get("user_id")
+        if user_id is not None:
+            self._by_user.setdefault(user_id, set()).add(key)
+
+    def _unindex(self, key, session: dict) -> None:
+        keys = self._by_user.get(session.get("user_id"))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[session.get("user_id")]
+
+    def for_user(self, user_id) -> list:
+        """Keys of the user's live sessions."""
+        return list(self._by_user.get(user_id, ()))
+
+    def touch(self, key) -> None:
+        """Push the session's expiry back to `ttl` seconds from now."""
+        if key in self._deadlines:
+            self._deadlines[key] = time.monotonic() + self.ttl
+
+    def __setitem__(self, key, session) -> None:
+        if key in self._sessions:
+            self._unindex(key, self._sessions[key])
+        else:
+            self.created += 1
+        self._sessions[key] = session
+        self._index(key, session)
+        self._deadlines[key] = time.monotonic() + self.ttl
+        if key not in self._slot_of:
+            self._schedule(key, self._deadlines[key])
+
+    def __getitem__(self, key):
+        session = self._sessions[key]
+        self.touch(key)
+        return session
+
+    def get(self, key, default=None):
+        if key not in self._sessions:
+            return default
+        return self[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __delitem__(self, key) -> None:
+        self._unindex(key, self._sessions.pop(key))
+        del self._deadlines[key]
+        self._unschedule(key)
+
+    def pop(self, key, default=None):
+        """Remove a session without running `on_expire`."""
+        if key not in self._sessions:
+            return default
+        session = self._sessions[key]
+        del self[key]
+        return session
+
+    def items(self):
+        return self._sessions.items()
+
+    def expire(self, now: float = None) -> list:
+        """
+        Remove every session whose deadline has passed, walking the wheel slots for the
+        ticks since the last call. Returns the expired (key, session) pairs; callbacks
+        are not run here.
+        """
+        now = time.monotonic() if now is None else now
+        current = int(now / self.tick)
+        # After a full turn of the wheel every slot has been visited.
+        first = max(self._tick_index + 1, current - len(self._wheel) + 1)
+        expired = []
+        for tick in range(first, current + 1):
+            slot = self._wheel[tick % len(self._wheel)]
+            for key in list(slot):
+                slot.discard(key)
+                del self._slot_of[key]
+                if self._deadlines[key] <= now:
+                    session = self._sessions.pop(key)
+                    self._unindex(key, session)
+                    expired.append((key, session))
+                    del self._deadlines[key]
+                else:
+                    # Refreshed since it was scheduled, or due on a later turn of the wheel.
+                    self._schedule(key, self._deadlines[key])
+        self._tick_index = max(self._tick_index, current)
+        self.evictions += len(expired)
+        return expired
+
+    @staticmethod
+    async def _notify(callback, sessions: list) -> None:
+        if callback is None:
+            return
+        for key, session in sessions:
+            try:
+                result = callback(key, session)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                traceback.print_exc()
+
+    async def expire_and_notify(self, now: float = None) -> int:
+        """Expire due sessions and run `on_expire` for each. Returns how many expired."""
+        expired = self.expire(now)
+        await self._notify(self.on_expire, expired)
+        return len(expired)
+
+    async def close(self) -> int:
+        """Stop expiring sessions, then remove every live one and run `on_close` for it. Returns how many."""
+        await self.stop()
+        closed = [(key, self.pop(key)) for key in list(self._sessions)]
+        await self._notify(self.on_close, closed)
+        return len(closed)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick)
+            await self.expire_and_notify()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self._sessions),
+            "created": self.created,
+            "evictions": self.evictions,
+        }
+
+# Fire-and-forget tasks, referenced here until they finish so they aren't garbage collected.
+_background = set()
+
+def spawn(coro) -> asyncio.Task:
+    """Run a coroutine in the background without waiting for it."""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+def start_all() -> None:
+    """Start the expiry task of every session store."""
+    for store in _stores:
+        store.start()
+
+async def stop_all() -> None:
+    """Close every session store, running `on_close` (e.g. refunds) for each live session."""
+    for store in _stores:
+        await store.close()
+
+def stats() -> dict:
+    """Gauges for every session store, keyed by store name."""
+    return {store.name: store.stats() for store in _stores}
@@ -0,0 +1,96 @@
+import numpy as np
+
+from gambling.points import Transaction
+
+# How winners are paid:
+#   "fixed": every winner gets back double their stake.
+#   "pool":  parimutuel; all stakes form one pool shared by the winners in proportion to their stake.
+ODDS = ("fixed", "pool")
+
+# Fixed-odds payout as a multiple of the stake (the stake itself is included).
+FIXED_MULTIPLIER = 2
+
+def parse_bet(bet) -> int:
+    """Votes from older predictions.json files store the bet as a string."""
+    try:
+        return int(bet)
+    except (TypeError, ValueError):
+        return 0
+
+class Settlement:
+    """
+    The result of settling one prediction: one entry per voter, as parallel arrays.
+
+    Staked votes had their bet taken when they were placed, so `payouts` is the full
+    amount credited back to each voter (0 for losers). Votes placed before stakes were
+    taken (no "staked" flag) were never debited: they settle under the old rules, where
+    a winner is credited double the bet and a loser pays nothing.
+    """
+
+    def __init__(self, user_ids: np.ndarray, bets: np.ndarray, won: np.ndarray, payouts: np.ndarray,
+                 staked: np.ndarray):
+        self.user_ids = user_ids
+        self.bets = bets
+        self.won = won
+        self.payouts = payouts
+        self.staked = staked
+        # Filled in by `apply`: {user_id: new_total} for every winner and refunded voter.
+        self.new_totals = {}
+
+    @property
+    def pool(self) -> int:
+        """Points actually collected: the stakes of staked votes."""
+        return int(self.bets[self.staked].sum())
+
+    @property
+    def paid_out(self) -> int:
+        return int(self.payouts.sum())
+
+    def apply(self, reason: str = "predi payout") -> dict:
+        """Credit every payout in one ledger transaction. Returns {user_id: new_total}."""
+        # Winners are always included (even on a 0 bet) so every winner gets a new total.
+        paid = self.won | (self.payouts > 0)
+        tx = Transaction(reason)
+        for user_id, payout in zip(self.user_ids[paid].tolist(), self.payouts[paid].tolist()):
+            tx.credit(user_id, payout)
+        self.new_totals = tx.commit()
+        return self.new_totals
+
+def vote_table(votes: dict) -> tuple:
+    """Turn {user_id: {"vote": ..., "bet": ..., "staked": ...}} into (user_ids, votes_yes, bets, staked) arrays."""
+    count = len(votes)
+    user_ids = np.fromiter((int(uid) for uid in votes), dtype=np.int64, count=count)
+    votes_yes = np.fromiter((data["vote"] == "YES" for data in votes.values()), dtype=bool, count=count)
+    bets = np.fromiter((parse_bet(data["bet"]) for data in votes.values()), dtype=np.int64, count=count)
+    staked = np.fromiter((bool(data.get("staked")) for data in votes.values()), dtype=bool, count=count)
+    return user_ids, votes_yes, bets, staked
+
+def settle(votes: dict, outcome: str, odds: str = "fixed") -> Settlement:
+    """
+    Work out every voter's payout for a resolved prediction in one vectorized pass.
+
+    With pool odds and no staked winning votes, every stake is refunded. Only staked
+    votes form the pool; unstaked winners are paid double their bet whatever the odds.
+    """
+    if odds not in ODDS:
+        raise ValueError(f"Unknown odds {odds!r}, expected one of {ODDS}")
+    user_ids, votes_yes, bets, staked = vote_table(votes)
+    won = votes_yes == (outcome == "YES")
+    if odds == "fixed":
+        payouts = np.where(won, bets * FIXED_MULTIPLIER, 0)
+    else:
+        winning_stake = int(bets[won & staked].sum())
+        if winning_stake == 0:
+            payouts = np.where(staked, bets, 0)
+        else:
+            # Integer math, rounded down, so the house keeps at most a point per winner from
+            # rounding and the payouts never add up to more than the pool.
+            pool = int(bets[staked].sum())
+            if int(bets.max()) * pool < 2**63:
+                shares = bets * pool // winning_stake
+            else:
+                # bets * pool would overflow int64; the shares themselves fit, being at most the pool.
+                shares = (bets.astype(object) * pool // winning_stake).astype(np.int64)
+            payouts = np.where(won & staked, shares, 0)
+        payouts = np.where(won & ~staked, bets * FIXED_MULTIPLIER, payouts)
+    return Settlement(user_ids, bets, won, payouts, staked)
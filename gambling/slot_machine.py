@@ -0,0 +1,225 @@
+import random
+from itertools import accumulate
+from typing import List
+
+import numpy as np
+
+# Allowed bets in increasing order.
+ALLOWED_BETS: List[int] = [10, 25, 50, 100, 250, 500, 1000]
+
+# Spins per auto-spin run offered by /slots.
+AUTO_SPINS: List[int] = [10, 50, 100]
+
+# Reel symbols and how likely each one is to land in a cell.
+SYMBOLS = ['🍒', '🍋', '🍊', '🍉', '🔔', '💰']
+WEIGHTS = [1, 1, 1, 1, .7, .5]
+# Adjusted payouts: lower than before. Winnings per matching line, as a multiple of the bet.
+PAYOUTS = [1.4, 1.8, 2.5, 3, 5, 50]
+
+# spin_many scores grids in blocks of this many spins to keep temporaries small.
+SPIN_CHUNK = 1 << 16
+
+def win_lines(rows: int, cols: int) -> list:
+    """
+    Every winning line as flat cell indices: each full row, each column, and both
+    diagonals on any 3 contiguous columns (reading the first three rows).
+    """
+    lines = [[r * cols + c for c in range(cols)] for r in range(rows)]
+    lines += [[r * cols + c for r in range(rows)] for c in range(cols)]
+    for start in range(cols - 2):
+        # Diagonal (top-left to bottom-right)
+        lines.append([start, cols + start + 1, 2 * cols + start + 2])
+        # Diagonal (bottom-left to top-right)
+        lines.append([2 * cols + start, cols + start + 1, start + 2])
+    return lines
+
+class SlotMachine:
+    """
+    A slot machine whose grids are integer arrays of symbol indices.
+
+    `spin_many` draws and scores any number of grids at once; `spin` and `check_wins`
+    work on a single grid of symbols for display.
+    """
+
+    def __init__(self, symbols: List[str] = SYMBOLS, weights: List[float] = WEIGHTS,
+                 payouts: List[float] = PAYOUTS, rows: int = 3, cols: int = 3, seed=None):
+        self.symbols = list(symbols)
+        self.weights = list(weights)
+        self.payouts = list(payouts)
+        self.rows = rows
+        self.cols = cols
+        self.lines = win_lines(rows, cols)
+        self.rng = np.random.default_rng(seed)
+        # Single spins draw with the random module, which is much quicker than NumPy for 9 cells.
+        self._random = random.Random(seed)
+        self._cum_weights = list(accumulate(self.weights))
+        # A cell lands on symbol i when a random uint32 is at or above i of these thresholds.
+        cumulative = np.cumsum(self.weights[:-1]) / sum(self.weights)
+        self._thresholds = np.round(cumulative * 2**32).astype(np.uint64).clip(0, 2**32 - 1).astype(np.uint32)
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        # {bet: payout per line for each symbol}
+        self._tables = {}
+
+    def payout_table(self, bet: int) -> np.ndarray:
+        """Winnings for a line of each symbol at this bet, indexed like `symbols`."""
+        table = self._tables.get(bet)
+        if table is None:
+            table = self._tables[bet] = np.array([int(m * bet) for m in self.payouts], dtype=np.int64)
+        return table
+
+    # Internally grids are cell-major, shape (rows * cols, n), so each cell is one contiguous row.
+
+    def _draw_cells(self, n: int) -> np.ndarray:
+        draws = self.rng.integers(0, 2**32, size=(self.rows * self.cols, n), dtype=np.uint32)
+        cells = np.zeros(draws.shape, dtype=np.int8)
+        for threshold in self._thresholds:
+            cells += draws >= threshold
+        return cells
+
+    def score_cells(self, cells: np.ndarray, bet: int) -> np.ndarray:
+        """Total winnings of each grid in a cell-major (rows * cols, n) array."""
+        table = self.payout_table(bet)
+        winnings = np.zeros(cells.shape[1], dtype=np.int64)
+        for line in self.lines:
+            first = cells[line[0]]
+            won = first == cells[line[1]]
+            for i in line[2:]:
+                won &= first == cells[i]
+            # Wins are rare, so only look up payouts for the spins that hit this line.
+            hits = np.flatnonzero(won)
+            winnings[hits] += table[first[hits]]
+        return winnings
+
+    def draw(self, n: int) -> np.ndarray:
+        """n random grids as an (n, rows, cols) array of symbol indices."""
+        return self._draw_cells(n).T.reshape(n, self.rows, self.cols)
+
+    def score(self, grids: np.ndarray, bet: int) -> np.ndarray:
+        """Total winnings of each grid in an (n, rows, cols) array."""
+        cells = np.ascontiguousarray(grids.reshape(len(grids), -1).T)
+        return self.score_cells(cells, bet)
+
+    def spin_many(self, n: int, bet: int) -> tuple:
+        """Spin n times. Returns (grids, winnings): an (n, rows, cols) array and the winnings of each spin."""
+        grids = np.empty((n, self.rows, self.cols), dtype=np.int8)
+        winnings = np.empty(n, dtype=np.int64)
+        for start in range(0, n, SPIN_CHUNK):
+            stop = min(start + SPIN_CHUNK, n)
+            cells = self._draw_cells(stop - start)
+            winnings[start:stop] = self.score_cells(cells, bet)
+            grids[start:stop] = cells.T.reshape(-1, self.rows, self.cols)
+        return grids, winnings
+
+    def to_symbols(self, grid: np.ndarray) -> List[List[str]]:
+        """One grid of symbol indices as rows of symbols."""
+        return [[self.symbols[i] for i in row] for row in grid.tolist()]
+
+    def spin(self, bet: int) -> List[List[str]]:
+        cells = self._random.choices(self.symbols, cum_weights=self._cum_weights, k=self.rows * self.cols)
+        return [cells[r * self.cols:(r + 1) * self.cols] for r in range(self.rows)]
+
+    def check_wins(self, grid: List[List[str]], bet: int) -> int:
+        # Scoring one grid is quicker in plain Python than through NumPy.
+        cells = [self._symbol_index[symbol] for row in grid for symbol in row]
+        table = self.payout_table(bet).tolist()
+        winning_amount = 0
+        for line in self.lines:
+            first = cells[line[0]]
+            if all(cells[i] == first for i in line[1:]):
+                winning_amount += table[first]
+        return winning_amount
+
+class AutoSpin:
+    """
+    A run of spins at one bet, played until done or until a stop condition hits.
+
+    Only the first `spins` of the `requested` grids were played; `grids` and `winnings`
+    are trimmed to those.
+    """
+
+    def __init__(self, bet: int, requested: int, grids: np.ndarray, winnings: np.ndarray,
+                 required: int, stop_reason: str = None):
+        self.bet = bet
+        self.requested = requested
+        self.grids = grids
+        self.winnings = winnings
+        # Points the player needed up front to afford every spin played.
+        self.required = required
+        # Why the run ended early, or None if every spin was played.
+        self.stop_reason = stop_reason
+
+    @property
+    def spins(self) -> int:
+        return len(self.winnings)
+
+    @property
+    def total_bet(self) -> int:
+        return self.spins * self.bet
+
+    @property
+    def total_won(self) -> int:
+        return int(self.winnings.sum())
+
+    @property
+    def net(self) -> int:
+        return self.total_won - self.total_bet
+
+    @property
+    def wins(self) -> int:
+        return int(np.count_nonzero(self.winnings))
+
+    @property
+    def best(self) -> int:
+        """Index of the biggest win (the first spin if nothing won)."""
+        return int(self.winnings.argmax())
+
+def auto_spin(machine: SlotMachine, bet: int, spins: int, balance: int,
+              loss_limit: int = 0, stop_below: int = 0) -> AutoSpin:
+    """
+    Spin up to `spins` times from `balance` in one batch. Stops before any spin the player
+    can't afford, once the balance has dropped below `stop_below`, or once the net loss
+    reaches `loss_limit` (0 means no limit).
+    """
+    grids, winnings = machine.spin_many(spins, bet)
+    # Net change to the balance before each spin.
+    before = np.concatenate(([0], np.cumsum(winnings - bet)[:-1]))
+    balances = balance + before
+    stops = (
+        ("not enough points", balances < bet),
+        ("balance floor", balances < stop_below),
+        ("loss limit", (-before >= loss_limit) if loss_limit > 0 else np.zeros(spins, dtype=bool)),
+    )
+    played, stop_reason = spins, None
+    for reason, stopped in stops:
+        hit = np.flatnonzero(stopped)
+        if len(hit) and hit[0] < played:
+            played, stop_reason = int(hit[0]), reason
+    required = bet - int(before[:played].min()) if played else 0
+    return AutoSpin(bet, spins, grids[:played], winnings[:played], required, stop_reason)
+
+def classify_win(winnings: int, bet: int) -> str:
+    """Classify the win type based on the total winnings relative to the bet.
+
+    The thresholds are set to reflect combo wins:
+      - Ratio < 2: Small win
+      - Ratio from 2 up to 3.5: Large win
+      - Ratio from 3.5 up to 5: Huge win
+      - Ratio from 5 up to 10: Massive win
+      - Ratio from 10 up to 20: Small jackpot
+      - Ratio 20 or above: Large jackpot
+    """
+    if winnings == 0:
+        return "No win"
+    ratio = winnings / bet
+    if ratio < 2:
+        return "Small Win"
+    elif ratio < 3.5:
+        return "Large Win"
+    elif ratio < 5:
+        return "Huge Win"
+    elif ratio < 10:
+        return "Massive Win"
+    elif ratio < 20:
+        return "Small Jackpot"
+    else:
+        return "Jackpot, you're giga lucky"
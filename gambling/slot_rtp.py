@@ -0,0 +1,128 @@
+"""
+Exact return-to-player (RTP) of the slot machine.
+
+Usage:
+    python -m gambling.slot_rtp [--bets 10 25 ...] [--max-rtp 1.0]
+
+Enumerates every possible grid of the configured symbols, weights and payouts in
+gambling/slot_machine.py, and prints the expected return, house edge, hit rate,
+payout spread and chance of each classify_win tier for every bet. Exits with
+status 1 if any bet returns at least --max-rtp, so run it before shipping a
+payout change.
+"""
+import argparse
+import sys
+import time
+from itertools import product
+
+import numpy as np
+
+from gambling.slot_machine import ALLOWED_BETS, SlotMachine, classify_win
+
+# Grids are enumerated in blocks of at most this many.
+BLOCK_SIZE = 1 << 17
+
+def line_distribution(machine: SlotMachine) -> dict:
+    """
+    The exact chance of every combination of winning lines, as {counts: probability},
+    where counts[i] is how many lines of symbol i a grid wins.
+
+    Winnings at any bet follow from the counts, so the grids only need enumerating once.
+    """
+    symbols = len(machine.symbols)
+    cells = machine.rows * machine.cols
+    probability = np.array(machine.weights, dtype=np.float64) / sum(machine.weights)
+    # A grid's line counts packed into one integer, one digit (base `base`) per symbol.
+    base = len(machine.lines) + 1
+    digits = base ** np.arange(symbols, dtype=np.int64)
+
+    # Enumerate the last `tail` cells all at once, and loop over every value of the rest.
+    tail = 1
+    while tail < cells and symbols ** (tail + 1) <= BLOCK_SIZE:
+        tail += 1
+    tail_cells = np.indices((symbols,) * tail, dtype=np.int8).reshape(tail, -1)
+    tail_probability = probability[tail_cells].prod(axis=0)
+    block = np.empty((cells, tail_cells.shape[1]), dtype=np.int8)
+    block[cells - tail:] = tail_cells
+
+    totals = {}
+    for head in product(range(symbols), repeat=cells - tail):
+        block[:cells - tail] = np.array(head, dtype=np.int8)[:, None]
+        keys = np.zeros(block.shape[1], dtype=np.int64)
+        for line in machine.lines:
+            first = block[line[0]]
+            won = first == block[line[1]]
+            for i in line[2:]:
+                won &= first == block[i]
+            hits = np.flatnonzero(won)
+            keys[hits] += digits[first[hits]]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        weights = np.bincount(inverse, weights=tail_probability) * probability[list(head)].prod()
+        for key, weight in zip(unique.tolist(), weights.tolist()):
+            totals[key] = totals.get(key, 0.0) + weight
+
+    return {tuple((key // base ** i) % base for i in range(symbols)): p for key, p in totals.items()}
+
+def analyze(machine: SlotMachine, bet: int, lines: dict = None) -> dict:
+    """
+    Exact statistics of one spin at `bet`. Pass `lines` from line_distribution to
+    analyze several bets without enumerating the grids again.
+    """
+    if lines is None:
+        lines = line_distribution(machine)
+    table = machine.payout_table(bet).tolist()
+    winnings = {}
+    for counts, p in lines.items():
+        amount = sum(c * t for c, t in zip(counts, table))
+        winnings[amount] = winnings.get(amount, 0.0) + p
+    mean = sum(w * p for w, p in winnings.items())
+    variance = sum(w * w * p for w, p in winnings.items()) - mean * mean
+    tiers = {}
+    for amount, p in sorted(winnings.items()):
+        tier = classify_win(amount, bet)
+        tiers[tier] = tiers.get(tier, 0.0) + p
+    return {
+        "bet": bet,
+        "rtp": mean / bet,
+        "house_edge": 1 - mean / bet,
+        "hit_rate": 1 - winnings.get(0, 0.0),
+        # Standard deviation of one spin's winnings, in bets.
+        "stdev": max(variance, 0.0) ** 0.5 / bet,
+        "max_win": max(winnings),
+        "tiers": tiers,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bets", type=int, nargs="+", default=ALLOWED_BETS)
+    parser.add_argument("--max-rtp", type=float, default=1.0,
+                        help="Fail if any bet returns this much or more (default: %(default)s)")
+    args = parser.parse_args()
+
+    machine = SlotMachine()
+    start = time.perf_counter()
+    lines = line_distribution(machine)
+    elapsed = time.perf_counter() - start
+    results = [analyze(machine, bet, lines) for bet in args.bets]
+
+    print(f"{len(machine.symbols) ** (machine.rows * machine.cols):,} grids enumerated in {elapsed:.1f}s")
+    for symbol, weight, payout in zip(machine.symbols, machine.weights, machine.payouts):
+        print(f"  {symbol}  weight {weight:<4}  pays {payout}x per line")
+    print()
+    print(f"{'bet':>6} {'RTP':>8} {'edge':>8} {'hit rate':>9} {'stdev':>7} {'max win':>9}")
+    for r in results:
+        print(f"{r['bet']:>6} {r['rtp']:>8.3%} {r['house_edge']:>8.3%} {r['hit_rate']:>9.3%} "
+              f"{r['stdev']:>6.2f}x {r['max_win']:>9}")
+    print()
+    tiers = list(dict.fromkeys(tier for r in results for tier in r["tiers"]))
+    print(f"{'tier':<28}" + "".join(f"{r['bet']:>10}" for r in results))
+    for tier in tiers:
+        print(f"{tier:<28}" + "".join(f"{r['tiers'].get(tier, 0.0):>10.4%}" for r in results))
+
+    leaking = [r["bet"] for r in results if r["rtp"] >= args.max_rtp]
+    if leaking:
+        print(f"\nRTP is at or above {args.max_rtp:.2%} for bets {leaking}.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+import os
+import json
+import logging
+import operator
+import atexit
+import sqlite3
+import threading
+import time
+
+from gambling.profile import Profile, parse_color
+from gambling.metrics import BYTES_WRITTEN, PERSISTENCE_SECONDS
+
+PROFILE_FILE = "profiles.json"
+PROFILE_DB = os.environ.get("PROFILE_DB", "profiles.db")
+
+# Which backend holds the profiles: "json" (profiles.json) or "sqlite" (profiles.db).
+PROFILE_STORE = os.environ.get("PROFILE_STORE", "json")
+
+# Seconds between background flushes of changed profiles to disk (JSON backend).
+FLUSH_INTERVAL = float(os.environ.get("POINTS_FLUSH_INTERVAL", "5"))
+
+# Compact the journal into a fresh profiles.json snapshot once it grows past this many bytes.
+JOURNAL_COMPACT_BYTES = int(os.environ.get("JOURNAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
+
+# Profile fields `update_profile` saves; points are left to the ledger operations.
+PROFILE_FIELDS = ("title", "color", "wins_blackjack", "wins_predi", "achievements", "inventory")
+
+# Key in the snapshot holding the sequence number of the last journal record it includes.
+SNAPSHOT_SEQ_KEY = "_journal_seq"
+
+logger = logging.getLogger(__name__)
+
+# A profile's fields as a tuple, in Profile's constructor order.
+_profile_row = operator.attrgetter(*Profile.__slots__)
+
+def decode_profile(data: dict):
+    """
+    json object_hook that turns profile objects into Profile records as they are parsed,
+    so a large profiles.json never exists in memory as dicts all at once.
+    """
+    return Profile.from_dict(data) if "user_id" in data else data
+
+def load_snapshot(path: str = PROFILE_FILE, object_hook=None) -> tuple:
+    """
+    Return (profiles, seq) from a snapshot file, where profiles is the profiles.json dict
+    (values decoded by `object_hook`, if given) and seq is the last journal record it includes.
+    """
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                profiles = json.load(f, object_hook=object_hook)
+            except json.JSONDecodeError:
+                return {}, 0
+        seq = profiles.pop(SNAPSHOT_SEQ_KEY, 0)
+        return profiles, seq
+    return {}, 0
+
+def load_profiles(path: str = PROFILE_FILE) -> dict:
+    return load_snapshot(path)[0]
+
+def write_file(path: str, data: str) -> None:
+    # Write to a temporary file first so a crash mid-write can't truncate the file.
+    start = time.perf_counter()
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+    # JSON is ASCII unless told otherwise, so characters are bytes.
+    BYTES_WRITTEN.labels(os.path.basename(path)).inc(len(data))
+    PERSISTENCE_SECONDS.labels("write_file").observe(time.perf_counter() - start)
+
+def save_profiles(profiles: dict, path: str = PROFILE_FILE) -> None:
+    write_file(path, json.dumps(profiles, indent=4))
+
+def write_snapshot(path: str, profiles: dict, seq: int) -> None:
+    """
+    Atomically write profiles ({user_id: profiles.json dict}) as a snapshot, one profile per line.
+
+    Encoding profile by profile (rather than one big json.dumps) lets other threads
+    run in between, so a large snapshot doesn't stall the event loop.
+    """
+    start = time.perf_counter()
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.write("{\n")
+        for uid, profile in profiles.items():
+            f.write(f"    {json.dumps(str(uid))}: {json.dumps(profile)},\n")
+        f.write(f"    {json.dumps(SNAPSHOT_SEQ_KEY)}: {seq}\n}}\n")
+        size = f.tell()
+    os.replace(tmp_file, path)
+    BYTES_WRITTEN.labels(os.path.basename(path)).inc(size)
+    PERSISTENCE_SECONDS.labels("snapshot").observe(time.perf_counter() - start)
+
+def plan_entries(entries: list, balances: dict):
+    """
+    Work out the net point change per user for a batch of ledger entries.
+
+    `entries` is a list of (user_id, delta, required) applied in order: an entry only
+    goes through if the user's running balance is at least `required`. `balances` maps
+    each user ID to their current points. Returns {user_id: net_delta}, or None if any
+    entry fails its check (in which case nothing should be applied).
+    """
+    running = dict(balances)
+    net = {}
+    for user_id, delta, required in entries:
+        if running[user_id] < required or running[user_id] + delta < 0:
+            return None
+        running[user_id] += delta
+        net[user_id] = net.get(user_id, 0) + delta
+    return net
+
+
+class JsonStore:
+    """
+    Profiles kept in memory, persisted as a profiles.json snapshot plus an append-only journal.
+
+    Profiles are held as `Profile` records keyed by integer user ID. Every mutation is
+    recorded as one journal line: a point change
+    `{"n": seq, "t": time, "u": user_id, "d": delta, "r": reason}` or a whole profile
+    `{"n": seq, "t": time, "u": user_id, "p": profile}`. Lines are buffered and appended
+    to the journal by a daemon thread every `flush_interval` seconds, so a write costs
+    the same no matter how many users exist. Once the journal passes `compact_bytes`,
+    the flusher writes a new snapshot and moves the old journal aside as
+    `<journal>.<timestamp>`, which keeps every slots spin, hand and payout for audits.
+
+    On startup the snapshot is loaded and every journal record newer than the
+    snapshot's sequence number is replayed on top of it.
+    """
+
+    def __init__(self, path: str = PROFILE_FILE, flush_interval: float = FLUSH_INTERVAL,
+                 compact_bytes: int = JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        self._profiles = None
+        self._seq = 0
+        # Journal lines not yet appended to the file.
+        self._pending = []
+        # Guards the in-memory profiles and the pending lines.
+        self._lock = threading.RLock()
+        # Serializes journal appends and compaction.
+        self._io_lock = threading.Lock()
+        self._flusher = None
+        self._stop_flusher = threading.Event()
+        # Only updated with `_io_lock` held.
+        self._journal_bytes = BYTES_WRITTEN.labels(os.path.basename(self.journal_path))
+        self._journal_seconds = PERSISTENCE_SECONDS.labels("journal_append")
+
+    def _compacting_path(self) -> str:
+        return self.journal_path + ".compacting"
+
+    def _cache(self) -> dict:
+        """Return the in-memory profiles, loading them from disk on first use."""
+        if self._profiles is None:
+            with self._lock:
+                if self._profiles is None:
+                    self._profiles = self._load()
+                    self._start_flusher()
+        return self._profiles
+
+    def _load(self) -> dict:
+        raw, seq = load_snapshot(self.path, object_hook=decode_profile)
+        profiles = {int(uid): profile for uid, profile in raw.items()}
+        del raw
+        self._seq = seq
+        # A ".compacting" journal is left behind if we crashed mid-compaction; replay it first.
+        for journal in (self._compacting_path(), self.journal_path):
+            if not os.path.exists(journal):
+                continue
+            with open(journal, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append.
+                        continue
+                    if record["n"] <= seq:
+                        continue
+                    self._replay(profiles, record)
+                    self._seq = max(self._seq, record["n"])
+        return profiles
+
+    @staticmethod
+    def _replay(profiles: dict, record: dict) -> None:
+        uid = int(record["u"])
+        if "p" in record:
+            profiles[uid] = Profile.from_dict(record["p"], uid)
+        else:
+            profile = profiles.get(uid)
+            if profile is None:
+                profile = profiles[uid] = Profile(uid)
+            profile.points += record["d"]
+
+    def _record(self, uid: int, **fields) -> None:
+        """Queue a journal line. Must be called with `_lock` held."""
+        self._seq += 1
+        self._pending.append(json.dumps({"n": self._seq, "t": round(time.time(), 3), "u": uid, **fields}))
+
+    def _record_deltas(self, changes: list, reason: str) -> None:
+        """Queue one journal line per (user_id, delta). Must be called with `_lock` held."""
+        # Formatted directly rather than through json.dumps; this is the hot path for batched payouts.
+        now = round(time.time(), 3)
+        reason = json.dumps(reason)
+        for uid, delta in changes:
+            self._seq += 1
+            self._pending.append(f'{{"n": {self._seq}, "t": {now}, "u": {uid}, "d": {delta}, "r": {reason}}}')
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="points-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop_flusher.wait(self.flush_interval):
+            try:
+                self.flush()
+                if self.journal_size() > self.compact_bytes:
+                    self.compact()
+            except Exception:
+                logger.exception("Failed to flush profiles to %s", self.journal_path)
+
+    def _append_pending(self) -> None:
+        """Append buffered journal lines to the file. Must be called with `_io_lock` held."""
+        with self._lock:
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+        start = time.perf_counter()
+        data = "\n".join(lines) + "\n"
+        with open(self.journal_path, "a") as f:
+            f.write(data)
+        self._journal_bytes.inc(len(data))
+        self._journal_seconds.observe(time.perf_counter() - start)
+
+    def flush(self) -> None:
+        """Append any buffered mutations to the journal."""
+        with self._io_lock:
+            self._append_pending()
+
+    def journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def compact(self) -> None:
+        """Write a fresh snapshot and move the journal it covers aside."""
+        if self._profiles is None:
+            return
+        with self._io_lock:
+            self._append_pending()
+            with self._lock:
+                # Copy under the lock so the snapshot matches `seq` exactly, but only as tuples of
+                # the profiles' fields: building the dicts takes long enough at 100k profiles to
+                # stall every ledger call waiting on the lock. Records made after this point have
+                # a higher sequence number and stay in the live journal.
+                rows = list(map(_profile_row, self._profiles.values()))
+                seq = self._seq
+            # Appends take _io_lock, which we hold, so the journal can be moved outside _lock.
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, self._compacting_path())
+            snapshot = {row[0]: Profile(*row).to_dict() for row in rows}
+            write_snapshot(self.path, snapshot, seq)
+            if os.path.exists(self._compacting_path()):
+                os.replace(self._compacting_path(), f"{self.journal_path}.{int(time.time() * 1000)}")
+
+    def close(self) -> None:
+        """Stop the background flusher and write any pending changes."""
+        self._stop_flusher.set()
+        self.flush()
+
+    def all_profiles(self) -> dict:
+        """Every profile, keyed by integer user ID (the live in-memory dict)."""
+        return self._cache()
+
+    def _live(self, user_id: int) -> Profile:
+        """The user's in-memory profile record, created if missing. Only changed with `_lock` held."""
+        profiles = self._cache()
+        uid = int(user_id)
+        profile = profiles.get(uid)
+        if profile is None:
+            with self._lock:
+                profile = profiles.get(uid)
+                if profile is None:
+                    profile = profiles[uid] = Profile(uid)
+                    self._record(uid, p=profile.to_dict())
+        return profile
+
+    def get_profile(self, user_id: int) -> Profile:
+        """A copy of the user's profile, as SqliteStore returns; save changes with `update_profile`."""
+        live = self._live(user_id)
+        with self._lock:
+            return live.copy()
+
+    def update_profile(self, user_id: int, profile: Profile) -> None:
+        """Save everything but the points, which only change through the ledger operations."""
+        live = self._live(user_id)
+        with self._lock:
+            # Copied onto the live profile, so a credit since `profile` was read isn't undone.
+            for field in PROFILE_FIELDS:
+                setattr(live, field, getattr(profile, field))
+            self._record(live.user_id, p=live.to_dict())
+
+    def get_points(self, user_id: int) -> int:
+        return self._live(user_id).points
+
+    def set_points(self, user_id: int, total: int, reason: str = "") -> None:
+        profile = self._live(user_id)
+        with self._lock:
+            delta = max(total, 0) - profile.points
+            profile.points = max(total, 0)
+            self._record(profile.user_id, d=delta, r=reason)
+
+    def add_points(self, user_id: int, amount: int, reason: str = "") -> int:
+        profile = self._live(user_id)
+        with self._lock:
+            profile.points += amount
+            self._record(profile.user_id, d=amount, r=reason)
+            return profile.points
+
+    def apply(self, entries: list, reason: str = ""):
+        """Atomically apply ledger entries. Returns {user_id: new_points} or None if any check fails."""
+        entries = [(int(user_id), delta, required) for user_id, delta, required in entries]
+        by_user = {user_id: self._live(user_id) for user_id, _, _ in entries}
+        with self._lock:
+            net = plan_entries(entries, {uid: profile.points for uid, profile in by_user.items()})
+            if net is None:
+                return None
+            changes = [(user_id, delta) for user_id, delta in net.items() if delta]
+            for user_id, delta in changes:
+                by_user[user_id].points += delta
+            self._record_deltas(changes, reason)
+            return {uid: profile.points for uid, profile in by_user.items()}
+
+    def count(self) -> int:
+        return len(self._cache())
+
+
+class SqliteStore:
+    """
+    Profiles stored one row per user in an SQLite database running in WAL mode.
+
+    Point changes are single `UPDATE ... SET points = points + ?` statements, so they
+    cost the same regardless of how many users exist and can't be lost to a concurrent writer.
+    Each change is also appended to the `ledger` table as an audit trail.
+    """
+
+    def __init__(self, path: str = PROFILE_DB):
+        self.path = path
+        self._lock = threading.RLock()
+        # isolation_level=None: we manage transactions explicitly with BEGIN/COMMIT.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                user_id        INTEGER PRIMARY KEY,
+                title          TEXT    NOT NULL DEFAULT '',
+                color          INTEGER NOT NULL DEFAULT 0,
+                points         INTEGER NOT NULL DEFAULT 0,
+                wins_blackjack INTEGER NOT NULL DEFAULT 0,
+                wins_predi     INTEGER NOT NULL DEFAULT 0,
+                achievements   TEXT    NOT NULL DEFAULT '[]',
+                inventory      TEXT    NOT NULL DEFAULT '[]'
+            );
+            CREATE INDEX IF NOT EXISTS idx_profiles_points ON profiles(points);
+            CREATE INDEX IF NOT EXISTS idx_profiles_wins_blackjack ON profiles(wins_blackjack);
+            CREATE INDEX IF NOT EXISTS idx_profiles_wins_predi ON profiles(wins_predi);
+            CREATE TABLE IF NOT EXISTS ledger (
+                id      INTEGER PRIMARY KEY,
+                ts      REAL    NOT NULL,
+                user_id INTEGER NOT NULL,
+                delta   INTEGER NOT NULL,
+                reason  TEXT    NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_ledger_user_id ON ledger(user_id);
+            """
+        )
+
+    def _ensure(self, user_id: int) -> None:
+        self._conn.execute("INSERT OR IGNORE INTO profiles (user_id) VALUES (?)", (int(user_id),))
+
+    def _row_to_profile(self, row: tuple) -> Profile:
+        user_id, title, color, points, wins_blackjack, wins_predi, achievements, inventory = row
+        return Profile(
+            user_id,
+            title=title,
+            # Databases migrated before colors were normalized may still hold hex strings.
+            color=parse_color(color),
+            points=points,
+            wins_blackjack=wins_blackjack,
+            wins_predi=wins_predi,
+            achievements=json.loads(achievements),
+            inventory=json.loads(inventory)
+        )
+
+    def get_profile(self, user_id: int) -> Profile:
+        with self._lock:
+            self._ensure(user_id)
+            row = self._conn.execute(
+                "SELECT user_id, title, color, points, wins_blackjack, wins_predi, achievements, inventory "
+                "FROM profiles WHERE user_id = ?",
+                (int(user_id),)
+            ).fetchone()
+        return self._row_to_profile(row)
+
+    def update_profile(self, user_id: int, profile: Profile) -> None:
+        """Save everything but the points, which only change through the ledger operations."""
+        with self._lock:
+            self._ensure(user_id)
+            self._conn.execute(
+                "UPDATE profiles SET title = ?, color = ?, wins_blackjack = ?, wins_predi = ?, "
+                "achievements = ?, inventory = ? WHERE user_id = ?",
+                (
+                    profile.title,
+                    profile.color,
+                    profile.wins_blackjack,
+                    profile.wins_predi,
+                    json.dumps(list(profile.achievements)),
+                    json.dumps(list(profile.inventory)),
+                    int(user_id)
+                )
+            )
+
+    def _profile_params(self, user_id: int, profile: Profile) -> tuple:
+        return (
+            user_id,
+            profile.title,
+            profile.color,
+            profile.points,
+            profile.wins_blackjack,
+            profile.wins_predi,
+            json.dumps(list(profile.achievements)),
+            json.dumps(list(profile.inventory))
+        )
+
+    def get_points(self, user_id: int) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT points FROM profiles WHERE user_id = ?", (int(user_id),)).fetchone()
+        return row[0] if row else 0
+
+    def _log(self, changes, reason: str) -> None:
+        """Append (user_id, delta) pairs to the ledger. Must run inside the caller's transaction."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO ledger (ts, user_id, delta, reason) VALUES (?, ?, ?, ?)",
+            ((now, user_id, delta, reason) for user_id, delta in changes)
+        )
+
+    def set_points(self, user_id: int, total: int, reason: str = "") -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure(user_id)
+                old = self._conn.execute("SELECT points FROM profiles WHERE user_id = ?", (int(user_id),)).fetchone()[0]
+                self._conn.execute("UPDATE profiles SET points = ? WHERE user_id = ?", (max(total, 0), int(user_id)))
+                self._log([(int(user_id), max(total, 0) - old)], reason)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add_points(self, user_id: int, amount: int, reason: str = "") -> int:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._ensure(user_id)
+                row = self._conn.execute(
+                    "UPDATE profiles SET points = points + ? WHERE user_id = ? RETURNING points",
+                    (amount, int(user_id))
+                ).fetchone()
+                self._log([(int(user_id), amount)], reason)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return row[0]
+
+    def apply(self, entries: list, reason: str = ""):
+        """Atomically apply ledger entries. Returns {user_id: new_points} or None if any check fails."""
+        entries = [(int(user_id), delta, required) for user_id, delta, required in entries]
+        user_ids = list(dict.fromkeys(user_id for user_id, _, _ in entries))
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so no other writer can slip in between the check and the update.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO profiles (user_id) VALUES (?)", ((uid,) for uid in user_ids))
+                balances = {}
+                # Stay well below SQLite's bound-parameter limit for large batches.
+                for i in range(0, len(user_ids), 500):
+                    chunk = user_ids[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    balances.update(self._conn.execute(
+                        f"SELECT user_id, points FROM profiles WHERE user_id IN ({placeholders})", chunk
+                    ).fetchall())
+                net = plan_entries(entries, balances)
+                if net is None:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                changes = [(uid, delta) for uid, delta in net.items() if delta]
+                self._conn.executemany("UPDATE profiles SET points = points + ? WHERE user_id = ?", ((d, u) for u, d in changes))
+                self._log(changes, reason)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return {uid: balances[uid] + net.get(uid, 0) for uid in user_ids}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def import_profiles(self, profiles: dict) -> int:
+        """Insert or replace every profile in a {user_id: Profile} dict in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO profiles "
+                    "(user_id, title, color, points, wins_blackjack, wins_predi, achievements, inventory) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self._profile_params(int(uid), profile) for uid, profile in profiles.items())
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(profiles)
+
+    def flush(self) -> None:
+        # Every statement is already committed; checkpoint so the WAL doesn't grow unbounded.
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(kind: str = PROFILE_STORE):
+    """Create the profile store selected by PROFILE_STORE."""
+    if kind == "sqlite":
+        return SqliteStore(PROFILE_DB)
+    if kind == "json":
+        return JsonStore(PROFILE_FILE)
+    raise ValueError(f"Unknown PROFILE_STORE {kind!r}, expected 'json' or 'sqlite'")
+
+# The one profile store shared by gambling.points, /profile and every game plugin.
+store = open_store()
+atexit.register(store.close)
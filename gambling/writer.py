@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+import traceback
+
+from gambling.storage import write_file
+
+# Seconds the writer waits after the first queued write, so a burst of changes to
+# a file is written once.
+WRITE_DELAY = float(os.environ.get("FILE_WRITE_DELAY", "0.05"))
+
+class FileWriter:
+    """
+    Writes files from a background thread, so handlers never wait on the disk.
+
+    `write(path, render)` queues a write and returns at once; `render()` is called on the
+    writer thread to produce the file's text. Writes to a path that is already queued are
+    collapsed: only the latest `render` runs, once, so a file changed a hundred times in a
+    burst is written once. Anything changed after its `render` ran is queued again and
+    written on the next pass.
+
+    `render` runs while the event loop may still be changing the data, so it must not
+    iterate over live dicts in Python; `json.dumps` without `indent` is fine (the C
+    encoder copies each dict's items before encoding them).
+    """
+
+    def __init__(self, delay: float = WRITE_DELAY):
+        self.delay = delay
+        # {path: render} waiting to be written, in the order first queued.
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        # Set while nothing is pending or being written.
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closing = False
+        self._thread = None
+        # Counters.
+        self.requested = 0
+        self.coalesced = 0
+        self.written = 0
+        self.errors = 0
+        self.write_seconds = 0.0
+
+    def write(self, path: str, render) -> None:
+        with self._lock:
+            if path in self._pending:
+                self.coalesced += 1
+            self._pending[path] = render
+            self.requested += 1
+            self._idle.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="file-writer", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            if self.delay > 0 and not self._closing:
+                time.sleep(self.delay)
+            self._wake.clear()
+            self._write_pending()
+            if self._closing:
+                return
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for path, render in pending.items():
+            start = time.perf_counter()
+            try:
+                write_file(path, render())
+                self.written += 1
+            except Exception:
+                self.errors += 1
+                traceback.print_exc()
+            self.write_seconds += time.perf_counter() - start
+        with self._lock:
+            if not self._pending:
+                self._idle.set()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every queued write is on disk. Returns False on timeout."""
+        self._wake.set()
+        return self._idle.wait(timeout)
+
+    def close(self) -> None:
+        """Write whatever is queued and stop the thread. The writer can still be used afterwards."""
+        self._closing = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        # Anything queued after the thread's last pass.
+        self._write_pending()
+        # A later write starts a fresh thread, with the usual delay.
+        self._closing = False
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "requested": self.requested,
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "mean_write_ms": self.write_seconds / self.written * 1000 if self.written else 0.0,
+        }
+
+# The writer shared by every store that saves whole files.
+file_writer = FileWriter()
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from gambling import points
+from gambling.activity import ActivityAccrual
+from gambling.storage import JsonStore
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = JsonStore(str(tmp_path / "profiles.json"), flush_interval=0)
+    monkeypatch.setattr(points, "store", s)
+    return s
+
+def fail_once(store, monkeypatch):
+    """Make the store's next apply raise, as a full disk would."""
+    apply = store.apply
+
+    def failing(entries, reason=""):
+        monkeypatch.setattr(store, "apply", apply)
+        raise OSError("disk full")
+    monkeypatch.setattr(store, "apply", failing)
+
+def test_flush_credits_every_user_once(store):
+    accrual = ActivityAccrual(points_per_message=2)
+    for user_id in (1, 1, 2, 1):
+        accrual.record(user_id)
+    assert accrual.pending_points(1) == 6
+    assert accrual.flush() == 2
+    assert (points.get_points(1), points.get_points(2)) == (6, 2)
+    assert accrual.stats() == {"events_accepted": 4, "events_pending": 0, "flushes": 1, "points_credited": 8}
+    assert accrual.flush() == 0
+
+def test_enough_events_flush_early(store):
+    async def main():
+        accrual = ActivityAccrual(points_per_message=2, flush_interval=60, flush_events=3)
+        accrual.start()
+        accrual.record(1)
+        accrual.record(2)
+        await asyncio.sleep(0.05)
+        # Under the event threshold, and the interval is far off.
+        assert points.get_points(1) == 0
+        accrual.record(1)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if not accrual.pending:
+                break
+        credited = (points.get_points(1), points.get_points(2))
+        await accrual.stop()
+        return credited
+    assert asyncio.run(main()) == (4, 2)
+
+def test_failed_flush_keeps_the_batch(store, monkeypatch):
+    accrual = ActivityAccrual(points_per_message=2)
+    accrual.record(1)
+    accrual.record(2)
+    fail_once(store, monkeypatch)
+    with pytest.raises(OSError):
+        accrual.flush()
+    assert accrual.pending == {1: 1, 2: 1}
+    assert accrual.stats()["events_pending"] == 2
+    assert accrual.flush() == 2
+    assert (points.get_points(1), points.get_points(2)) == (2, 2)
+
+def test_failed_background_flush_is_retried(store, monkeypatch):
+    async def main():
+        accrual = ActivityAccrual(points_per_message=2, flush_interval=0.01)
+        fail_once(store, monkeypatch)
+        accrual.start()
+        accrual.record(1)
+        await asyncio.sleep(0.005)
+        accrual.record(1)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if accrual.flushes:
+                break
+        await accrual.stop()
+        return accrual
+    accrual = asyncio.run(main())
+    # Both messages are credited once: the failed batch was merged back, not dropped or doubled.
+    assert points.get_points(1) == 4
+    assert accrual.stats()["points_credited"] == 4
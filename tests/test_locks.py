@@ -0,0 +1,98 @@
+import asyncio
+import types
+
+import pytest
+
+from gambling import locks
+from gambling.locks import BUSY_MESSAGE, UserBusy, UserLocks, one_at_a_time
+
+class FakeInteraction:
+    def __init__(self, user_id):
+        self.user = types.SimpleNamespace(id=user_id)
+        self.responses = []
+
+    async def create_initial_response(self, response_type, **kwargs):
+        self.responses.append(kwargs.get("content"))
+
+@pytest.fixture
+def user_locks(monkeypatch):
+    registry = UserLocks(timeout=0.05)
+    monkeypatch.setattr(locks, "user_locks", registry)
+    return registry
+
+def make_handler(log, release):
+    @one_at_a_time
+    async def handler(interaction, **fields):
+        log.append(("start", interaction.user.id, fields.get("n")))
+        await release.wait()
+        log.append(("end", interaction.user.id, fields.get("n")))
+    return handler
+
+def test_same_user_runs_one_after_the_other(user_locks):
+    user_locks.timeout = 1
+
+    async def main():
+        log, release = [], asyncio.Event()
+        handler = make_handler(log, release)
+        first = asyncio.create_task(handler(FakeInteraction(1), n=1))
+        second = asyncio.create_task(handler(FakeInteraction(1), n=2))
+        await asyncio.sleep(0.01)
+        # The second click waits for the first instead of running alongside it.
+        assert log == [("start", 1, 1)]
+        release.set()
+        await asyncio.gather(first, second)
+        return log
+    assert asyncio.run(main()) == [("start", 1, 1), ("end", 1, 1), ("start", 1, 2), ("end", 1, 2)]
+    assert user_locks.contended == 1
+    assert user_locks.timeouts == 0
+
+def test_different_users_dont_block_each_other(user_locks):
+    async def main():
+        log, release = [], asyncio.Event()
+        handler = make_handler(log, release)
+        tasks = [asyncio.create_task(handler(FakeInteraction(uid))) for uid in (1, 2)]
+        await asyncio.sleep(0.01)
+        started = sorted(uid for event, uid, _ in log if event == "start")
+        release.set()
+        await asyncio.gather(*tasks)
+        return started
+    assert asyncio.run(main()) == [1, 2]
+    assert user_locks.contended == 0
+
+def test_waiting_past_the_timeout_gets_the_busy_reply(user_locks):
+    async def main():
+        log, release = [], asyncio.Event()
+        handler = make_handler(log, release)
+        first = asyncio.create_task(handler(FakeInteraction(1)))
+        await asyncio.sleep(0)
+        late = FakeInteraction(1)
+        # Bounded, so the test fails rather than hangs if the lock lets it through.
+        await asyncio.wait_for(handler(late), 1)
+        release.set()
+        await first
+        return log, late.responses
+    log, responses = asyncio.run(main())
+    assert responses == [BUSY_MESSAGE]
+    # The turned-away click never ran.
+    assert [event for event, _, _ in log] == ["start", "end"]
+    assert user_locks.timeouts == 1
+
+def test_zero_timeout_fails_at_once():
+    async def main():
+        registry = UserLocks()
+        lock = await registry.acquire(1)
+        with pytest.raises(UserBusy):
+            await registry.acquire(1, timeout=0)
+        lock.release()
+        # Free again, so it doesn't wait.
+        (await registry.acquire(1, timeout=0)).release()
+    asyncio.run(main())
+
+def test_idle_users_hold_no_lock():
+    async def main():
+        registry = UserLocks()
+        async with registry.hold(1):
+            assert registry.stats()["live"] == 1
+        return registry
+    registry = asyncio.run(main())
+    assert registry.stats()["live"] == 0
@@ -0,0 +1,79 @@
+import asyncio
+import types
+
+import hikari
+import pytest
+
+from gambling.router import InteractionRouter
+
+COMPONENT = hikari.InteractionType.MESSAGE_COMPONENT
+MODAL = hikari.InteractionType.MODAL_SUBMIT
+
+async def handler(interaction, **fields):
+    interaction.handled = fields
+
+@pytest.fixture
+def router():
+    r = InteractionRouter()
+    r.component("bj_hit", "bj_stand")(handler)
+    r.component("slots_spin", "slots_auto_{spins}")(handler)
+    r.modal("predi_bet_{vote}_{msg_id}")(handler)
+    return r
+
+def test_exact_match(router):
+    route, fields = router.match(COMPONENT, "bj_hit")
+    assert route.pattern == "bj_hit"
+    assert fields == {}
+
+def test_fields_are_parsed(router):
+    route, fields = router.match(MODAL, "predi_bet_YES_1234")
+    assert route.pattern == "predi_bet_{vote}_{msg_id}"
+    assert fields == {"vote": "YES", "msg_id": "1234"}
+
+def test_last_field_takes_the_rest(router):
+    _, fields = router.match(MODAL, "predi_bet_NO_12_34")
+    assert fields == {"vote": "NO", "msg_id": "12_34"}
+
+def test_longest_prefix_wins(router):
+    assert router.match(COMPONENT, "slots_spin")[0].pattern == "slots_spin"
+    route, fields = router.match(COMPONENT, "slots_auto_10")
+    assert route.pattern == "slots_auto_{spins}"
+    assert fields == {"spins": "10"}
+
+@pytest.mark.parametrize("interaction_type, custom_id", [
+    (COMPONENT, "bj_hit_again"),  # no fields, so extra parts don't match
+    (COMPONENT, "bj"),
+    (COMPONENT, "slots_auto"),  # missing its field
+    (MODAL, "predi_bet_YES"),
+    (MODAL, "bj_hit"),  # registered for components only
+    (COMPONENT, "unknown"),
+])
+def test_no_match(router, interaction_type, custom_id):
+    assert router.match(interaction_type, custom_id) == (None, None)
+
+def test_duplicate_route(router):
+    with pytest.raises(ValueError):
+        router.component("bj_hit")(handler)
+
+def test_fields_must_come_last():
+    with pytest.raises(ValueError):
+        InteractionRouter().component("bet_{amount}_confirm")(handler)
+
+def test_dispatch_counts_calls_and_errors(router):
+    async def broken(interaction, **fields):
+        raise RuntimeError("boom")
+    router.component("bj_double")(broken)
+
+    hit = types.SimpleNamespace(type=COMPONENT, custom_id="bj_hit")
+    assert asyncio.run(router.dispatch(hit))
+    assert hit.handled == {}
+    stray = types.SimpleNamespace(type=COMPONENT, custom_id="nothing_here")
+    assert not asyncio.run(router.dispatch(stray))
+    with pytest.raises(RuntimeError):
+        asyncio.run(router.dispatch(types.SimpleNamespace(type=COMPONENT, custom_id="bj_double")))
+
+    stats = router.stats()
+    assert stats["bj_hit"]["calls"] == 1
+    assert stats["bj_double"]["calls"] == 1
+    assert stats["bj_double"]["errors"] == 1
+    assert router.unrouted == 1
@@ -0,0 +1,114 @@
+import asyncio
+import types
+
+import pytest
+
+from gambling import sessions
+from gambling.sessions import SessionStore
+
+class Clock:
+    """Stands in for time.monotonic so tests can move time forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(sessions, "time", types.SimpleNamespace(monotonic=c))
+    return c
+
+@pytest.fixture
+def make_store(clock):
+    created = []
+
+    def make(**kwargs):
+        kwargs.setdefault("ttl", 10)
+        kwargs.setdefault("tick", 1)
+        store = SessionStore("test", **kwargs)
+        created.append(store)
+        return store
+    yield make
+    # Keep test stores out of the bot's start_all/stop_all.
+    for store in created:
+        sessions._stores.remove(store)
+
+def test_expires_after_ttl(clock, make_store):
+    store = make_store()
+    store["a"] = {"user_id": 1}
+    clock.now += 9
+    assert store.expire(clock.now) == []
+    clock.now += 2
+    assert store.expire(clock.now) == [("a", {"user_id": 1})]
+    assert "a" not in store
+    assert store.for_user(1) == []
+    assert store.stats() == {"live": 0, "created": 1, "evictions": 1}
+
+def test_reading_a_session_pushes_expiry_back(clock, make_store):
+    store = make_store()
+    store["a"] = {"user_id": 1}
+    store["b"] = {"user_id": 2}
+    clock.now += 8
+    store["a"]
+    clock.now += 4
+    assert [key for key, _ in store.expire(clock.now)] == ["b"]
+    clock.now += 7
+    assert [key for key, _ in store.expire(clock.now)] == ["a"]
+
+def test_expires_after_several_turns_of_the_wheel(clock, make_store):
+    store = make_store(ttl=100, wheel_size=8)
+    store["a"] = {}
+    for _ in range(99):
+        clock.now += 1
+        assert store.expire(clock.now) == []
+    clock.now += 2
+    assert len(store.expire(clock.now)) == 1
+
+def test_late_expire_catches_up(clock, make_store):
+    # A tick that runs long after the last one still finds everything due.
+    store = make_store(wheel_size=4)
+    for key in range(10):
+        store[key] = {}
+        clock.now += 0.5
+    clock.now += 60
+    assert sorted(key for key, _ in store.expire(clock.now)) == list(range(10))
+
+def test_removed_sessions_never_expire(clock, make_store):
+    store = make_store()
+    store["a"] = {"user_id": 1}
+    assert store.pop("a") == {"user_id": 1}
+    clock.now += 20
+    assert store.expire(clock.now) == []
+
+def test_for_user_follows_replacements(clock, make_store):
+    store = make_store()
+    store["a"] = {"user_id": 1}
+    store["b"] = {"user_id": 1}
+    store["a"] = {"user_id": 2}
+    assert store.for_user(1) == ["b"]
+    assert store.for_user(2) == ["a"]
+
+def test_callbacks_on_expire_and_close(clock, make_store):
+    expired, closed = [], []
+
+    async def on_close(key, session):
+        closed.append(key)
+    store = make_store(on_expire=lambda key, session: expired.append(key), on_close=on_close)
+    store["old"] = {}
+    clock.now += 5
+    store["new"] = {}
+    clock.now += 6
+    assert asyncio.run(store.expire_and_notify(clock.now)) == 1
+    assert asyncio.run(store.close()) == 1
+    assert (expired, closed) == (["old"], ["new"])
+    assert len(store) == 0
+
+def test_close_defaults_to_on_expire(clock, make_store):
+    seen = []
+    store = make_store(on_expire=lambda key, session: seen.append(key))
+    store["a"] = {}
+    asyncio.run(store.close())
+    assert seen == ["a"]
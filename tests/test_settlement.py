@@ -0,0 +1,84 @@
+import pytest
+
+from gambling import points
+from gambling.settlement import settle
+from gambling.storage import JsonStore
+
+def vote(choice, bet, staked=True):
+    data = {"vote": choice, "bet": bet}
+    if staked:
+        data["staked"] = True
+    return data
+
+def payouts(settlement) -> dict:
+    return dict(zip(settlement.user_ids.tolist(), settlement.payouts.tolist()))
+
+def test_fixed_odds_pays_double_to_winners():
+    votes = {"1": vote("YES", 100), "2": vote("NO", 50), "3": vote("YES", 10)}
+    s = settle(votes, "YES")
+    assert payouts(s) == {1: 200, 2: 0, 3: 20}
+    assert s.pool == 160
+    assert s.paid_out == 220
+
+def test_pool_odds_share_every_stake():
+    votes = {"1": vote("YES", 100), "2": vote("YES", 50), "3": vote("NO", 150)}
+    s = settle(votes, "YES", odds="pool")
+    assert payouts(s) == {1: 200, 2: 100, 3: 0}
+    assert s.paid_out == s.pool == 300
+
+def test_pool_odds_round_down():
+    votes = {"1": vote("YES", 1), "2": vote("YES", 1), "3": vote("YES", 1), "4": vote("NO", 1)}
+    s = settle(votes, "YES", odds="pool")
+    # Each winner's share is 4/3 of their stake; the house keeps what rounding leaves.
+    assert payouts(s) == {1: 1, 2: 1, 3: 1, 4: 0}
+    assert s.paid_out <= s.pool
+
+def test_pool_odds_refund_when_nobody_won():
+    votes = {"1": vote("NO", 100), "2": vote("NO", 40)}
+    s = settle(votes, "YES", odds="pool")
+    assert payouts(s) == {1: 100, 2: 40}
+
+# With pool odds and no staked winner, the staked loser gets their stake back.
+@pytest.mark.parametrize("odds, staked_loser", [("fixed", 0), ("pool", 60)])
+def test_unstaked_votes_settle_under_the_old_rules(odds, staked_loser):
+    # Votes placed before stakes were taken were never debited.
+    votes = {"1": vote("YES", 100, staked=False), "2": vote("NO", 100, staked=False), "3": vote("NO", 60)}
+    s = settle(votes, "YES", odds=odds)
+    assert payouts(s) == {1: 200, 2: 0, 3: staked_loser}
+    assert s.pool == 60
+
+def test_unstaked_winners_stay_out_of_the_pool():
+    votes = {"1": vote("YES", 100, staked=False), "2": vote("YES", 50), "3": vote("NO", 50)}
+    s = settle(votes, "YES", odds="pool")
+    assert payouts(s) == {1: 200, 2: 100, 3: 0}
+
+def test_string_bets_from_old_files():
+    s = settle({"1": vote("YES", "25"), "2": vote("YES", "oops")}, "YES")
+    assert payouts(s) == {1: 50, 2: 0}
+
+def test_unknown_odds():
+    with pytest.raises(ValueError):
+        settle({}, "YES", odds="longshot")
+
+def test_apply_credits_every_winner(tmp_path, monkeypatch):
+    monkeypatch.setattr(points, "store", JsonStore(str(tmp_path / "profiles.json"), flush_interval=0))
+    points.credit(2, 5)
+    s = settle({"1": vote("YES", 100), "2": vote("NO", 100), "3": vote("YES", 0)}, "YES")
+    assert s.apply() == {1: 200, 3: 0}
+    assert points.get_points(1) == 200
+    assert points.get_points(2) == 5
+
+def test_pool_odds_use_exact_shares():
+    # A float share of 662/651 comes out a hair under, which would pay 661.
+    s = settle({"1": vote("YES", 651), "2": vote("NO", 11)}, "YES", odds="pool")
+    assert payouts(s) == {1: 662, 2: 0}
+
+def test_pool_odds_with_huge_stakes():
+    # bets * pool is past int64 here.
+    votes = {str(uid): vote("YES", 10**12 + uid) for uid in range(1, 50)}
+    votes.update({str(uid): vote("NO", 3 * 10**12 + uid) for uid in range(50, 80)})
+    s = settle(votes, "YES", odds="pool")
+    winning = sum(10**12 + uid for uid in range(1, 50))
+    expected = {uid: (10**12 + uid) * s.pool // winning for uid in range(1, 50)}
+    assert {uid: p for uid, p in payouts(s).items() if uid < 50} == expected
+    assert s.pool - 49 < s.paid_out <= s.pool
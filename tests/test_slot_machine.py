@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from gambling import points
+from gambling.slot_machine import SlotMachine, auto_spin
+from gambling.storage import JsonStore
+
+class ScriptedMachine(SlotMachine):
+    """A machine whose spins win the given amounts, in order."""
+
+    def __init__(self, winnings):
+        super().__init__(seed=0)
+        self.script = np.array(winnings, dtype=np.int64)
+
+    def spin_many(self, n: int, bet: int) -> tuple:
+        return np.zeros((n, self.rows, self.cols), dtype=np.int8), self.script[:n]
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = JsonStore(str(tmp_path / "profiles.json"), flush_interval=0)
+    monkeypatch.setattr(points, "store", s)
+    return s
+
+def settle_run(user_id, run):
+    return points.wager(user_id, run.total_bet, run.total_won, reason="test", cover=run.required)
+
+def test_stops_when_the_balance_runs_out(store):
+    points.credit(1, 25)
+    run = auto_spin(ScriptedMachine([0] * 5), bet=10, spins=5, balance=25)
+    assert (run.spins, run.stop_reason) == (2, "not enough points")
+    assert run.required == 20
+    assert settle_run(1, run) == 5
+
+def test_winnings_fund_later_spins(store):
+    points.credit(1, 10)
+    run = auto_spin(ScriptedMachine([30, 0, 0, 0]), bet=10, spins=4, balance=10)
+    assert (run.spins, run.stop_reason) == (4, None)
+    # Only the first stake had to come out of the balance.
+    assert run.required == 10
+    assert run.net == -10
+    assert settle_run(1, run) == 0
+
+def test_no_spins_when_the_first_is_unaffordable():
+    run = auto_spin(ScriptedMachine([0, 0]), bet=10, spins=2, balance=9)
+    assert (run.spins, run.required, run.stop_reason) == (0, 0, "not enough points")
+
+def test_loss_limit_and_balance_floor():
+    run = auto_spin(ScriptedMachine([0] * 10), bet=10, spins=10, balance=1000, loss_limit=30)
+    assert (run.spins, run.stop_reason) == (3, "loss limit")
+    run = auto_spin(ScriptedMachine([0] * 10), bet=10, spins=10, balance=100, stop_below=75)
+    assert (run.spins, run.stop_reason) == (3, "balance floor")
+
+def test_cover_above_the_balance_changes_nothing(store):
+    points.credit(1, 50)
+    # Net +20, but the run needed 60 up front.
+    assert points.wager(1, 40, 60, reason="test", cover=60) is None
+    assert points.get_points(1) == 50
+
+def test_stake_above_the_balance_changes_nothing(store):
+    points.credit(1, 5)
+    assert points.wager(1, 10, 0, reason="test") is None
+    assert points.get_points(1) == 5
+
+@pytest.mark.parametrize("seed", range(20))
+def test_real_runs_never_overdraw(store, seed):
+    machine = SlotMachine(seed=seed)
+    balance = 5 + seed * 7
+    points.credit(seed, balance)
+    run = auto_spin(machine, bet=5, spins=50, balance=balance)
+    # Replayed one spin at a time, the balance never has to go below zero.
+    running = np.cumsum(np.concatenate(([balance], run.winnings - run.bet)))
+    assert (running[:-1] >= run.bet).all()
+    assert run.required <= balance
+    assert settle_run(seed, run) == balance + run.net
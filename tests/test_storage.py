@@ -0,0 +1,142 @@
+import pytest
+
+from gambling.profile import Profile
+from gambling.storage import JsonStore, SqliteStore
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        s = JsonStore(str(tmp_path / "profiles.json"), flush_interval=0)
+    else:
+        s = SqliteStore(str(tmp_path / "profiles.db"))
+    yield s
+    s.close()
+
+def test_new_profile_starts_empty(store):
+    profile = store.get_profile(1)
+    assert profile.user_id == 1
+    assert profile.points == 0
+    assert store.count() == 1
+
+def test_ledger_operations(store):
+    assert store.add_points(1, 50, "bonus") == 50
+    assert store.add_points(1, -20, "bet") == 30
+    store.set_points(1, -5, "set")
+    assert store.get_points(1) == 0
+
+def test_apply_is_all_or_nothing(store):
+    store.add_points(1, 100)
+    store.add_points(2, 10)
+    # User 2 can't cover a 50 point stake, so neither entry is applied.
+    assert store.apply([(1, -50, 50), (2, -50, 50)], "bets") is None
+    assert store.get_points(1) == 100
+    assert store.get_points(2) == 10
+    assert store.apply([(1, -50, 50), (2, 30, 0)], "transfer") == {1: 50, 2: 40}
+
+def test_update_profile_leaves_points_alone(store):
+    # Read before the credit, e.g. by a /profile edit still waiting on Discord.
+    stale = store.get_profile(1)
+    store.add_points(1, 100, "payout")
+    stale.color = 0x1E90FF
+    stale.title = "Champion"
+    stale.achievements = ("first win",)
+    stale.points = 0
+    store.update_profile(1, stale)
+    profile = store.get_profile(1)
+    assert profile.points == 100
+    assert profile.color == 0x1E90FF
+    assert profile.title == "Champion"
+    assert profile.achievements == ("first win",)
+
+def test_get_profile_returns_a_copy(store):
+    store.add_points(1, 10)
+    profile = store.get_profile(1)
+    profile.title = "Unsaved"
+    profile.points = 1000
+    assert store.get_profile(1).title == ""
+    assert store.get_points(1) == 10
+    store.update_profile(1, profile)
+    assert store.get_profile(1).title == "Unsaved"
+    assert store.get_points(1) == 10
+
+def test_update_profile_creates_missing_user(store):
+    store.update_profile(7, Profile(7, title="New", points=500))
+    profile = store.get_profile(7)
+    assert profile.title == "New"
+    assert profile.points == 0
+
+def test_sqlite_survives_reopen(tmp_path):
+    path = str(tmp_path / "profiles.db")
+    s = SqliteStore(path)
+    s.add_points(1, 25, "bonus")
+    s.update_profile(1, Profile(1, title="Regular"))
+    s.close()
+    reopened = SqliteStore(path)
+    profile = reopened.get_profile(1)
+    reopened.close()
+    assert (profile.points, profile.title) == (25, "Regular")
+
+def reopen(path):
+    """A fresh JsonStore on the same files, as after a restart."""
+    return JsonStore(path, flush_interval=0)
+
+def test_journal_replays_after_crash(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    s = reopen(path)
+    s.add_points(1, 100, "bonus")
+    s.apply([(1, -30, 30), (2, 30, 0)], "transfer")
+    s.update_profile(2, Profile(2, title="Lucky"))
+    # Appended to the journal but never compacted or closed.
+    s.flush()
+    assert not (tmp_path / "profiles.json").exists()
+    restarted = reopen(path)
+    assert restarted.get_points(1) == 70
+    assert restarted.get_points(2) == 30
+    assert restarted.get_profile(2).title == "Lucky"
+
+def test_torn_journal_line_is_skipped(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    s = reopen(path)
+    s.add_points(1, 10)
+    s.flush()
+    with open(s.journal_path, "a") as f:
+        f.write('{"n": 99, "t": 0, "u": 1, "d"')
+    assert reopen(path).get_points(1) == 10
+
+def test_compaction_keeps_later_records(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    s = reopen(path)
+    s.add_points(1, 10)
+    s.compact()
+    s.add_points(1, 5)
+    s.add_points(2, 7)
+    s.flush()
+    # The compacted journal is kept for audits, next to the new one.
+    assert len(list(tmp_path.glob("profiles.journal.*"))) == 1
+    restarted = reopen(path)
+    assert restarted.get_points(1) == 15
+    assert restarted.get_points(2) == 7
+
+def test_crash_mid_compaction_replays_the_moved_journal(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    s = reopen(path)
+    s.add_points(1, 10)
+    s.flush()
+    # As if we crashed after moving the journal aside but before the snapshot was written.
+    (tmp_path / "profiles.journal").rename(s._compacting_path())
+    assert reopen(path).get_points(1) == 10
+
+def test_snapshot_records_are_not_replayed_twice(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    s = reopen(path)
+    s.get_profile(1)
+    s.compact()
+    # Only deltas in this segment, so replaying it twice would change the total.
+    s.add_points(1, 10)
+    s.compact()
+    # As if we crashed after writing the snapshot but before archiving its journal.
+    archived = max(tmp_path.glob("profiles.journal.*"), key=lambda p: int(p.suffix[1:]))
+    archived.rename(s._compacting_path())
+    s.add_points(1, 1)
+    s.flush()
+    assert reopen(path).get_points(1) == 11